@@ -0,0 +1,320 @@
+import json
+import os
+import re
+import threading
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, Optional, Union
+
+import pandas as pd
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Formats de réponse des endpoints de données et leurs types MIME
+MEDIA_TYPES = {
+    "json": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "csv": "text/csv",
+}
+FORMAT_DESCRIPTION = (
+    "Format de la réponse : json, arrow (Arrow IPC stream), parquet ou csv. "
+    "Par défaut, il est choisi d'après l'en-tête Accept (json sinon)."
+)
+CSV_CHUNK_ROWS = 10_000  # Lignes par morceau du CSV envoyé en streaming
+JSON_CHUNK_ROWS = 5_000  # Lignes par morceau du JSON envoyé en streaming
+JSON_READ_BYTES = 1 << 16  # Taille des blocs lus dans les fichiers JSON
+
+# espaces et virgules entre les éléments d'un tableau JSON
+_JSON_SEPARATORS = re.compile(r"[\s,]*")
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _accepted(header: str) -> Iterator:
+    """(valeur, qualité) des éléments d'un en-tête Accept ou Accept-Encoding."""
+    for item in header.split(","):
+        value, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        yield value.lower(), quality
+
+
+def negotiate(request: Request, format: Optional[str] = None) -> str:
+    """
+    Format de la réponse : le paramètre `format` s'il est donné, sinon le type
+    de l'en-tête Accept de plus haute qualité parmi MEDIA_TYPES, sinon json.
+    """
+    if format is not None:
+        if format not in MEDIA_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Format inconnu : {format}. Formats : {', '.join(MEDIA_TYPES)}.",
+            )
+        return format
+
+    formats = {media_type: name for name, media_type in MEDIA_TYPES.items()}
+    best, best_quality = "json", 0.0
+    for media_type, quality in _accepted(request.headers.get("accept", "")):
+        # à qualité égale, le premier type cité l'emporte
+        if media_type in formats and quality > best_quality:
+            best, best_quality = formats[media_type], quality
+    return best
+
+
+def _arrow_table(df: pd.DataFrame):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(
+            status_code=406,
+            detail="Format non disponible : pyarrow n'est pas installé.",
+        )
+    return pa, pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _arrow_bytes(df: pd.DataFrame) -> bytes:
+    pa, table = _arrow_table(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _parquet_bytes(df: pd.DataFrame) -> bytes:
+    pa, table = _arrow_table(df)
+    import pyarrow.parquet as pq
+
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+def _csv_chunks(df: pd.DataFrame):
+    """CSV de la table, CSV_CHUNK_ROWS lignes à la fois (en-tête dans le premier)."""
+    for start in range(0, max(len(df), 1), CSV_CHUNK_ROWS):
+        yield df.iloc[start : start + CSV_CHUNK_ROWS].to_csv(
+            index=False, header=start == 0, date_format="%Y-%m-%d"
+        )
+
+
+def table_response(df: pd.DataFrame, format: str) -> Response:
+    """Réponse arrow, parquet ou csv (en streaming) d'une table."""
+    if format == "arrow":
+        return Response(content=_arrow_bytes(df), media_type=MEDIA_TYPES["arrow"])
+    if format == "parquet":
+        return Response(content=_parquet_bytes(df), media_type=MEDIA_TYPES["parquet"])
+    if format == "csv":
+        return StreamingResponse(_csv_chunks(df), media_type=MEDIA_TYPES["csv"])
+    raise ValueError(f"Pas de table au format {format}")
+
+
+def cached_table(path: str, reader: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+    """
+    Table lue par reader(path), gardée en mémoire tant que le fichier n'a pas
+    été modifié. Les erreurs de lecture (fichier absent...) sont propagées.
+    """
+    modified = os.path.getmtime(path)
+    with _tables_lock:
+        cached = _tables.get((path, reader))
+    if cached is not None and cached[0] == modified:
+        return cached[1]
+    table = reader(path)
+    with _tables_lock:
+        _tables[(path, reader)] = (modified, table)
+    return table
+
+
+def csv_batches(
+    path: str, batch_rows: int = JSON_CHUNK_ROWS, **read_options
+) -> Iterator[pd.DataFrame]:
+    """
+    Lots de batch_rows lignes d'un fichier CSV, lus au fur et à mesure (la
+    table n'est jamais entière en mémoire). Le fichier est ouvert dès
+    l'appel : un fichier absent lève FileNotFoundError avant la réponse.
+
+    :param read_options: Options de pd.read_csv (usecols, dtype...).
+    """
+    reader = pd.read_csv(path, chunksize=batch_rows, **read_options)
+
+    def batches():
+        with reader:
+            yield from reader
+
+    return batches()
+
+
+def json_record_batches(
+    path: str, batch_rows: int = JSON_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """
+    Lots de batch_rows enregistrements d'un fichier JSON (tableau d'objets),
+    décodés au fur et à mesure par blocs de JSON_READ_BYTES caractères, avec
+    les valeurs en texte.
+
+    Le début du fichier est vérifié dès l'appel : FileNotFoundError ou
+    json.JSONDecodeError (pas un tableau) sont levées avant l'envoi de la
+    réponse. Le générateur ouvre ensuite le fichier lui-même.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        head = ""
+        while not head:
+            block = file.read(JSON_READ_BYTES)
+            if not block:
+                break
+            head = block.lstrip()
+    if not head.startswith("["):
+        raise json.JSONDecodeError("Le fichier JSON n'est pas un tableau", head, 0)
+
+    def batches():
+        decoder = json.JSONDecoder()
+        buffer, position, started, records = "", 0, False, []
+        with open(path, "r", encoding="utf-8") as file:
+            while True:
+                position = _JSON_SEPARATORS.match(buffer, position).end()
+                try:
+                    if position == len(buffer):
+                        raise json.JSONDecodeError(
+                            "Tableau JSON incomplet", buffer, position
+                        )
+                    if not started:
+                        # "[" vérifié avant la création du générateur
+                        position, started = position + 1, True
+                        continue
+                    if buffer[position] == "]":
+                        break
+                    record, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # fin du bloc atteinte (objet coupé) : le bloc suivant est lu
+                    block = file.read(JSON_READ_BYTES)
+                    if not block:
+                        raise
+                    buffer, position = buffer[position:] + block, 0
+                    continue
+                records.append(record)
+                if len(records) == batch_rows:
+                    yield pd.DataFrame(records, dtype=str)
+                    records = []
+        if records:
+            yield pd.DataFrame(records, dtype=str)
+
+    return batches()
+
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """
+    Compression de la réponse d'après l'en-tête Accept-Encoding : "br" (si
+    le module brotli est installé) ou "gzip", None sans compression acceptée.
+    """
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding, quality in _accepted(request.headers.get("accept-encoding", "")):
+        if encoding in available and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _json_rows(table: pd.DataFrame) -> str:
+    """Enregistrements JSON d'un morceau de table, séparés par des virgules (NaN -> null)."""
+    dates = table.select_dtypes("datetime").columns
+    if len(dates):
+        table = table.assign(
+            **{column: table[column].dt.strftime("%Y-%m-%d") for column in dates}
+        )
+    # float32 écrits avec leur représentation la plus courte (1.05 et non 1.0499999523)
+    singles = table.select_dtypes("float32").columns
+    if len(singles):
+        table = table.assign(
+            **{column: table[column].astype(str).astype(float) for column in singles}
+        )
+    rows = table.astype(object).where(table.notna(), None).to_dict(orient="records")
+    return json.dumps(rows, ensure_ascii=False)[1:-1]
+
+
+def json_array_chunks(
+    table: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    batch_rows: int = JSON_CHUNK_ROWS,
+) -> Iterator[str]:
+    """
+    Tableau JSON des lignes de la table, produit batch_rows lignes à la fois.
+
+    :param table: DataFrame, ou lots de lignes déjà découpés (ex. csv_batches).
+    """
+    batches = table
+    if isinstance(table, pd.DataFrame):
+        batches = (
+            table.iloc[start : start + batch_rows]
+            for start in range(0, len(table), batch_rows)
+        )
+    yield "["
+    separator = ""
+    for batch in batches:
+        if len(batch):
+            yield separator + _json_rows(batch)
+            separator = ","
+    yield "]"
+
+
+def json_object_chunks(
+    tables: Dict[str, Union[pd.DataFrame, Iterable[pd.DataFrame]]],
+    batch_rows: int = JSON_CHUNK_ROWS,
+) -> Iterator[str]:
+    """Objet JSON {clé: tableau des lignes de la table}, produit par morceaux."""
+    yield "{"
+    for position, (key, table) in enumerate(tables.items()):
+        yield ("," if position else "") + json.dumps(key) + ":"
+        yield from json_array_chunks(table, batch_rows)
+    yield "}"
+
+
+def _compressed(chunks: Iterator[str], encoding: Optional[str]) -> Iterator[bytes]:
+    """
+    Morceaux encodés en UTF-8 et compressés au fil de l'eau. Chaque morceau
+    est vidé du compresseur pour que le client le reçoive sans attendre la fin.
+    """
+    if encoding is None:
+        for chunk in chunks:
+            yield chunk.encode("utf-8")
+    elif encoding == "gzip":
+        compressor = zlib.compressobj(wbits=31)  # en-tête gzip
+        for chunk in chunks:
+            yield compressor.compress(chunk.encode("utf-8")) + compressor.flush(
+                zlib.Z_SYNC_FLUSH
+            )
+        yield compressor.flush()
+    else:
+        compressor = brotli.Compressor()
+        for chunk in chunks:
+            yield compressor.process(chunk.encode("utf-8")) + compressor.flush()
+        yield compressor.finish()
+
+
+def streaming_json_response(request: Request, chunks: Iterator[str]) -> Response:
+    """Réponse JSON envoyée morceau par morceau, compressée selon Accept-Encoding."""
+    encoding = negotiate_encoding(request)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(
+        _compressed(chunks, encoding), media_type=MEDIA_TYPES["json"], headers=headers
+    )
+
+
+def dataframe_response(
+    request: Request, table: pd.DataFrame, format: Optional[str] = None
+) -> Response:
+    """Table au format négocié : arrow, parquet, csv ou JSON en streaming."""
+    response_format = negotiate(request, format)
+    if response_format != "json":
+        return table_response(table, response_format)
+    return streaming_json_response(request, json_array_chunks(table))
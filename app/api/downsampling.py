@@ -0,0 +1,261 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, Query
+
+# Périodes de ré-échantillonnage : semaines boursières (fin le vendredi) et mois
+RESAMPLE_RULES = {
+    "week": pd.offsets.Week(weekday=4),
+    "month": pd.offsets.MonthEnd(),
+}
+AGGREGATES = ("mean", "ohlc")
+CACHE_SIZE = 128  # Nombre de résultats gardés en mémoire
+
+_results = OrderedDict()
+_results_lock = threading.Lock()
+
+
+class DownsamplingParams:
+    """
+    Paramètres de réduction des séries des graphiques, communs aux endpoints
+    (à utiliser avec Depends).
+    """
+
+    def __init__(
+        self,
+        start_date: Optional[str] = Query(
+            None, description="Date de début incluse (YYYY-MM-DD)"
+        ),
+        end_date: Optional[str] = Query(
+            None, description="Date de fin incluse (YYYY-MM-DD)"
+        ),
+        resample: Optional[str] = Query(
+            None, description="Ré-échantillonnage : week ou month"
+        ),
+        aggregate: str = Query(
+            "mean", description="Agrégation des périodes : mean ou ohlc"
+        ),
+        max_points: Optional[int] = Query(
+            None,
+            ge=3,
+            description="Nombre de points maximal par série (LTTB), ex. la largeur du graphique en pixels",
+        ),
+    ):
+        self.start_date = _parse_date(start_date)
+        self.end_date = _parse_date(end_date)
+        if resample is not None and resample not in RESAMPLE_RULES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Ré-échantillonnage inconnu : {resample}. Valeurs : {', '.join(RESAMPLE_RULES)}.",
+            )
+        if aggregate not in AGGREGATES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Agrégation inconnue : {aggregate}. Valeurs : {', '.join(AGGREGATES)}.",
+            )
+        self.resample = resample
+        self.aggregate = aggregate
+        self.max_points = max_points
+
+    @property
+    def active(self) -> bool:
+        """True si un paramètre demande de filtrer ou de réduire les données."""
+        return any(
+            value is not None
+            for value in [
+                self.start_date,
+                self.end_date,
+                self.resample,
+                self.max_points,
+            ]
+        )
+
+    def key(self) -> tuple:
+        return (
+            self.start_date,
+            self.end_date,
+            self.resample,
+            self.aggregate,
+            self.max_points,
+        )
+
+
+def _parse_date(value: Optional[str]):
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="Format de date invalide. Utilisez 'YYYY-MM-DD'."
+        )
+
+
+def resample_table(
+    table: pd.DataFrame,
+    rule: str,
+    aggregate: str = "mean",
+    date_column: str = "Date",
+    group_column: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Moyenne ou OHLC (colonnes <colonne>_open/_high/_low/_close) des colonnes
+    numériques par semaine ou par mois, pour chaque groupe s'il y en a un.
+    Les périodes sans données sont retirées.
+    """
+    values = [
+        column
+        for column in table.select_dtypes("number").columns
+        if column not in (date_column, group_column)
+    ]
+    indexed = table.set_index(date_column)
+    if group_column is not None:
+        resampler = indexed.groupby(group_column)[values].resample(RESAMPLE_RULES[rule])
+    else:
+        resampler = indexed[values].resample(RESAMPLE_RULES[rule])
+
+    if aggregate == "ohlc":
+        result = resampler.ohlc()
+        result.columns = [f"{column}_{price}" for column, price in result.columns]
+    else:
+        result = resampler.mean()
+    return result.dropna(how="all").reset_index()
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Positions des points gardés par Largest-Triangle-Three-Buckets.
+
+    Le premier et le dernier point sont gardés, les autres sont répartis en
+    max_points - 2 paquets dont on garde le point formant le plus grand
+    triangle avec le point gardé précédent et la moyenne du paquet suivant.
+    Avec plusieurs séries (y à deux dimensions), les aires des séries
+    normalisées sont additionnées.
+
+    :param x: Abscisses croissantes (n,).
+    :param y: Ordonnées (n,) ou (n, séries).
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float).reshape(n, -1)
+    spread = np.nanmax(y, axis=0) - np.nanmin(y, axis=0)
+    y = np.nan_to_num((y - np.nanmin(y, axis=0)) / np.where(spread > 0, spread, 1))
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    # moyenne de chaque paquet (le « paquet » suivant le dernier est le dernier point)
+    starts, ends = np.append(edges[:-1], n - 1), np.append(edges[1:], n)
+    sizes = (ends - starts)[:, None]
+    cumulative_x = np.concatenate([[0.0], np.cumsum(x)])
+    cumulative_y = np.vstack([np.zeros(y.shape[1]), np.cumsum(y, axis=0)])
+    mean_x = (cumulative_x[ends] - cumulative_x[starts]) / sizes[:, 0]
+    mean_y = (cumulative_y[ends] - cumulative_y[starts]) / sizes
+
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        previous = selected[bucket]
+        area = np.abs(
+            (x[previous] - mean_x[bucket + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end])[:, None] * (mean_y[bucket + 1] - y[previous])
+        ).sum(axis=1)
+        selected[bucket + 1] = start + int(np.argmax(area))
+    return selected
+
+
+def lttb_table(
+    table: pd.DataFrame,
+    max_points: int,
+    date_column: str = "Date",
+    group_column: Optional[str] = None,
+) -> pd.DataFrame:
+    """Lignes gardées par LTTB sur les colonnes numériques, pour chaque groupe."""
+    values = [
+        column
+        for column in table.select_dtypes("number").columns
+        if column not in (date_column, group_column)
+    ]
+    groups = (
+        [table]
+        if group_column is None
+        else [group for _, group in table.groupby(group_column, sort=False)]
+    )
+    kept = [
+        group.iloc[
+            lttb_indices(
+                group[date_column].to_numpy(dtype="datetime64[ns]").astype(np.int64),
+                group[values].to_numpy(dtype=float),
+                max_points,
+            )
+        ]
+        for group in groups
+    ]
+    return pd.concat(kept, ignore_index=True) if kept else table
+
+
+def downsample(
+    table: pd.DataFrame,
+    params: DownsamplingParams,
+    date_column: str = "Date",
+    group_column: Optional[str] = None,
+    groups: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Table filtrée (groupes, dates), ré-échantillonnée puis réduite par LTTB
+    selon les paramètres. La table doit être triée par date dans chaque groupe.
+    """
+    mask = np.ones(len(table), dtype=bool)
+    if groups:
+        mask &= table[group_column].isin(groups).to_numpy()
+    if params.start_date is not None:
+        mask &= (table[date_column] >= pd.Timestamp(params.start_date)).to_numpy()
+    if params.end_date is not None:
+        mask &= (table[date_column] <= pd.Timestamp(params.end_date)).to_numpy()
+    result = table[mask]
+
+    if params.resample is not None:
+        result = resample_table(
+            result, params.resample, params.aggregate, date_column, group_column
+        )
+    if params.max_points is not None:
+        result = lttb_table(result, params.max_points, date_column, group_column)
+    return result.reset_index(drop=True)
+
+
+def cached_downsample(
+    source, load: Callable[[], pd.DataFrame], params: DownsamplingParams, **options
+) -> pd.DataFrame:
+    """
+    downsample(load(), params, **options), gardé en mémoire par jeu de
+    paramètres (les CACHE_SIZE derniers).
+
+    :param source: Identifiant hashable de la source et de sa version, ex.
+        (chemin, date de modification) : un fichier modifié n'est pas servi
+        depuis le cache.
+    """
+    key = (
+        source,
+        params.key(),
+        tuple(sorted((name, _hashable(value)) for name, value in options.items())),
+    )
+    with _results_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+    result = downsample(load(), params, **options)
+    with _results_lock:
+        _results[key] = result
+        while len(_results) > CACHE_SIZE:
+            _results.popitem(last=False)
+    return result
+
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, list) else value
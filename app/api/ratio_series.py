@@ -0,0 +1,158 @@
+import json
+import struct
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+
+# Format binaire : magic, nombre de points, longueur du nom (uint32
+# little-endian), nom UTF-8, puis les jours (int32) et les valeurs (float32)
+_MAGIC = b"RPCS"
+_HEADER = struct.Struct("<4sII")
+_EPOCH = date(1970, 1, 1)
+
+
+def to_day(value) -> int:
+    """Numéro de jour (jours depuis 1970-01-01) d'une date ou d'une chaîne YYYY-MM-DD."""
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%Y-%m-%d").date()
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+class RatioSeries:
+    """
+    Série compacte d'un ratio put/call : les dates sont des numéros de jour
+    (int32, triés) et les valeurs des float32, dans deux tableaux NumPy.
+
+    La recherche d'une date est une recherche dichotomique (O(log n)) et
+    les tranches de dates partagent les tableaux de la série (sans copie).
+    """
+
+    def __init__(self, name: str, days: np.ndarray, values: np.ndarray):
+        """
+        :param name: Nom du ratio (ex. "TOTAL PUT/CALL RATIO").
+        :param days: Numéros de jour croissants (int32).
+        :param values: Valeurs du ratio (float32), NaN si non numérique.
+        """
+        self.name = name
+        self.days = np.asarray(days, dtype=np.int32)
+        self.values = np.asarray(values, dtype=np.float32)
+
+    @classmethod
+    def from_records(
+        cls,
+        records: list,
+        date_key: str = "Date",
+        value_key: str = "Ratio Value",
+        name_key: str = "Ratio Name",
+    ) -> "RatioSeries":
+        """
+        Série construite à partir d'enregistrements JSON (une date YYYY-MM-DD
+        et une valeur texte par jour), triée par date.
+        """
+        days = (
+            np.array([record[date_key] for record in records], dtype="datetime64[D]")
+            .astype(np.int64)
+            .astype(np.int32)
+        )
+        values = np.array(
+            [_to_float(record[value_key]) for record in records], dtype=np.float32
+        )
+        name = records[0][name_key] if records else ""
+        order = np.argsort(days, kind="stable")
+        return cls(name, days[order], values[order])
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Dates de la série (datetime64[D])."""
+        return self.days.astype("datetime64[D]")
+
+    def get(self, day) -> Optional[float]:
+        """Valeur à une date (date, chaîne YYYY-MM-DD ou numéro de jour), None si absente."""
+        if not isinstance(day, (int, np.integer)):
+            day = to_day(day)
+        position = np.searchsorted(self.days, day)
+        if position < len(self.days) and self.days[position] == day:
+            # valeur la plus courte du float32 (1.01 et non 1.0099999904)
+            return float(str(self.values[position]))
+        return None
+
+    def slice(self, start=None, end=None) -> "RatioSeries":
+        """
+        Tranche [start, end] (bornes incluses, optionnelles) de la série. Les
+        tableaux de la tranche sont des vues sur ceux de la série.
+        """
+        first = 0 if start is None else np.searchsorted(self.days, to_day(start))
+        last = (
+            len(self.days)
+            if end is None
+            else np.searchsorted(self.days, to_day(end), side="right")
+        )
+        return RatioSeries(self.name, self.days[first:last], self.values[first:last])
+
+    def to_frame(self):
+        """DataFrame (date, ratio_name, ratio_value) de la série."""
+        import pandas as pd
+
+        return pd.DataFrame(
+            {
+                "date": self.dates.astype("datetime64[ns]"),
+                "ratio_name": self.name,
+                "ratio_value": self.values,
+            }
+        )
+
+    def to_json(self) -> bytes:
+        """
+        Tableau JSON [{"date", "ratio_name", "ratio_value"}, ...] avec des
+        valeurs numériques (null si absentes).
+        """
+        dates = np.datetime_as_string(self.dates)
+        # représentation la plus courte du float32 (1.05 et non 1.0499999523)
+        values = np.where(np.isnan(self.values), "null", self.values.astype(str))
+        prefix = '{"date":"'
+        suffix = f'","ratio_name":{json.dumps(self.name)},"ratio_value":'
+        rows = ",".join(
+            f"{prefix}{day}{suffix}{value}}}" for day, value in zip(dates, values)
+        )
+        return f"[{rows}]".encode("utf-8")
+
+    def to_bytes(self) -> bytes:
+        """Représentation binaire de la série (voir from_bytes)."""
+        name = self.name.encode("utf-8")
+        return b"".join(
+            [
+                _HEADER.pack(_MAGIC, len(self.days), len(name)),
+                name,
+                self.days.astype("<i4").tobytes(),
+                self.values.astype("<f4").tobytes(),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "RatioSeries":
+        """Série lue depuis to_bytes, les tableaux sont des vues sur data."""
+        magic, length, name_length = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Données binaires de série invalides.")
+        offset = _HEADER.size
+        name = bytes(data[offset : offset + name_length]).decode("utf-8")
+        offset += name_length
+        days = np.frombuffer(data, dtype="<i4", count=length, offset=offset)
+        values = np.frombuffer(
+            data, dtype="<f4", count=length, offset=offset + 4 * length
+        )
+        return cls(name, days, values)
+
+
+def _to_float(value) -> float:
+    """Valeur numérique d'un ratio texte ("1.05" ou "1,05"), NaN sinon."""
+    try:
+        return float(str(value).replace(",", "."))
+    except ValueError:
+        return float("nan")
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Query
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
 from api.put_call_us_webscraper import RatioScraperUS
 from api.put_call_europe_webscraper import LastMonthDataScraperEurope
 from api.construct_portfolio import ConstructPortfolio
+from api.data_formats import FORMAT_DESCRIPTION, negotiate, table_response
 
 # Créer un router pour les routes de l'API
 api_router = APIRouter()
@@ -66,10 +69,17 @@ FILE_PATHS = [
 STOCK_NAMES = ["BHP_Group", "BP_PLC", "FMC_Corp", "Stora_Enso", "Total_Energies"]
 
 @router_portefeuille.get("/calculate_weights/")
-async def calculate_weights(bullish_threshold: float = -1, bearish_threshold: float = 1):
+async def calculate_weights(
+    request: Request,
+    bullish_threshold: float = -1,
+    bearish_threshold: float = 1,
+    format: Optional[str] = Query(None, description=FORMAT_DESCRIPTION),
+):
     """
     Calcule les poids du portefeuille en utilisant les fichiers CSV existants.
+    En json, {"weights": [...]} ; dans les autres formats, la table des poids.
     """
+    response_format = negotiate(request, format)
 
     # Exécute l’analyse
     portfolio = ConstructPortfolio(FILE_PATHS, STOCK_NAMES)
@@ -79,6 +89,8 @@ async def calculate_weights(bullish_threshold: float = -1, bearish_threshold: fl
 
     # Récupération des poids sous forme de dictionnaire
     weights_df = portfolio.weight_data.reset_index()
+    if response_format != "json":
+        return table_response(weights_df, response_format)
     weights_dict = weights_df.to_dict(orient="records")
 
     return {"weights": weights_dict}
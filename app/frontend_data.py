@@ -0,0 +1,45 @@
+import io
+
+import pandas as pd
+import requests
+
+# Formats demandés à l'API, du plus rapide à décoder au plus lent : Arrow
+# si pyarrow est installé, sinon CSV, JSON en dernier recours
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+ACCEPT = (
+    "application/vnd.apache.arrow.stream, text/csv;q=0.5, application/json;q=0.1"
+    if pa is not None
+    else "text/csv, application/json;q=0.1"
+)
+
+
+def decode_dataframe(response):
+    """
+    DataFrame d'une réponse de l'API, d'après son Content-Type :
+    Arrow IPC, Parquet, CSV ou JSON (liste d'enregistrements).
+    """
+    content_type = response.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == "application/vnd.apache.arrow.stream":
+        with pa.ipc.open_stream(response.content) as reader:
+            return reader.read_pandas()
+    if content_type == "application/vnd.apache.parquet":
+        return pd.read_parquet(io.BytesIO(response.content))
+    if content_type == "text/csv":
+        return pd.read_csv(io.StringIO(response.text))
+    return pd.DataFrame(response.json())
+
+
+def get_dataframe(url, params=None):
+    """
+    Requête GET demandant un format tabulaire à l'API.
+
+    :return: (réponse, DataFrame), le DataFrame vaut None si la requête a échoué
+    """
+    response = requests.get(url, params=params, headers={"Accept": ACCEPT})
+    if response.status_code != 200:
+        return response, None
+    return response, decode_dataframe(response)
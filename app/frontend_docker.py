@@ -4,8 +4,13 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime
 
+from frontend_data import get_dataframe
+
 # URL de base de l'API FastAPI
 API_URL = "http://backend:8000/api/v1"
+# Nombre de points des graphiques, les séries sont réduites par l'API
+CHART_POINTS = 500
+
 # Titre principal
 st.title("Put-Call Ratio et portefeuille")
 
@@ -90,11 +95,11 @@ st.header("📈 Évolution du Put-Call Ratio US")
 st.write("Cliquez sur le bouton ci-dessous")
 
 if st.button("Charger toutes les données et afficher le graphique"):
-    response_all = requests.get(f"{API_URL}/put-call-ratio-us/")
+    response_all, df = get_dataframe(
+        f"{API_URL}/put-call-ratio-us/", params={"max_points": CHART_POINTS}
+    )
     
     if response_all.status_code == 200:
-        data_all = response_all.json()
-        df = pd.DataFrame(data_all)
         df['date'] = pd.to_datetime(df['date'])
         df['ratio_value'] = pd.to_numeric(df['ratio_value'], errors='coerce')
 
@@ -117,18 +122,16 @@ st.header("📈 Évolution du Put-Call Ratio Europe")
 st.write("Cliquez sur le bouton ci-dessous ")
 
 if st.button("Charger toutes les données  et afficher le graphique"):
-    response = requests.get(f"{API_URL}/put-call-ratio-eu/")
+    response, df = get_dataframe(
+        f"{API_URL}/put-call-ratio-eu/", params={"max_points": CHART_POINTS}
+    )
 
     if response.status_code == 200:
-        data = response.json()
         st.success("✅ Données chargées avec succès !")
 
-        if data:
-            df = pd.DataFrame(data)
-            
-            # Convertir les valeurs numériques et les dates
-            df["Date"] = pd.to_datetime(df["﻿\"Date\""], format="%d/%m/%Y", dayfirst=True)
-            df["Dernier"] = df["Dernier"].str.replace(",", ".").astype(float)
+        if not df.empty:
+            # Table (Date, Dernier) typée et réduite par l'API
+            df["Date"] = pd.to_datetime(df["Date"])
 
             st.write("📋 **Données récupérées :**")
             st.dataframe(df)
@@ -153,14 +156,12 @@ st.header("📊 Value at risk du portefeuille")
 st.write("Cliquez sur le bouton ci-dessous")
 
 if st.button("🔄 Charger les données VaR"):
-    response = requests.get(f"{API_URL}/var-data/")
+    response, df = get_dataframe(f"{API_URL}/var-data/")
 
     if response.status_code == 200:
-        data = response.json()
         st.success("✅ Données chargées avec succès !")
 
-        if data:
-            df = pd.DataFrame(data)
+        if not df.empty:
             
             # Convertir les valeurs numériques et les dates
             df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d")
@@ -181,37 +182,37 @@ if st.button("🔄 Charger les données VaR"):
     else:
         st.error(f"❌ Erreur : {response.status_code} - {response.text}")
 
-if "var_data" not in st.session_state:
-    st.session_state.var_data = None
+if "var_assets" not in st.session_state:
+    st.session_state.var_assets = None
 
 if st.button("📈 Afficher les données VaR du portefeuille"):
-    response = requests.get(f"{API_URL}/var-data/")
+    response = requests.get(f"{API_URL}/var-assets/")
     if response.status_code == 200:
-        st.session_state.var_data = response.json()  # Stocker les données en session
+        st.session_state.var_assets = response.json()  # Stocker les actifs en session
         st.success("✅ Données chargées avec succès !")
     else:
         st.error(f"❌ Erreur : {response.status_code} - {response.text}")
 
-if st.session_state.var_data:
-    df = pd.DataFrame(st.session_state.var_data)
+if st.session_state.var_assets:
+    # Sélecteur d'entreprise et de résolution
+    choix_entreprise = st.selectbox("Choisissez une entreprise :", st.session_state.var_assets)
+    resolutions = {"Journalière": None, "Hebdomadaire": "week", "Mensuelle": "month"}
+    choix_resolution = st.radio("Résolution :", list(resolutions), horizontal=True)
 
-    # Convertir les valeurs numériques et les dates
-    df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d")
-    df["Close"] = df["Close"].astype(float)
-    df["Daily Return"] = df["Daily Return"].astype(float)
-    df["Put-Call Ratio"] = df["Put-Call Ratio"].astype(float)
-    df["VaR_Hist"] = df["VaR_Hist"].astype(float)
-    df["VaR_Adjusted"] = df["VaR_Adjusted"].astype(float)
+    # L'API filtre l'entreprise, ré-échantillonne et réduit la série au nombre de points du graphique
+    params = {"asset": choix_entreprise, "max_points": CHART_POINTS}
+    if resolutions[choix_resolution] is not None:
+        params["resample"] = resolutions[choix_resolution]
+    response, df_selection = get_dataframe(f"{API_URL}/var-data/", params=params)
 
-    # Sélecteur d'entreprise
-    entreprises = df["Asset"].unique()
-    choix_entreprise = st.selectbox("Choisissez une entreprise :", entreprises)
-
-    # Filtrer les données en fonction de l'entreprise sélectionnée
-    df_selection = df[df["Asset"] == choix_entreprise]
+    if response.status_code == 200:
+        # Convertir les dates
+        df_selection["Date"] = pd.to_datetime(df_selection["Date"], format="%Y-%m-%d")
 
-    # Afficher le graphique
-    st.line_chart(df_selection.set_index("Date")[["Daily Return", "VaR_Hist", "VaR_Adjusted"]])
+        # Afficher le graphique
+        st.line_chart(df_selection.set_index("Date")[["Daily Return", "VaR_Hist", "VaR_Adjusted"]])
+    else:
+        st.error(f"❌ Erreur : {response.status_code} - {response.text}")
 
 
 
@@ -227,15 +228,12 @@ bullish_threshold = st.number_input("Seuil Bullish", value=-1.0)
 bearish_threshold = st.number_input("Seuil Bearish", value=1.0)
 
 if st.button(" 🚀Calculer les Poids"):
-    response = requests.get(
+    response, weights_df = get_dataframe(
         f"{API_URL}/calculate_weights/",
         params={"bullish_threshold": bullish_threshold, "bearish_threshold": bearish_threshold},
     )
 
     if response.status_code == 200:
-        weights_data = response.json()["weights"]
-        weights_df = pd.DataFrame(weights_data)
-
         st.write("### Poids du Portefeuille")
         st.dataframe(weights_df)
     else:
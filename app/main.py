@@ -1,27 +1,35 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Path, Query, Request
-from fastapi.responses import HTMLResponse
-from dataclasses import dataclass
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Path, Query, Request
+from fastapi.responses import HTMLResponse, Response
 import json
-from typing import Any, List, Dict
+import math
+import os
+from typing import Any, List, Dict, Optional
 from pydantic import BaseModel
 # from config import settings, setup_app_logging
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes import api_router, router_webscrap_eu, router_webscrap_us, router_portefeuille
+from api.ratio_series import RatioSeries
+from api.data_formats import (
+    FORMAT_DESCRIPTION,
+    cached_table,
+    csv_batches,
+    dataframe_response,
+    json_array_chunks,
+    json_object_chunks,
+    json_record_batches,
+    negotiate,
+    streaming_json_response,
+    table_response,
+)
+from api.downsampling import DownsamplingParams, cached_downsample
 from datetime import date, datetime
 import yaml
 import pandas as pd
 #______________________________data class_______________________
-@dataclass
-class RatioPutCall:
-    date: date
-    ratio_name: str
-    ratio_value: str
-
-
 class RatioPutCallResponse(BaseModel):
     date: date
     ratio_name: str
-    ratio_value: str
+    ratio_value: Optional[float]
 
 
 def charger_json(fichier_json):
@@ -84,17 +92,12 @@ app.include_router(router_portefeuille, prefix="/api/v1")
 
 
 #____________________________________put_call_us______________________
-put_call_us_list = [
-    RatioPutCall(
-        date=datetime.strptime(item["Date"], "%Y-%m-%d").date(),
-        ratio_name=item["Ratio Name"],
-        ratio_value=item["Ratio Value"],
-    )
-    for item in charger_json(
+# Série compacte (jours int32, valeurs float32) chargée une fois au démarrage
+put_call_us_series = RatioSeries.from_records(
+    charger_json(
         "../new_data/webscrapped_call_put_ratio/Put_Call Ratio US -Données Historiques 2019_2024.json"
     )
-]
-put_call_us_dict = {item.date: item for item in put_call_us_list}
+)
 
 @app.get("/api/v1/put-call-ratio-us/{date}", response_model=RatioPutCallResponse)
 async def get_put_call_ratio_us(date: str):
@@ -109,41 +112,88 @@ async def get_put_call_ratio_us(date: str):
             status_code=400, detail="Format de date invalide. Utilisez 'YYYY-MM-DD'."
         )
 
-    ratio_data = put_call_us_dict.get(valid_date)
-    if not ratio_data:
+    ratio_value = put_call_us_series.get(valid_date)
+    if ratio_value is None:
         raise HTTPException(
             status_code=404,
             detail=f"Aucune donnée trouvée pour la date {date}. Rappel, les doonnées ne sont pas disponible les week-ends",
         )
 
     return RatioPutCallResponse(
-        date=ratio_data.date,
-        ratio_name=ratio_data.ratio_name,
-        ratio_value=ratio_data.ratio_value,
+        date=valid_date,
+        ratio_name=put_call_us_series.name,
+        ratio_value=None if math.isnan(ratio_value) else ratio_value,
     )
 
 
 @app.get("/api/v1/put-call-ratio-us/", response_model=List[RatioPutCallResponse])
-async def get_all_put_call_ratios():
+async def get_all_put_call_ratios(
+    request: Request,
+    format: Optional[str] = Query(None, description=FORMAT_DESCRIPTION),
+    params: DownsamplingParams = Depends(),
+):
     """
     Récupère tous les put-call ratios de notre base.
+    Avec l'en-tête `Accept: application/octet-stream`, la série est renvoyée
+    au format binaire de RatioSeries (jours int32 puis valeurs float32).
+    Les paramètres de dates, de ré-échantillonnage et `max_points` réduisent
+    la série côté serveur pour les graphiques.
     """
-    return [
-        RatioPutCallResponse(
-            date=ratio.date, ratio_name=ratio.ratio_name, ratio_value=ratio.ratio_value
+    series = put_call_us_series.slice(params.start_date, params.end_date)
+    if params.resample is not None or params.max_points is not None:
+        table = cached_downsample(
+            "put-call-ratio-us", series.to_frame, params, date_column="date"
         )
-        for ratio in put_call_us_list
-    ]
+        return dataframe_response(request, table, format)
+
+    if format is None and "application/octet-stream" in request.headers.get("accept", ""):
+        return Response(content=series.to_bytes(), media_type="application/octet-stream")
+    response_format = negotiate(request, format)
+    if response_format != "json":
+        return table_response(series.to_frame(), response_format)
+    return Response(content=series.to_json(), media_type="application/json")
 #____________________________________put_call_europe______________________
 
 
 
+def read_eu_ratio_table(path):
+    """Table (Date, Dernier) typée et triée du fichier JSON des ratios européens."""
+    with open(path, "r", encoding="utf-8") as file:
+        table = pd.DataFrame(json.load(file))
+    # la première colonne est la date, son nom contient le BOM du CSV d'origine
+    return (
+        pd.DataFrame(
+            {
+                "Date": pd.to_datetime(table.iloc[:, 0], format="%d/%m/%Y"),
+                "Dernier": pd.to_numeric(
+                    table["Dernier"].str.replace(",", "."), errors="coerce"
+                ),
+            }
+        )
+        .sort_values("Date", kind="stable")
+        .reset_index(drop=True)
+    )
+
+
 @app.get("/api/v1/put-call-ratio-eu/", response_model=List[Dict[str, str]])
-async def get_put_call_ratio_eu():
+async def get_put_call_ratio_eu(
+    request: Request,
+    format: Optional[str] = Query(None, description=FORMAT_DESCRIPTION),
+    params: DownsamplingParams = Depends(),
+):
     """
     Récupère les données du Put-Call Ratio à partir d'un fichier JSON.
+    Avec des paramètres de dates, de ré-échantillonnage ou `max_points`, la
+    réponse est la table typée (Date, Dernier) réduite côté serveur.
     """
     try:
+        if params.active:
+            table = cached_downsample(
+                (JSON_FILE_PATH, os.path.getmtime(JSON_FILE_PATH)),
+                lambda: cached_table(JSON_FILE_PATH, read_eu_ratio_table),
+                params,
+            )
+            return dataframe_response(request, table, format)
         with open(JSON_FILE_PATH, "r", encoding="utf-8") as file:
             data = json.load(file)
         return data
@@ -172,15 +222,44 @@ bullish_threshold = -1
 bearish_threshold = 1
 
 
-@app.get("/financial_data")
-def get_financial_data():
-    """Renvoie les cours financiers des actions."""
-    financial_data = {}
-    for stock in stock_names:
-        df = pd.read_csv(f"../new_data/full_data/{stock}_updated_financial_data.csv")
-        financial_data[stock] = df[["Date", "Close"]].to_dict(orient='records')
+def read_close_prices(path):
+    return pd.read_csv(path, usecols=["Date", "Close"], parse_dates=["Date"])
 
-    return financial_data
+
+@app.get("/financial_data")
+def get_financial_data(
+    request: Request, format: Optional[str] = Query(None, description=FORMAT_DESCRIPTION)
+):
+    """
+    Renvoie les cours financiers des actions.
+    En json, un dictionnaire {action: [{Date, Close}, ...]} ; dans les autres
+    formats, une table (Stock, Date, Close).
+    """
+    response_format = negotiate(request, format)
+    if response_format != "json":
+        table = pd.concat(
+            [
+                cached_table(
+                    f"../new_data/full_data/{stock}_updated_financial_data.csv",
+                    read_close_prices,
+                ).assign(Stock=stock)[["Stock", "Date", "Close"]]
+                for stock in stock_names
+            ],
+            ignore_index=True,
+        )
+        return table_response(table, response_format)
+
+    # JSON envoyé action par action et par lots de lignes lus au fil du
+    # fichier (dates en texte, comme dans le fichier), compressé si demandé
+    tables = {
+        stock: csv_batches(
+            f"../new_data/full_data/{stock}_updated_financial_data.csv",
+            usecols=["Date", "Close"],
+            dtype={"Date": str},
+        )
+        for stock in stock_names
+    }
+    return streaming_json_response(request, json_object_chunks(tables))
 
 
 #_________________________________Var d'un portefeuille basé sur des actif du secteru de l'énergie_________________________________________
@@ -189,19 +268,64 @@ def get_financial_data():
 
 VAR_JSON_FILE = "../new_output/results/var/financial_data_with_var.json" 
 
+def read_var_table(path):
+    """Table VaR typée (dates et nombres) du fichier JSON, dont les valeurs sont du texte."""
+    with open(path, "r", encoding="utf-8") as file:
+        table = pd.DataFrame(json.load(file))
+    for column in table.columns:
+        if column == "Date":
+            table[column] = pd.to_datetime(table[column], format="%Y-%m-%d")
+        elif column != "Asset":
+            table[column] = pd.to_numeric(table[column], errors="coerce")
+    return table
+
+
 @app.get("/api/v1/var-data/", response_model=List[Dict[str, str]])
-async def get_var_data():
+async def get_var_data(
+    request: Request,
+    format: Optional[str] = Query(None, description=FORMAT_DESCRIPTION),
+    asset: Optional[List[str]] = Query(None, description="Actifs à garder (répétable)"),
+    params: DownsamplingParams = Depends(),
+):
     """
     Récupère les données VaR (Value at Risk) à partir d'un fichier JSON.
+    Dans les formats arrow, parquet et csv, les colonnes sont typées. Le JSON
+    est lu et envoyé par lots de lignes (le fichier n'est pas chargé en
+    entier), compressé selon l'en-tête Accept-Encoding.
+    Avec `asset` ou des paramètres de réduction, la table typée est filtrée et
+    réduite côté serveur, actif par actif.
     """
     try:
-        with open(VAR_JSON_FILE, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        return data
+        if asset or params.active:
+            table = cached_downsample(
+                (VAR_JSON_FILE, os.path.getmtime(VAR_JSON_FILE)),
+                lambda: cached_table(VAR_JSON_FILE, read_var_table),
+                params,
+                group_column="Asset",
+                groups=asset,
+            )
+            return dataframe_response(request, table, format)
+        response_format = negotiate(request, format)
+        if response_format != "json":
+            return table_response(cached_table(VAR_JSON_FILE, read_var_table), response_format)
+        batches = json_record_batches(VAR_JSON_FILE)
+        return streaming_json_response(request, json_array_chunks(batches))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Fichier JSON introuvable.")
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=500, detail="Erreur de décodage du fichier JSON.")
+
+
+@app.get("/api/v1/var-assets/", response_model=List[str])
+async def get_var_assets():
+    """Liste des actifs des données VaR, dans l'ordre du fichier."""
+    try:
+        table = cached_table(VAR_JSON_FILE, read_var_table)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Fichier JSON introuvable.")
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Erreur de décodage du fichier JSON.")
+    return table["Asset"].unique().tolist()
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,6 +1,17 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 
+RATIO_COLUMN = "Put-Call Ratio"
+
+# periods covered by the sample ratio files
+US_RATIOS_END = "2024-01-31"
+EU_RATIOS_START = "2019-10-07"
+EU_RATIOS_END = "2024-01-31"
+
 
 class PutCallRatioAdder:
     """
@@ -16,78 +27,202 @@ class PutCallRatioAdder:
         """
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
+        self._ratios = {}
+        self._ratios_lock = threading.Lock()
+
+    @staticmethod
+    def _read_ratios(ratios_path, kind):
+        if kind == "us":
+            ratios_data = pd.read_csv(ratios_path, usecols=["Date", "Ratio Value"])
+            dates = pd.to_datetime(ratios_data["Date"])
+            values = ratios_data["Ratio Value"]
+        elif kind == "eu":
+            ratios_data = pd.read_csv(
+                ratios_path, usecols=["Date", "Dernier"], encoding="utf-8-sig"
+            )
+            dates = pd.to_datetime(ratios_data["Date"], format="%d/%m/%Y")
+            values = ratios_data["Dernier"]
+            if values.dtype == "object":
+                values = values.str.replace(",", ".").astype(float)
+        else:
+            raise ValueError(f"Unknown ratio source kind: {kind}")
 
-    def add_put_call_ratio_us(self, financial_data_path, ratios_path, company_name):
+        ratios = pd.Series(
+            values.to_numpy(dtype=float),
+            index=pd.DatetimeIndex(dates, name="Date"),
+            name=RATIO_COLUMN,
+        )
+        return ratios.sort_index()
+
+    def load_ratios(self, ratios_path, kind="us"):
+        """
+        Put-Call Ratio series of a source, indexed by date. Each source is read
+        once and shared by all the assets attached to it.
+
+        :param ratios_path: Path to the ratios CSV file.
+        :param kind: "us" (Date, Ratio Value) or "eu" (dd/mm/YYYY Date, Dernier).
+        :return: Series of ratio values indexed by date.
+        """
+        key = (ratios_path, kind)
+        with self._ratios_lock:
+            if key not in self._ratios:
+                self._ratios[key] = self._read_ratios(ratios_path, kind)
+            return self._ratios[key]
+
+    @staticmethod
+    def attach_ratios(
+        financial_data, ratios, how="exact", max_staleness=None, start=None, end=None
+    ):
+        """
+        Adds a 'Put-Call Ratio' column to financial data.
+
+        :param financial_data: DataFrame with a 'Date' column.
+        :param ratios: Series of ratio values indexed by date (see load_ratios).
+        :param how: "exact" keeps the days with a ratio of the same day (missing
+            values set to 0), "ffill" carries the last ratio over the asset days
+            (at most max_staleness rows), "asof" takes the last ratio published
+            on or before each day (at most max_staleness days old). Days left
+            without a ratio are dropped.
+        :param max_staleness: Staleness limit of "ffill" and "asof", None for none.
+        :param start: First date kept (inclusive), None for no cutoff.
+        :param end: Last date kept (inclusive), None for no cutoff.
+        :return: DataFrame with the financial columns and 'Put-Call Ratio'.
+        """
+        financial_data = financial_data.copy()
+        financial_data["Date"] = pd.to_datetime(financial_data["Date"])
+
+        in_range = pd.Series(True, index=financial_data.index)
+        ratio_range = pd.Series(True, index=ratios.index)
+        if start is not None:
+            in_range &= financial_data["Date"] >= pd.Timestamp(start)
+            ratio_range &= ratios.index >= pd.Timestamp(start)
+        if end is not None:
+            in_range &= financial_data["Date"] <= pd.Timestamp(end)
+            ratio_range &= ratios.index <= pd.Timestamp(end)
+        financial_data = financial_data[in_range]
+        ratios = ratios[ratio_range.to_numpy()]
+
+        dates = pd.DatetimeIndex(financial_data["Date"])
+        if how == "exact":
+            present = dates.isin(ratios.index)
+            values = ratios.reindex(dates[present]).fillna(0).to_numpy()
+            merged_data = financial_data[present]
+        elif how == "ffill":
+            values = (
+                ratios.dropna()
+                .reindex(dates.unique().sort_values())
+                .ffill(limit=max_staleness)
+                .reindex(dates)
+                .to_numpy()
+            )
+            merged_data = financial_data[~np.isnan(values)]
+            values = values[~np.isnan(values)]
+        elif how == "asof":
+            ratios = ratios.dropna()
+            position = ratios.index.searchsorted(dates, side="right") - 1
+            values = np.where(
+                position >= 0, ratios.to_numpy()[np.maximum(position, 0)], np.nan
+            )
+            if max_staleness is not None:
+                age = dates - ratios.index[np.maximum(position, 0)]
+                values[age > pd.Timedelta(days=max_staleness)] = np.nan
+            merged_data = financial_data[~np.isnan(values)]
+            values = values[~np.isnan(values)]
+        else:
+            raise ValueError(f"Unknown join: {how}")
+
+        merged_data = merged_data.copy()
+        merged_data[RATIO_COLUMN] = values
+        return merged_data
+
+    def add_put_call_ratios(
+        self,
+        assets,
+        how="exact",
+        max_staleness=None,
+        start=None,
+        end=None,
+        max_workers=None,
+    ):
+        """
+        Adds the Put-Call Ratio to many financial data files in one pass: each
+        ratio source is read once and the assets are processed in parallel.
+
+        :param assets: Dictionary of company names and their
+            (financial_data_path, ratios_path, kind) triple.
+        :param how, max_staleness, start, end: See attach_ratios.
+        :param max_workers: Maximum number of assets processed simultaneously.
+        :return: Dictionary of company names and their output file (None on error).
+        """
+
+        def add_one(company_name):
+            financial_data_path, ratios_path, kind = assets[company_name]
+            try:
+                merged_data = self.attach_ratios(
+                    pd.read_csv(financial_data_path),
+                    self.load_ratios(ratios_path, kind),
+                    how=how,
+                    max_staleness=max_staleness,
+                    start=start,
+                    end=end,
+                )
+                return self._save_file(merged_data, company_name)
+            except Exception as e:
+                print(f"An error occurred for {company_name}: {e}")
+                return None
+
+        for ratios_path, kind in {(path, kind) for _, path, kind in assets.values()}:
+            self.load_ratios(ratios_path, kind)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return dict(zip(assets, pool.map(add_one, assets)))
+
+    def add_put_call_ratio_us(
+        self, financial_data_path, ratios_path, company_name, end=US_RATIOS_END
+    ):
         """
         Adds the US Put-Call Ratio to financial data, aligning by date and filtering up to 31.01.2024.
 
         :param financial_data_path: Path to the financial data CSV file.
         :param ratios_path: Path to the US Put-Call Ratios CSV file.
         :param company_name: Name of the company for output file naming.
+        :param end: Last date kept (inclusive).
         """
         try:
-            financial_data = pd.read_csv(financial_data_path)
-            ratios_data = pd.read_csv(ratios_path)
-
-            financial_data["Date"] = pd.to_datetime(financial_data["Date"])
-            ratios_data["Date"] = pd.to_datetime(ratios_data["Date"])
-
-            financial_data = financial_data[financial_data["Date"] <= "2024-01-31"]
-            ratios_data = ratios_data[ratios_data["Date"] <= "2024-01-31"]
-
-            merged_data = pd.merge(
-                financial_data,
-                ratios_data[["Date", "Ratio Value"]],
-                on="Date",
-                how="inner",
+            merged_data = self.attach_ratios(
+                pd.read_csv(financial_data_path),
+                self.load_ratios(ratios_path, "us"),
+                end=end,
             )
-            merged_data["Ratio Value"] = merged_data["Ratio Value"].fillna(0)
-            merged_data.rename(columns={"Ratio Value": "Put-Call Ratio"}, inplace=True)
-
             self._save_file(merged_data, company_name)
 
         except Exception as e:
             print(f"An error occurred: {e}")
 
-    def add_put_call_ratio_eu(self, financial_data_path, ratios_path, company_name):
+    def add_put_call_ratio_eu(
+        self,
+        financial_data_path,
+        ratios_path,
+        company_name,
+        start=EU_RATIOS_START,
+        end=EU_RATIOS_END,
+    ):
         """
         Adds the EU Put-Call Ratio to financial data, aligning by date and filtering between 07.10.2019 and 31.01.2024.
 
         :param financial_data_path: Path to the financial data CSV file.
         :param ratios_path: Path to the EU Put-Call Ratios CSV file.
         :param company_name: Name of the company for output file naming.
+        :param start: First date kept (inclusive).
+        :param end: Last date kept (inclusive).
         """
         try:
-            financial_data = pd.read_csv(financial_data_path)
-            ratios_data = pd.read_csv(ratios_path)
-
-            financial_data["Date"] = pd.to_datetime(financial_data["Date"]).dt.strftime(
-                "%Y-%m-%d"
+            merged_data = self.attach_ratios(
+                pd.read_csv(financial_data_path),
+                self.load_ratios(ratios_path, "eu"),
+                start=start,
+                end=end,
             )
-            ratios_data["Date"] = pd.to_datetime(
-                ratios_data["Date"], format="%d/%m/%Y"
-            ).dt.strftime("%Y-%m-%d")
-
-            financial_data = financial_data[
-                (financial_data["Date"] >= "2019-10-07")
-                & (financial_data["Date"] <= "2024-01-31")
-            ]
-            ratios_data = ratios_data[
-                (ratios_data["Date"] >= "2019-10-07")
-                & (ratios_data["Date"] <= "2024-01-31")
-            ]
-
-            if ratios_data["Dernier"].dtype == "object":
-                ratios_data["Dernier"] = (
-                    ratios_data["Dernier"].str.replace(",", ".").astype(float)
-                )
-
-            merged_data = pd.merge(
-                financial_data, ratios_data[["Date", "Dernier"]], on="Date", how="inner"
-            )
-            merged_data["Dernier"].fillna(0, inplace=True)
-            merged_data.rename(columns={"Dernier": "Put-Call Ratio"}, inplace=True)
-
             self._save_file(merged_data, company_name)
 
         except Exception as e:
@@ -104,8 +239,9 @@ class PutCallRatioAdder:
         output_file = os.path.join(
             self.output_dir, f"{sanitized_company_name}_updated_financial_data.csv"
         )
-        data.to_csv(output_file, index=False)
+        data.to_csv(output_file, index=False, date_format="%Y-%m-%d")
         print(f"Updated file saved to: {output_file}")
+        return output_file
 
 
 # Example usage
@@ -0,0 +1,186 @@
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+RISK_FREE_RATE = 0.02
+
+
+class PerformanceAnalytics:
+    """
+    Performance metrics of many portfolios at once.
+
+    Daily returns are held as a (dates x portfolios) matrix and every metric
+    is computed column-wise in one pass. The cumulative, running peak and
+    drawdown series are computed once and cached.
+    """
+
+    def __init__(
+        self,
+        returns,
+        benchmark_returns=None,
+        weights=None,
+        turnover=None,
+        risk_free_rate=RISK_FREE_RATE,
+        periods_per_year=TRADING_DAYS,
+    ):
+        """
+        :param returns: Series or DataFrame of daily returns, one column per portfolio.
+        :param benchmark_returns: Series of benchmark daily returns, used by the
+            relative metrics (tracking error, information ratio).
+        :param weights: Dictionary of portfolios and their (dates x assets)
+            target weights DataFrame, used by the turnover when turnover is not given.
+        :param turnover: DataFrame of the daily traded fraction of each portfolio
+            (e.g. BacktestResult.turnover), used by the turnover.
+        :param risk_free_rate: Annual risk free rate.
+        :param periods_per_year: Number of return periods in a year.
+        """
+        if isinstance(returns, pd.Series):
+            returns = returns.to_frame(returns.name or "Portfolio")
+        self.returns = returns
+        self.benchmark_returns = benchmark_returns
+        self.weights = weights or {}
+        self.traded_turnover = turnover
+        self.risk_free_rate = risk_free_rate
+        self.periods_per_year = periods_per_year
+        self._values = returns.to_numpy(dtype=float)
+
+    def _series(self, values):
+        return pd.Series(values, index=self.returns.columns)
+
+    @cached_property
+    def cumulative(self):
+        """Growth of 1 invested, (dates x portfolios)."""
+        return pd.DataFrame(
+            np.cumprod(1 + self._values, axis=0),
+            index=self.returns.index,
+            columns=self.returns.columns,
+        )
+
+    @cached_property
+    def running_peak(self):
+        return np.maximum.accumulate(self.cumulative.to_numpy(), axis=0)
+
+    @cached_property
+    def drawdowns(self):
+        """Relative distance to the previous peak, 0 at a new high."""
+        return pd.DataFrame(
+            self.cumulative.to_numpy() / self.running_peak - 1,
+            index=self.returns.index,
+            columns=self.returns.columns,
+        )
+
+    def cagr(self):
+        if len(self._values) == 0:
+            return self._series(np.nan)
+        years = max(1, len(self._values) / self.periods_per_year)
+        return self.cumulative.iloc[-1] ** (1 / years) - 1
+
+    def volatility(self):
+        return self.returns.std() * np.sqrt(self.periods_per_year)
+
+    def sharpe(self):
+        return (self.cagr() - self.risk_free_rate) / self.volatility()
+
+    def annualized_sharpe(self):
+        """
+        Mean daily excess return over its standard deviation, annualized by
+        periods_per_year. Unlike sharpe, suited to periods shorter than a year.
+        """
+        excess = self.returns - self.risk_free_rate / self.periods_per_year
+        return excess.mean() / excess.std() * np.sqrt(self.periods_per_year)
+
+    def sortino(self):
+        """Excess CAGR over the annualized downside deviation (target 0)."""
+        downside = np.sqrt(np.nanmean(np.minimum(self._values, 0) ** 2, axis=0))
+        return (self.cagr() - self.risk_free_rate) / self._series(
+            downside * np.sqrt(self.periods_per_year)
+        )
+
+    def max_drawdown(self):
+        return self.drawdowns.min()
+
+    def max_drawdown_duration(self):
+        """Longest number of periods spent below a previous peak."""
+        cumulative = self.cumulative.to_numpy()
+        if len(cumulative) == 0:
+            return self._series(0)
+        periods = np.arange(len(cumulative))[:, None]
+        last_peak = np.maximum.accumulate(
+            np.where(cumulative >= self.running_peak, periods, 0), axis=0
+        )
+        return self._series((periods - last_peak).max(axis=0))
+
+    def calmar(self):
+        return self.cagr() / self.max_drawdown().abs()
+
+    def rolling_sharpe(self, window=63):
+        """Annualized Sharpe ratio of the daily excess returns over a rolling window."""
+        excess = self.returns - self.risk_free_rate / self.periods_per_year
+        rolling = excess.rolling(window)
+        return rolling.mean() / rolling.std() * np.sqrt(self.periods_per_year)
+
+    def turnover(self):
+        """
+        Annualized one-way turnover: half the daily traded fraction, averaged
+        and scaled to a year. The traded fraction is the one of the backtest
+        (trades from the drifted weights) when given, otherwise the sum of the
+        absolute changes of the target weights (NaN without either).
+        """
+        values = {}
+        for portfolio in self.returns.columns:
+            if (
+                self.traded_turnover is not None
+                and portfolio in self.traded_turnover.columns
+            ):
+                traded = self.traded_turnover[portfolio].to_numpy(dtype=float)
+                values[portfolio] = np.nanmean(traded) / 2 * self.periods_per_year
+                continue
+            weights = self.weights.get(portfolio)
+            if weights is None or len(weights) < 2:
+                values[portfolio] = np.nan
+                continue
+            changes = np.abs(np.diff(weights.to_numpy(dtype=float), axis=0)).sum(axis=1)
+            values[portfolio] = changes.mean() / 2 * self.periods_per_year
+        return pd.Series(values)
+
+    def _active_returns(self):
+        benchmark = self.benchmark_returns.reindex(self.returns.index)
+        return self.returns.sub(benchmark, axis=0).dropna(how="all")
+
+    def tracking_error(self):
+        if self.benchmark_returns is None:
+            return self._series(np.nan)
+        return self._active_returns().std() * np.sqrt(self.periods_per_year)
+
+    def information_ratio(self):
+        if self.benchmark_returns is None:
+            return self._series(np.nan)
+        active = self._active_returns()
+        return active.mean() * self.periods_per_year / self.tracking_error()
+
+    def metrics(self, rolling_window=63):
+        """
+        All the metrics, one row per metric and one column per portfolio.
+        The rolling Sharpe ratio is summarized by its last value.
+        """
+        return pd.DataFrame(
+            {
+                "CAGR": self.cagr(),
+                "Volatility": self.volatility(),
+                "Sharpe Ratio": self.sharpe(),
+                "Sortino Ratio": self.sortino(),
+                "Max Drawdown": self.max_drawdown(),
+                "Max Drawdown Duration": self.max_drawdown_duration(),
+                "Calmar Ratio": self.calmar(),
+                f"Rolling Sharpe ({rolling_window}d, last)": (
+                    self.rolling_sharpe(rolling_window).iloc[-1]
+                    if len(self.returns)
+                    else self._series(np.nan)
+                ),
+                "Turnover": self.turnover(),
+                "Tracking Error": self.tracking_error(),
+                "Information Ratio": self.information_ratio(),
+            }
+        ).T
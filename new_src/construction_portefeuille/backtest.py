@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+
+def load_returns(stock_files):
+    """
+    'Daily Return' of every asset as one (dates x assets) DataFrame, keeping
+    the dates present in every file.
+
+    :param stock_files: Dictionary of asset keys and their CSV file.
+    """
+    return pd.concat(
+        {
+            asset: pd.read_csv(
+                path, usecols=["Date", "Daily Return"], parse_dates=["Date"]
+            ).set_index("Date")["Daily Return"]
+            for asset, path in stock_files.items()
+        },
+        axis=1,
+        join="inner",
+    ).sort_index()
+
+
+class BacktestResult:
+    """Gross and net daily returns, equity curves, turnover and costs per scenario."""
+
+    def __init__(self, dates, scenarios, gross_returns, turnover, costs):
+        self.gross_returns = pd.DataFrame(
+            gross_returns.T, index=dates, columns=scenarios
+        )
+        self.net_returns = pd.DataFrame(
+            (gross_returns - costs).T, index=dates, columns=scenarios
+        )
+        self.turnover = pd.DataFrame(turnover.T, index=dates, columns=scenarios)
+        self.costs = pd.DataFrame(costs.T, index=dates, columns=scenarios)
+
+    @property
+    def gross_equity(self):
+        return (1 + self.gross_returns).cumprod()
+
+    @property
+    def net_equity(self):
+        return (1 + self.net_returns).cumprod()
+
+
+class Backtest:
+    """
+    Applies portfolio weights to asset returns with an execution lag and
+    trading costs, for many weight scenarios at once.
+
+    The weights decided on day t (e.g. ConstructPortfolio.weight_data, built
+    from day t's put-call ratios) are held over the returns of day
+    t + execution_lag. Before the first executed weights the portfolio is in
+    cash. Each day the portfolio is rebalanced from the weights drifted by
+    the previous day's returns to its target weights and pays
+    proportional_cost on the traded fraction (sum of |weight changes|, the
+    initial purchase included) plus fixed_cost per asset whose target weight
+    changed, both as a fraction of equity.
+    """
+
+    def __init__(self, returns, execution_lag=1, proportional_cost=0.0, fixed_cost=0.0):
+        """
+        :param returns: (dates x assets) DataFrame of daily returns (see load_returns).
+        :param execution_lag: Number of days between a decision and its execution.
+        :param proportional_cost: Cost per unit of traded weight (0.001 = 10 bps).
+        :param fixed_cost: Cost per change of an asset's target weight, as a
+            fraction of equity.
+        """
+        if execution_lag < 0:
+            raise ValueError("execution_lag must be positive or zero.")
+        self.returns = returns
+        self.execution_lag = execution_lag
+        self.proportional_cost = proportional_cost
+        self.fixed_cost = fixed_cost
+        self._returns_matrix = np.nan_to_num(returns.to_numpy(dtype=float))
+
+    def _weights_matrix(self, weights):
+        """(dates x assets) matrix of a weights DataFrame aligned on the returns."""
+        weights = weights.rename(
+            columns=lambda column: (
+                column[: -len("_Weight")] if column.endswith("_Weight") else column
+            )
+        )
+        missing = set(self.returns.columns) - set(weights.columns)
+        if missing:
+            raise ValueError(f"No weights for {sorted(missing)}")
+        weights = weights.copy()
+        weights.index = pd.to_datetime(weights.index)
+        # decisions are carried to the return dates, none before the first one
+        aligned = (
+            weights[list(self.returns.columns)]
+            .reindex(weights.index.union(self.returns.index))
+            .ffill()
+            .reindex(self.returns.index)
+        )
+        return np.nan_to_num(aligned.to_numpy(dtype=float))
+
+    def run(self, weights):
+        """
+        :param weights: One weights DataFrame (dates x assets, columns named by
+            asset or "<asset>_Weight") or a dictionary of scenarios and weights.
+        :return: BacktestResult with one column per scenario.
+        """
+        if isinstance(weights, pd.DataFrame):
+            weights = {"Portfolio": weights}
+        scenarios = list(weights)
+        targets = np.stack([self._weights_matrix(weights[s]) for s in scenarios])
+        return self.run_array(targets, scenarios)
+
+    def run_array(self, targets, scenarios=None):
+        """
+        Backtest of target weights already aligned on the returns, without any
+        pandas alignment (for optimization loops).
+
+        :param targets: (scenarios x dates x assets) array of target weights.
+        :param scenarios: Names of the scenarios, by default their position.
+        :return: BacktestResult with one column per scenario.
+        """
+        targets = np.nan_to_num(np.asarray(targets, dtype=float))
+        held = np.zeros_like(targets)
+        if self.execution_lag < targets.shape[1]:
+            held[:, self.execution_lag :] = targets[
+                :, : targets.shape[1] - self.execution_lag
+            ]
+
+        gross_returns = np.einsum("sta,ta->st", held, self._returns_matrix)
+
+        # weights drifted by day t's returns, w * (1 + r) / (1 + r_p), which
+        # day t + 1's rebalancing trades from (the cash part has no return)
+        growth = 1 + gross_returns[:, :, None]
+        drifted = np.divide(
+            held * (1 + self._returns_matrix),
+            growth,
+            out=np.zeros_like(held),
+            where=growth != 0,
+        )
+        previous = np.concatenate([np.zeros_like(held[:, :1]), drifted[:, :-1]], axis=1)
+        turnover = np.abs(held - previous).sum(axis=2)
+        # the fixed cost is paid on the orders, i.e. when an asset's target
+        # weight changes, not on the small trades that undo the drift
+        orders = np.diff(held, axis=1, prepend=0) != 0
+        costs = self.proportional_cost * turnover + self.fixed_cost * orders.sum(axis=2)
+
+        return BacktestResult(
+            self.returns.index,
+            scenarios if scenarios is not None else list(range(len(targets))),
+            gross_returns,
+            turnover,
+            costs,
+        )
@@ -1,5 +1,62 @@
+import numpy as np
 import pandas as pd
 
+SIGNAL_LABELS = {1: "Buy", -1: "Sell", 0: "Hold"}
+
+
+def signal_codes(put_call_ratios, bullish_threshold, bearish_threshold):
+    """
+    Buy (1), Sell (-1) or Hold (0) codes of ConstructPortfolio._generate_signals.
+
+    put_call_ratios: array whose axis -2 is time (dates x assets), thresholds
+    broadcast against the other axes, so a leading axis of thresholds gives
+    the signals of many threshold pairs in one pass
+    """
+    put_call_ratios = np.asarray(put_call_ratios, dtype=float)
+    bullish = np.asarray(bullish_threshold, dtype=float)
+    bearish = np.asarray(bearish_threshold, dtype=float)
+
+    first = put_call_ratios[..., 0, :]
+    shape = np.broadcast_shapes(first.shape, bullish.shape, bearish.shape)
+    streak = np.zeros(shape)
+    codes = np.zeros(shape[:-1] + put_call_ratios.shape[-2:], dtype=np.int8)
+    for t in range(put_call_ratios.shape[-2]):
+        ratio = put_call_ratios[..., t, :]
+        bullish_day = ratio < bullish
+        bearish_day = ratio > bearish
+        streak = np.where(bullish_day, streak + 1, np.where(bearish_day, streak - 1, 0))
+        codes[..., t, :] = np.where(streak >= 3, 1, np.where(streak <= -3, -1, 0))
+    return codes
+
+
+def dynamic_weights(codes, max_weight=0.40, min_weight=0.05):
+    """
+    Weights of ConstructPortfolio.calculate_dynamic_portfolio_weights from the
+    signal codes (see signal_codes), all assets (and threshold pairs) at once.
+
+    Equal weights on the first day, then a Buy raises the previous weight by
+    10% (max max_weight), a Sell lowers it by 10% (min min_weight), and the
+    weights are normalized to sum to 1.
+    """
+    codes = np.asarray(codes)
+    weights = np.empty(codes.shape)
+    if codes.shape[-2] == 0:
+        return weights
+    weights[..., 0, :] = 1 / codes.shape[-1]
+    for t in range(1, codes.shape[-2]):
+        previous = weights[..., t - 1, :]
+        new_weights = np.where(
+            codes[..., t, :] == 1,
+            np.minimum(previous * 1.1, max_weight),
+            np.where(
+                codes[..., t, :] == -1,
+                np.maximum(previous * 0.90, min_weight),
+                previous,
+            ),
+        )
+        weights[..., t, :] = new_weights / new_weights.sum(axis=-1, keepdims=True)
+    return weights
+
 
 class ConstructPortfolio:
     """
@@ -37,6 +94,13 @@ class ConstructPortfolio:
         merged_data.set_index("Date", inplace=True)
         self.merged_data = merged_data
 
+    def load_market_panel(self, panel):
+        """
+        Takes the 'Put-Call Ratio' of the stocks from a MarketPanel instead of
+        their CSV files (same dates as merge_put_call_ratios, sorted).
+        """
+        self.merged_data = panel.frame("Put-Call Ratio", self.stock_names)
+
     def calculate_signals(self, bullish_threshold, bearish_threshold):
         """
         Calculates trading signals based on Put-Call Ratio.
@@ -60,23 +124,12 @@ class ConstructPortfolio:
         """
         Generates buy/sell/hold signals based on Put-Call Ratio trends.
         """
-        streak = 0
-        signals = []
-        for ratio in put_call_ratios:
-            if ratio < bullish_threshold:
-                streak += 1
-            elif ratio > bearish_threshold:
-                streak -= 1
-            else:
-                streak = 0  # Reset for neutral
-
-            if streak >= 3:
-                signals.append("Buy")
-            elif streak <= -3:
-                signals.append("Sell")
-            else:
-                signals.append("Hold")
-        return signals
+        codes = signal_codes(
+            np.asarray(put_call_ratios, dtype=float)[:, None],
+            bullish_threshold,
+            bearish_threshold,
+        )[:, 0]
+        return [SIGNAL_LABELS[code] for code in codes]
 
     def calculate_dynamic_portfolio_weights(self):
         """
@@ -88,45 +141,17 @@ class ConstructPortfolio:
                 "Signal data is not available. Run calculate_signals first."
             )
 
-        initial_weight = 1 / len(self.stock_names)
-        weight_data = pd.DataFrame(index=self.signal_data.index)
-
-        for stock in self.stock_names:
-            weight_data[f"{stock}_Weight"] = initial_weight
-
-        for i in range(1, len(weight_data)):
-            total_weight = 0
-            for stock in self.stock_names:
-                prev_weight = weight_data.iloc[
-                    i - 1, weight_data.columns.get_loc(f"{stock}_Weight")
-                ]
-                signal = self.signal_data.iloc[
-                    i, self.signal_data.columns.get_loc(f"{stock}_Signal")
-                ]
-
-                if signal == "Buy":
-                    new_weight = min(
-                        prev_weight * 1.1, 0.40
-                    )  # Increase by 10%, max 40% (before normalization)
-                elif signal == "Sell":
-                    new_weight = max(
-                        prev_weight * 0.90, 0.05
-                    )  # Decrease by 10%, min 5% (before normalization)
-                else:
-                    new_weight = prev_weight  # Hold
-
-                weight_data.iloc[i, weight_data.columns.get_loc(f"{stock}_Weight")] = (
-                    new_weight
-                )
-                total_weight += new_weight
-
-            # Normalize weights to ensure the total portfolio sums to 1
-            for stock in self.stock_names:
-                weight_data.iloc[
-                    i, weight_data.columns.get_loc(f"{stock}_Weight")
-                ] /= total_weight
-
-        self.weight_data = weight_data
+        codes = np.zeros((len(self.signal_data), len(self.stock_names)), dtype=np.int8)
+        for j, stock in enumerate(self.stock_names):
+            signals = self.signal_data[f"{stock}_Signal"].to_numpy()
+            codes[signals == "Buy", j] = 1
+            codes[signals == "Sell", j] = -1
+
+        self.weight_data = pd.DataFrame(
+            dynamic_weights(codes),
+            index=self.signal_data.index,
+            columns=[f"{stock}_Weight" for stock in self.stock_names],
+        )
 
     def save_weights_to_csv(self, file_path):
         """
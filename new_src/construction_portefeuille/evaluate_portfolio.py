@@ -1,149 +1,231 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import yfinance as yf
+
+from analytics import RISK_FREE_RATE, PerformanceAnalytics
+from backtest import Backtest
+from market_data import default_provider
 
 
 class EvaluatePortfolio:
     """A class for analyzing portfolio performance against a benchmark."""
 
-    def __init__(self, stock_files, portfolio_weights_path, benchmark_ticker="XLE"):
+    def __init__(
+        self,
+        stock_files,
+        portfolio_weights_path,
+        benchmark_ticker="XLE",
+        data_provider=None,
+        weight_columns=None,
+        metrics_path=None,
+        market_panel=None,
+        execution_lag=0,
+        proportional_cost=0.0,
+        fixed_cost=0.0,
+    ):
+        """
+        :param stock_files: Dictionary of asset keys and their CSV file
+            (with 'Date' and 'Daily Return' columns).
+        :param portfolio_weights_path: CSV file of the daily weights.
+        :param benchmark_ticker: Ticker of the benchmark.
+        :param data_provider: Source of the benchmark prices.
+        :param weight_columns: Dictionary of asset keys and their weight column,
+            by default "<asset>_Weight" or the only "<asset>_..._Weight" column.
+        :param metrics_path: CSV file where the performance metrics are saved,
+            None to keep them in memory only.
+        :param market_panel: MarketPanel holding the 'Daily Return' of the
+            assets, read instead of stock_files.
+        :param execution_lag: Number of days between a weight and the returns
+            it is applied to (see Backtest).
+        :param proportional_cost: Cost per unit of traded weight.
+        :param fixed_cost: Cost per traded asset and day, as a fraction of equity.
+        """
         self.stock_files = stock_files
         self.portfolio_weights_path = portfolio_weights_path
         self.benchmark_ticker = benchmark_ticker
+        self.weight_columns = weight_columns or {}
+        self.metrics_path = metrics_path
+        self.market_panel = market_panel
+        self.execution_lag = execution_lag
+        self.proportional_cost = proportional_cost
+        self.fixed_cost = fixed_cost
+        # benchmark prices come from the on-disk cache, fetched only when missing
+        self.data_provider = data_provider or default_provider()
         self.stock_data = {}
         self.full_data = None
+        self.stock_returns = None
+        self.stock_weights = None
         self.daily_portfolio_returns = None
+        self.backtest_result = None
         self.benchmark_returns = None
+        self.portfolio_analytics = None
+        self.benchmark_analytics = None
         self.performance_metrics = None
 
-    def load_data(self):
-        """Load stock and portfolio weight data."""
-        portfolio_weights_df = pd.read_csv(self.portfolio_weights_path)
-        portfolio_weights_df["Date"] = pd.to_datetime(portfolio_weights_df["Date"])
+    @classmethod
+    def from_frames(cls, stock_returns, stock_weights, **options):
+        """
+        Evaluator of returns and weights already in memory, load_data keeps them.
 
-        self.stock_data = {}
+        :param stock_returns: (dates x assets) DataFrame of daily returns.
+        :param stock_weights: (dates x assets) DataFrame of weights, with the
+            same asset columns, aligned on the return dates they share.
+        :param options: Other EvaluatePortfolio arguments (benchmark_ticker,
+            data_provider, execution_lag, costs...).
+        """
+        assets = list(stock_returns.columns)
+        evaluator = cls(dict.fromkeys(assets), None, **options)
+        dates = stock_returns.index.intersection(stock_weights.index).sort_values()
+        evaluator.stock_returns = stock_returns.loc[dates, assets]
+        evaluator.stock_weights = stock_weights.loc[dates, assets]
+        evaluator.full_data = evaluator.stock_returns.join(
+            evaluator.stock_weights.add_suffix("_Weight")
+        )
+        evaluator.full_data.index.name = "Date"
+        return evaluator
 
-        for ticker, path in self.stock_files.items():
-            df = pd.read_csv(path, parse_dates=["Date"])
-            self.stock_data[ticker] = df[["Date", "Daily Return"]]
+    def _weight_column(self, asset, columns):
+        """Weight column of an asset key in the weights file."""
+        if asset in self.weight_columns:
+            return self.weight_columns[asset]
+        if f"{asset}_Weight" in columns:
+            return f"{asset}_Weight"
+        candidates = [
+            column
+            for column in columns
+            if column.startswith(f"{asset}_") and column.endswith("_Weight")
+        ]
+        if len(candidates) != 1:
+            raise ValueError(
+                f"No single weight column for {asset}: {candidates or 'none'}, "
+                "pass it in weight_columns."
+            )
+        return candidates[0]
 
-        merged_stock_data = list(self.stock_data.values())[0]
-        for ticker, df in self.stock_data.items():
-            if ticker != "BHP":  # Skip the first since it's already initialized
-                merged_stock_data = merged_stock_data.merge(
-                    df, on="Date", how="inner", suffixes=("", f"_{ticker}")
+    def load_data(self):
+        """
+        Load stock returns and portfolio weights as aligned (dates x assets)
+        panels, keeping the dates present in every file. Nothing is read for
+        an evaluator made by from_frames.
+        """
+        if self.portfolio_weights_path is None and self.full_data is not None:
+            return
+
+        portfolio_weights_df = pd.read_csv(
+            self.portfolio_weights_path, parse_dates=["Date"], index_col="Date"
+        )
+
+        if self.market_panel is not None:
+            stock_returns = self.market_panel.frame(
+                "Daily Return", list(self.stock_files), how="all"
+            )
+        else:
+            self.stock_data = {
+                ticker: pd.read_csv(
+                    path, usecols=["Date", "Daily Return"], parse_dates=["Date"]
                 )
+                for ticker, path in self.stock_files.items()
+            }
+
+            # one aligned concat of all the return series
+            stock_returns = pd.concat(
+                {
+                    ticker: df.set_index("Date")["Daily Return"]
+                    for ticker, df in self.stock_data.items()
+                },
+                axis=1,
+                join="inner",
+            )
 
-        column_mapping = {
-            "Daily Return": "BHP",
-            "Daily Return_BP": "BP",
-            "Daily Return_FMC": "FMC",
-            "Daily Return_Stora_Enso": "Stora_Enso",
-            "Daily Return_Total_Energies": "Total_Energies",
-        }
+        self.full_data = stock_returns.join(portfolio_weights_df, how="inner")
+        self.full_data.sort_index(inplace=True)
+        self.full_data.index.name = "Date"
 
-        self.full_data = merged_stock_data.merge(
-            portfolio_weights_df, on="Date", how="inner"
+        weight_columns = [
+            self._weight_column(ticker, portfolio_weights_df.columns)
+            for ticker in self.stock_files
+        ]
+        self.stock_returns = self.full_data[list(self.stock_files)]
+        self.stock_weights = self.full_data[weight_columns].set_axis(
+            list(self.stock_files), axis=1
         )
-        self.full_data.rename(columns=column_mapping, inplace=True)
-        self.full_data.set_index("Date", inplace=True)
 
     def extract_stock_returns_and_weights(self):
         """
         Extracts stock returns and corresponding portfolio weights from the dataset.
 
-        :return: Tuple of DataFrames (stock_returns, stock_weights)
+        :return: Tuple of DataFrames (stock_returns, stock_weights), one column
+            per asset key
         """
-        available_stocks = [
-            col for col in self.stock_files.keys() if col in self.full_data.columns
-        ]
-
-        returns_columns = ["BHP", "BP", "FMC", "Stora_Enso", "Total_Energies"]
-        weights_columns = [
-            "BHP_Group_Weight",
-            "BP_PLC_Weight",
-            "FMC_Corp_Weight",
-            "Stora_Enso_Weight",
-            "Total_Energies_Weight",
-        ]
-
-        stock_returns = self.full_data[returns_columns]
-        stock_weights = self.full_data[weights_columns]
-        stock_weights.columns = returns_columns
-
-        return stock_returns, stock_weights
+        return self.stock_returns, self.stock_weights
 
     def compute_daily_portfolio_returns(self):
         """
-        Computes daily weighted portfolio returns.
+        Computes daily weighted portfolio returns, net of the trading costs,
+        with the weights applied execution_lag days later (see Backtest).
 
         :return: Series representing daily portfolio returns.
         """
         stock_returns, stock_weights = self.extract_stock_returns_and_weights()
-        daily_portfolio_returns = (stock_returns * stock_weights).sum(axis=1)
-        return daily_portfolio_returns
+        backtest = Backtest(
+            stock_returns,
+            execution_lag=self.execution_lag,
+            proportional_cost=self.proportional_cost,
+            fixed_cost=self.fixed_cost,
+        )
+        # kept for the turnover, which is the one actually traded
+        self.backtest_result = backtest.run(stock_weights)
+        daily_portfolio_returns = self.backtest_result.net_returns["Portfolio"]
+        return daily_portfolio_returns.rename(None)
 
     def fetch_benchmark_data(self):
         """Fetch and process benchmark data."""
-        benchmark_data = yf.download(
+        benchmark_data = self.data_provider.history(
             self.benchmark_ticker,
             start=self.full_data.index.min(),
             end=self.full_data.index.max(),
         )
-        benchmark_prices = (
-            benchmark_data["Close"].reindex(self.full_data.index).fillna(method="ffill")
-        )
+        benchmark_prices = benchmark_data["Close"].reindex(self.full_data.index).ffill()
         self.benchmark_returns = benchmark_prices.pct_change().dropna()
 
     def compute_performance_metrics(self):
-        """Compute portfolio and benchmark performance metrics."""
-        cumulative_portfolio_returns = (1 + self.daily_portfolio_returns).cumprod()
-        cumulative_benchmark_returns = (1 + self.benchmark_returns).cumprod()
-
-        portfolio_volatility = self.daily_portfolio_returns.std() * np.sqrt(252)
-        benchmark_volatility = self.benchmark_returns.std() * np.sqrt(252)
-
-        portfolio_cagr = (cumulative_portfolio_returns.iloc[-1]) ** (
-            1 / max(1, (len(self.daily_portfolio_returns) / 252))
-        ) - 1
-        benchmark_cagr = (
-            (cumulative_benchmark_returns.iloc[-1])
-            ** (1 / max(1, (len(self.benchmark_returns) / 252)))
-            - 1
-            if not cumulative_benchmark_returns.empty
-            else np.nan
+        """
+        Compute portfolio and benchmark performance metrics (see analytics).
+        Relative metrics and turnover only apply to the portfolio.
+        """
+        traded_turnover = (
+            self.backtest_result.turnover if self.backtest_result is not None else None
         )
-
-        RISK_FREE_RATE = 0.02
-
-        portfolio_sharpe = (portfolio_cagr - RISK_FREE_RATE) / portfolio_volatility
-        benchmark_sharpe = (benchmark_cagr - RISK_FREE_RATE) / benchmark_volatility
-
-        self.performance_metrics = pd.DataFrame(
-            {
-                "Metric": [
-                    "CAGR",
-                    "Volatility",
-                    "Sharpe Ratio",
-                ],
-                "Portfolio": [portfolio_cagr, portfolio_volatility, portfolio_sharpe],
-                "Benchmark (SPN/XLE)": [
-                    benchmark_cagr,
-                    benchmark_volatility,
-                    benchmark_sharpe,
-                ],
-            }
+        self.portfolio_analytics = PerformanceAnalytics(
+            self.daily_portfolio_returns.rename("Portfolio"),
+            benchmark_returns=self.benchmark_returns,
+            weights={"Portfolio": self.stock_weights},
+            turnover=traded_turnover,
+            risk_free_rate=RISK_FREE_RATE,
         )
-
-        self.performance_metrics.to_csv(
-            "new_output/portfolio/performance_metrics.csv", index=False
+        self.benchmark_analytics = PerformanceAnalytics(
+            self.benchmark_returns.rename("Benchmark (SPN/XLE)"),
+            risk_free_rate=RISK_FREE_RATE,
         )
+        metrics = pd.concat(
+            [self.portfolio_analytics.metrics(), self.benchmark_analytics.metrics()],
+            axis=1,
+        )
+        for metric in ["Turnover", "Tracking Error", "Information Ratio"]:
+            metrics.loc[metric, "Benchmark (SPN/XLE)"] = np.nan
+
+        self.performance_metrics = metrics.rename_axis("Metric").reset_index()
+
+        if self.metrics_path:
+            self.performance_metrics.to_csv(self.metrics_path, index=False)
 
     def plot_performance(self):
         """Plot cumulative returns of the portfolio vs. the benchmark."""
-        cumulative_portfolio_returns = (1 + self.daily_portfolio_returns).cumprod()
-        cumulative_benchmark_returns = (1 + self.benchmark_returns).cumprod()
+        # cumulative series cached by compute_performance_metrics
+        cumulative_portfolio_returns = self.portfolio_analytics.cumulative["Portfolio"]
+        cumulative_benchmark_returns = self.benchmark_analytics.cumulative[
+            "Benchmark (SPN/XLE)"
+        ]
 
         plt.figure(figsize=(10, 5))
         plt.plot(cumulative_portfolio_returns, label="Portfolio", linewidth=2)
@@ -178,6 +260,10 @@ if __name__ == "__main__":
     }
     portfolio_weights_path = "new_output/portfolio/portfolio_weights.csv"
 
-    analyzer = EvaluatePortfolio(stock_files, portfolio_weights_path)
+    analyzer = EvaluatePortfolio(
+        stock_files,
+        portfolio_weights_path,
+        metrics_path="new_output/portfolio/performance_metrics.csv",
+    )
     metrics = analyzer.run_analysis()
     print(metrics)
@@ -1,34 +1,43 @@
-import yfinance as yf
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
 import pandas as pd
 
+from market_data import default_provider
+
 
 class FinancialDataFetcher:
     """
     A class to fetch financial data for given stock symbols over a specified date range.
     """
 
-    def __init__(self, symbols, start_date, end_date):
+    def __init__(self, symbols, start_date, end_date, data_provider=None):
         """
         Initialize the FinancialDataFetcher with stock symbols and date range.
 
         :param symbols: Dictionary of company names and their stock symbols
         :param start_date: Start date for fetching data (YYYY-MM-DD)
         :param end_date: End date for fetching data (YYYY-MM-DD)
+        :param data_provider: Source of the price history, by default Yahoo
+            Finance behind the on-disk cache (see market_data)
         """
         self.symbols = symbols
         self.start_date = start_date
         self.end_date = end_date
+        self.data_provider = data_provider or default_provider()
 
-    def get_financial_data(self, symbol):
+    def _fetch_history(self, symbol, end=None):
         """
-        Fetch financial data for a given stock symbol.
+        Raw price history of a symbol, None if empty or on error.
 
-        :param symbol: Stock symbol to fetch data for
-        :return: DataFrame containing 'Close' prices and 'Daily Return' values
+        :param end: End of the history (excluded), by default end_date
         """
         try:
-            stock = yf.Ticker(symbol)
-            data = stock.history(start=self.start_date, end=self.end_date)
+            data = self.data_provider.history(
+                symbol, self.start_date, self.end_date if end is None else end
+            )
 
             if data.empty:
                 return None
@@ -36,35 +45,221 @@ class FinancialDataFetcher:
             if data["Close"].isnull().any():
                 print(f"Des valeurs manquantes trouvées dans 'Close' pour {symbol}")
 
-            data["Daily Return"] = data["Close"].pct_change()
-
-            if pd.isna(data["Daily Return"].iloc[0]):
-                data.at[data.index[0], "Daily Return"] = 0.0
-
-            return data[["Close", "Daily Return"]]
+            return data
 
         except Exception as e:
             print(f"Erreur avec {symbol}: {e}")
             return None
 
-    def export_to_csv(self, output_folder="new_data/stock_infos"):
+    @staticmethod
+    def compute_daily_returns(histories):
+        """
+        'Daily Return' of every symbol in one vectorized step.
+
+        Missing closes are carried forward and the first return of each
+        symbol is 0.0.
+
+        :param histories: Dictionary of symbols and their price history
+        :return: Dictionary of symbols and DataFrames with 'Close' and 'Daily Return'
+        """
+        if not histories:
+            return {}
+
+        closes = pd.concat(
+            {symbol: data["Close"] for symbol, data in histories.items()},
+            names=["Symbol", "Date"],
+        )
+        by_symbol = closes.groupby(level="Symbol", sort=False)
+        filled = by_symbol.ffill()
+        daily_returns = filled / filled.groupby(level="Symbol", sort=False).shift(1) - 1
+        daily_returns = daily_returns.mask(by_symbol.cumcount() == 0, 0.0)
+
+        financial_data = pd.DataFrame({"Close": closes, "Daily Return": daily_returns})
+        return {
+            symbol: financial_data.xs(symbol, level="Symbol") for symbol in histories
+        }
+
+    def get_financial_data(self, symbol):
+        """
+        Fetch financial data for a given stock symbol.
+
+        :param symbol: Stock symbol to fetch data for
+        :return: DataFrame containing 'Close' prices and 'Daily Return' values
+        """
+        data = self._fetch_history(symbol)
+        if data is None:
+            return None
+        return self.compute_daily_returns({symbol: data})[symbol]
+
+    def get_all_financial_data(self, max_workers=8):
+        """
+        Fetch financial data for all symbols concurrently.
+
+        :param max_workers: Maximum number of simultaneous downloads
+        :return: Dictionary of symbols and their financial data (symbols
+            without data are left out)
+        """
+        symbols = list(dict.fromkeys(self.symbols.values()))
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(symbols)))
+        ) as pool:
+            histories = dict(zip(symbols, pool.map(self._fetch_history, symbols)))
+
+        return self.compute_daily_returns(
+            {symbol: data for symbol, data in histories.items() if data is not None}
+        )
+
+    @staticmethod
+    def _csv_path(company, output_folder):
+        return f"{output_folder}/{company.replace(' ', '_')}_financial_data.csv"
+
+    def _write_csv(self, company, data, output_folder, append=False):
+        data = data.copy()
+        data.index = data.index.strftime("%Y-%m-%d")
+        file_name = self._csv_path(company, output_folder)
+        if append:
+            data.to_csv(file_name, mode="a", header=False, index=True)
+        else:
+            data.to_csv(file_name, index=True, index_label="Date")
+        return file_name
+
+    def export_to_csv(self, output_folder="new_data/stock_infos", max_workers=8):
         """
         Fetch and save financial data for all symbols in CSV format.
 
+        Symbols are downloaded concurrently and the files written in parallel.
+
         :param output_folder: Directory where CSV files should be saved
+        :param max_workers: Maximum number of simultaneous downloads and writes
         """
-        for company, symbol in self.symbols.items():
-            data = self.get_financial_data(symbol)
-            if data is not None:
-                data.index = data.index.strftime("%Y-%m-%d")
-                file_name = (
-                    f"{output_folder}/{company.replace(' ', '_')}_financial_data.csv"
-                )
-                data.to_csv(file_name, index=True)
+        financial_data = self.get_all_financial_data(max_workers=max_workers)
+
+        companies = [
+            company
+            for company, symbol in self.symbols.items()
+            if symbol in financial_data
+        ]
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(companies)))
+        ) as pool:
+            file_names = pool.map(
+                lambda company: self._write_csv(
+                    company, financial_data[self.symbols[company]], output_folder
+                ),
+                companies,
+            )
+            for company, file_name in zip(companies, file_names):
                 print(f"Fichier CSV généré pour {company} : {file_name}")
-            else:
+
+        for company, symbol in self.symbols.items():
+            if symbol not in financial_data:
                 print(f"Aucune donnée disponible pour {company}.")
 
+    @staticmethod
+    def _history_revised(stored, fetched, last_date, rtol):
+        """
+        True if the fetched bars no longer match the stored ones on the
+        overlapping days (adjusted prices revised by a split or a dividend),
+        or if a split or a dividend happens after the last stored day.
+        """
+        overlap = stored["Close"].reindex(fetched.index).dropna()
+        if not np.allclose(
+            overlap, fetched.loc[overlap.index, "Close"], rtol=rtol, equal_nan=True
+        ):
+            return True
+
+        events = [c for c in ("Stock Splits", "Dividends") if c in fetched.columns]
+        new_bars = fetched.index > last_date
+        return bool((fetched.loc[new_bars, events].fillna(0) != 0).any().any())
+
+    def refresh_symbol(self, company, output_folder, overlap=5, rtol=1e-6, end=None):
+        """
+        Bring the CSV file of one company up to date.
+
+        Only the bars after the last stored date (plus `overlap` stored bars,
+        to check that the history was not revised) are fetched. 'Daily Return'
+        is computed at the seam from the last stored close and the new rows are
+        appended. A missing file, a split or a dividend revision trigger a full
+        refetch of the symbol.
+
+        :param end: End of the fetched bars (excluded), by default today:
+            today's bar is still open and is left for the next refresh
+        :return: "full", "appended", "up to date" or "no data"
+        """
+        symbol = self.symbols[company]
+        end = date.today() if end is None else end
+        file_name = self._csv_path(company, output_folder)
+
+        try:
+            stored = pd.read_csv(file_name, parse_dates=["Date"], index_col="Date")
+        except FileNotFoundError:
+            stored = None
+
+        if stored is not None and not stored.empty:
+            last_date = stored.index.max()
+            seam_start = stored.index[-overlap:].min() if overlap else last_date
+            try:
+                fetched = self.data_provider.refresh(symbol, seam_start, end)
+            except Exception as e:
+                print(f"Erreur avec {symbol}: {e}")
+                return "no data"
+
+            if not self._history_revised(stored, fetched, last_date, rtol):
+                new_closes = fetched.loc[fetched.index > last_date, ["Close"]]
+                if new_closes.empty:
+                    return "up to date"
+
+                # 'Daily Return' of the first new bar uses the last stored close
+                seam = stored[["Close"]].ffill().iloc[[-1]]
+                data = self.compute_daily_returns(
+                    {symbol: pd.concat([seam, new_closes])}
+                )[symbol].iloc[1:]
+                self._write_csv(company, data, output_folder, append=True)
+                return "appended"
+
+            print(f"Historique révisé pour {symbol}, téléchargement complet")
+            self.data_provider.invalidate(symbol)
+
+        history = self._fetch_history(symbol, end)
+        if history is None:
+            return "no data"
+        data = self.compute_daily_returns({symbol: history})[symbol]
+        self._write_csv(company, data, output_folder)
+        return "full"
+
+    def refresh_csv(
+        self, output_folder="new_data/stock_infos", max_workers=8, end=None
+    ):
+        """
+        Incremental version of export_to_csv: every file is extended with the
+        bars after its last stored date (see refresh_symbol).
+
+        :param output_folder: Directory of the CSV files
+        :param max_workers: Maximum number of symbols refreshed simultaneously
+        :param end: End of the fetched bars (excluded), by default today
+        :return: Dictionary of companies and their refresh status
+        """
+        os.makedirs(output_folder, exist_ok=True)
+        companies = list(self.symbols)
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(companies)))
+        ) as pool:
+            statuses = dict(
+                zip(
+                    companies,
+                    pool.map(
+                        lambda company: self.refresh_symbol(
+                            company, output_folder, end=end
+                        ),
+                        companies,
+                    ),
+                )
+            )
+
+        for company, status in statuses.items():
+            print(f"{company} : {status}")
+        return statuses
+
 
 if __name__ == "__main__":
     SYMBOLS = {
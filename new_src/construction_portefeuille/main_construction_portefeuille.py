@@ -1,93 +1,261 @@
 import os
+import threading
+from datetime import date
+
+import pandas as pd
+
 from fetch_info_stocks import FinancialDataFetcher
 from add_pcr import PutCallRatioAdder
 from construct_portfolio import ConstructPortfolio
 from evaluate_portfolio import EvaluatePortfolio
+from market_data import LocalProvider, default_provider
+from market_panel import DEFAULT_PANEL_FILE, MarketPanel
+from pipeline import Node, Pipeline
 
+SYMBOLS = {
+    "Total Energies": "TTE.PA",
+    "FMC Corp": "FMC",
+    "BP PLC": "BP",
+    "Stora Enso": "STE",
+    "BHP Group": "BHP",
+}
+RATIO_SOURCES = {
+    "Total Energies": "eu",
+    "FMC Corp": "us",
+    "BP PLC": "eu",
+    "Stora Enso": "eu",
+    "BHP Group": "us",
+}
+RATIO_FILES = {
+    "us": "new_data/webscrapped_call_put_ratio/ratios.csv",
+    "eu": "new_data/direct_download_call_put/Put_Call Ratio STOXX50 - Données Historiques.csv",
+}
+START_DATE = "2019-01-01"
+RATIOS_START = "2019-10-07"
+RATIOS_END = "2024-01-31"
+BENCHMARK_TICKER = "XLE"
 
-def main():
-    # Step 1: Fetch Financial Data
-    print("\n=== Fetching Financial Data ===")
-    SYMBOLS = {
-        "Total Energies": "TTE.PA",
-        "FMC Corp": "FMC",
-        "BP PLC": "BP",
-        "Stora Enso": "STE",
-        "BHP Group": "BHP",
-    }
-    START_DATE = "2019-01-01"
-    END_DATE = "2024-12-31"
-    output_stock_info = "new_data/stock_infos"
-
-    fetcher = FinancialDataFetcher(SYMBOLS, START_DATE, END_DATE)
-    fetcher.export_to_csv(output_stock_info)
-
-    # Step 2: Add Put-Call Ratio Data
-    print("\n=== Adding Put-Call Ratio Data ===")
-    output_full_data = "new_data/full_data"
-    pcr_adder = PutCallRatioAdder(output_full_data)
-
-    pcr_adder.add_put_call_ratio_us(
-        os.path.join(output_stock_info, "FMC_Corp_financial_data.csv"),
-        "new_data/webscrapped_call_put_ratio/ratios.csv",
-        "FMC Corp",
-    )
-    pcr_adder.add_put_call_ratio_us(
-        os.path.join(output_stock_info, "BHP_Group_financial_data.csv"),
-        "new_data/webscrapped_call_put_ratio/ratios.csv",
-        "BHP Group",
-    )
-    pcr_adder.add_put_call_ratio_eu(
-        os.path.join(output_stock_info, "BP_PLC_financial_data.csv"),
-        "new_data/direct_download_call_put/Put_Call Ratio STOXX50 - Données Historiques.csv",
-        "BP PLC",
-    )
-    pcr_adder.add_put_call_ratio_eu(
-        os.path.join(output_stock_info, "Stora_Enso_financial_data.csv"),
-        "new_data/direct_download_call_put/Put_Call Ratio STOXX50 - Données Historiques.csv",
-        "Stora Enso",
+OUTPUT_STOCK_INFO = "new_data/stock_infos"
+OUTPUT_FULL_DATA = "new_data/full_data"
+PORTFOLIO_WEIGHTS_FILE = "new_data/portfolio_weights.csv"
+BENCHMARK_FILE = f"new_data/benchmark_{BENCHMARK_TICKER}.csv"
+PERFORMANCE_METRICS_FILE = "new_output/portfolio/performance_metrics.csv"
+PIPELINE_STATE_FILE = "new_data/pipeline_state.json"
+
+# shared by the nodes running in parallel: one market-data cache, and one
+# ratio adder so that each ratio file is read once
+market_data = default_provider()
+_pcr_adders = {}
+_pcr_adders_lock = threading.Lock()
+
+
+def _file_key(company):
+    return company.replace(" ", "_")
+
+
+def fetch_stock(company, symbol, start_date, as_of, output_folder):
+    # only the bars after the last stored day are fetched, up to yesterday
+    fetcher = FinancialDataFetcher(
+        {company: symbol}, start_date, as_of, data_provider=market_data
     )
-    pcr_adder.add_put_call_ratio_eu(
-        os.path.join(output_stock_info, "Total_Energies_financial_data.csv"),
-        "new_data/direct_download_call_put/Put_Call Ratio STOXX50 - Données Historiques.csv",
-        "Total Energies",
+    fetcher.refresh_csv(output_folder, end=as_of)
+
+
+def add_ratio(
+    company, financial_data_path, ratios_path, kind, output_folder, start, end
+):
+    with _pcr_adders_lock:
+        if output_folder not in _pcr_adders:
+            _pcr_adders[output_folder] = PutCallRatioAdder(output_folder)
+        pcr_adder = _pcr_adders[output_folder]
+    pcr_adder.add_put_call_ratios(
+        {company: (financial_data_path, ratios_path, kind)}, start=start, end=end
     )
 
-    # Step 3: Construct Portfolio
-    print("\n=== Constructing Portfolio ===")
-    file_paths = [
-        os.path.join(output_full_data, "BHP_Group_updated_financial_data.csv"),
-        os.path.join(output_full_data, "BP_PLC_updated_financial_data.csv"),
-        os.path.join(output_full_data, "FMC_Corp_updated_financial_data.csv"),
-        os.path.join(output_full_data, "Stora_Enso_updated_financial_data.csv"),
-        os.path.join(output_full_data, "Total_Energies_updated_financial_data.csv"),
-    ]
-    stock_names = ["BHP_Group", "BP_PLC", "FMC_Corp", "Stora_Enso", "Total_Energies"]
-    bullish_threshold = -1
-    bearish_threshold = 1
 
+def build_market_panel(sources, panel_file):
+    MarketPanel.from_csv(sources).save(panel_file)
+
+
+def construct_portfolio(
+    file_paths,
+    stock_names,
+    panel_file,
+    bullish_threshold,
+    bearish_threshold,
+    weights_file,
+):
     portfolio_constructor = ConstructPortfolio(file_paths, stock_names)
-    portfolio_constructor.merge_put_call_ratios()
+    portfolio_constructor.load_market_panel(MarketPanel.open(panel_file))
     portfolio_constructor.calculate_signals(bullish_threshold, bearish_threshold)
     portfolio_constructor.calculate_dynamic_portfolio_weights()
-    portfolio_weights_file = "new_data/portfolio_weights.csv"
-    portfolio_constructor.save_weights_to_csv(portfolio_weights_file)
-
-    # Step 4: Evaluate Portfolio
-    print("\n=== Evaluating Portfolio Performance ===")
-    stock_files = {
-        "BHP": file_paths[0],
-        "BP": file_paths[1],
-        "FMC": file_paths[2],
-        "Stora_Enso": file_paths[3],
-        "Total_Energies": file_paths[4],
-    }
-
-    evaluator = EvaluatePortfolio(stock_files, portfolio_weights_file)
-    metrics = evaluator.run_analysis()
+    portfolio_constructor.save_weights_to_csv(weights_file)
+
+
+def fetch_benchmark(ticker, stock_files, output_file):
+    """Benchmark closes over the dates of the stock files, for the evaluation."""
+    dates = pd.concat(
+        [
+            pd.read_csv(path, usecols=["Date"], parse_dates=["Date"])
+            for path in stock_files
+        ]
+    )["Date"]
+    benchmark_data = market_data.history(
+        ticker, dates.min(), dates.max() + pd.Timedelta(days=1)
+    )
+    benchmark_data[["Close"]].to_csv(output_file, index=True, index_label="Date")
+
+
+def evaluate_portfolio(
+    stock_files,
+    panel_file,
+    weights_file,
+    benchmark_ticker,
+    benchmark_file,
+    metrics_file,
+):
+    evaluator = EvaluatePortfolio(
+        stock_files,
+        weights_file,
+        benchmark_ticker,
+        data_provider=LocalProvider({benchmark_ticker: benchmark_file}),
+        metrics_path=metrics_file,
+        market_panel=MarketPanel.open(panel_file),
+    )
+    return evaluator.run_analysis()
+
+
+def build_pipeline(bullish_threshold=-1, bearish_threshold=1):
+    """
+    Steps of the portfolio construction as pipeline nodes: fetch and
+    put/call enrichment per asset, benchmark fetch, market panel of the
+    enriched files, construction, evaluation.
+    """
+    pipeline = Pipeline(PIPELINE_STATE_FILE)
+    stock_info_files = {}
+    full_data_files = {}
+
+    for company, symbol in SYMBOLS.items():
+        stock_info_file = stock_info_files[company] = os.path.join(
+            OUTPUT_STOCK_INFO, f"{_file_key(company)}_financial_data.csv"
+        )
+        full_data_files[company] = os.path.join(
+            OUTPUT_FULL_DATA, f"{_file_key(company)}_updated_financial_data.csv"
+        )
+        ratios_file = RATIO_FILES[RATIO_SOURCES[company]]
+
+        pipeline.add(
+            Node(
+                f"fetch {company}",
+                fetch_stock,
+                outputs=[stock_info_file],
+                params={
+                    "company": company,
+                    "symbol": symbol,
+                    "start_date": START_DATE,
+                    # new every day, so that the file is brought up to date
+                    "as_of": date.today().isoformat(),
+                    "output_folder": OUTPUT_STOCK_INFO,
+                },
+            )
+        )
+        pipeline.add(
+            Node(
+                f"add put-call ratio {company}",
+                add_ratio,
+                inputs=[stock_info_file, ratios_file],
+                outputs=[full_data_files[company]],
+                params={
+                    "company": company,
+                    "financial_data_path": stock_info_file,
+                    "ratios_path": ratios_file,
+                    "kind": RATIO_SOURCES[company],
+                    "output_folder": OUTPUT_FULL_DATA,
+                    "start": RATIOS_START,
+                    "end": RATIOS_END,
+                },
+            )
+        )
+
+    file_paths = [full_data_files[company] for company in sorted(full_data_files)]
+    stock_names = [_file_key(company) for company in sorted(full_data_files)]
+    stock_files = dict(zip(stock_names, file_paths))
+
+    # the enriched files are read once into the memory-mapped panel that the
+    # construction and the evaluation (and var_analyses) share
+    pipeline.add(
+        Node(
+            "build market panel",
+            build_market_panel,
+            inputs=file_paths,
+            outputs=[DEFAULT_PANEL_FILE],
+            params={"sources": stock_files, "panel_file": DEFAULT_PANEL_FILE},
+        )
+    )
+    pipeline.add(
+        Node(
+            "construct portfolio",
+            construct_portfolio,
+            inputs=[DEFAULT_PANEL_FILE],
+            outputs=[PORTFOLIO_WEIGHTS_FILE],
+            params={
+                "file_paths": file_paths,
+                "stock_names": stock_names,
+                "panel_file": DEFAULT_PANEL_FILE,
+                "bullish_threshold": bullish_threshold,
+                "bearish_threshold": bearish_threshold,
+                "weights_file": PORTFOLIO_WEIGHTS_FILE,
+            },
+        )
+    )
+    # over the dates of the fetched prices: runs alongside the enrichment
+    price_files = [stock_info_files[company] for company in sorted(stock_info_files)]
+    pipeline.add(
+        Node(
+            "fetch benchmark",
+            fetch_benchmark,
+            inputs=price_files,
+            outputs=[BENCHMARK_FILE],
+            params={
+                "ticker": BENCHMARK_TICKER,
+                "stock_files": price_files,
+                "output_file": BENCHMARK_FILE,
+            },
+        )
+    )
+
+    # the weights file has one "<stock name>_Weight" column per asset
+    pipeline.add(
+        Node(
+            "evaluate portfolio",
+            evaluate_portfolio,
+            inputs=[DEFAULT_PANEL_FILE, PORTFOLIO_WEIGHTS_FILE, BENCHMARK_FILE],
+            outputs=[PERFORMANCE_METRICS_FILE],
+            params={
+                "stock_files": stock_files,
+                "panel_file": DEFAULT_PANEL_FILE,
+                "weights_file": PORTFOLIO_WEIGHTS_FILE,
+                "benchmark_ticker": BENCHMARK_TICKER,
+                "benchmark_file": BENCHMARK_FILE,
+                "metrics_file": PERFORMANCE_METRICS_FILE,
+            },
+            main_thread=True,  # plt.show
+        )
+    )
+    return pipeline
+
+
+def main(force=()):
+    # fetch -> add put-call ratio -> panel -> construct -> evaluate, only the steps
+    # whose inputs or parameters changed since the last run are executed
+    pipeline = build_pipeline(bullish_threshold=-1, bearish_threshold=1)
+    run = pipeline.run(max_workers=4, force=force)
 
     print("\n=== Portfolio Performance Metrics ===")
-    print(metrics)
+    if "evaluate portfolio" in run["results"]:
+        print(run["results"]["evaluate portfolio"])
+    else:
+        print(pd.read_csv(PERFORMANCE_METRICS_FILE))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,284 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import date
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = "new_data/market_cache"
+
+
+def _to_day(value):
+    """Date, datetime or YYYY-MM-DD string as a datetime.date."""
+    return pd.Timestamp(value).date()
+
+
+def _normalize_history(data):
+    """Index history rows by their tz-naive day, sorted and without duplicates."""
+    data = data.copy()
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    data.index = index.normalize().rename("Date")
+    data = data[~data.index.duplicated(keep="last")]
+    return data.sort_index()
+
+
+def missing_ranges(coverage, start, end):
+    """
+    Parts of [start, end) not covered by any of the coverage intervals.
+
+    :param coverage: List of (start, end) date pairs, end excluded.
+    :return: List of (start, end) date pairs to fetch.
+    """
+    missing = []
+    cursor = start
+    for covered_start, covered_end in sorted(coverage):
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+def merge_ranges(coverage):
+    """Union of (start, end) date intervals, overlapping or adjacent ones merged."""
+    merged = []
+    for start, end in sorted(coverage):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class MarketDataProvider(ABC):
+    """
+    Source of daily price history for a ticker.
+
+    Implementations return a DataFrame indexed by day ("Date", tz-naive) with
+    at least a 'Close' column, for the days in [start, end) (end excluded, as
+    in yfinance).
+    """
+
+    @abstractmethod
+    def history(self, ticker, start, end):
+        """Daily history of the ticker for the days in [start, end)."""
+
+    def refresh(self, ticker, start, end):
+        """Same as history, bypassing any cache for [start, end)."""
+        return self.history(ticker, start, end)
+
+    def invalidate(self, ticker):
+        """Forget anything cached for the ticker (nothing by default)."""
+
+
+class YahooFinanceProvider(MarketDataProvider):
+    """Daily history downloaded from Yahoo Finance."""
+
+    def history(self, ticker, start, end):
+        import yfinance as yf
+
+        data = yf.Ticker(ticker).history(start=str(start), end=str(end))
+        return _normalize_history(data)
+
+
+class LocalProvider(MarketDataProvider):
+    """
+    Daily history read from local frames or CSV files (with a 'Date' column),
+    for tests and offline runs. Never touches the network.
+    """
+
+    def __init__(self, sources):
+        """
+        :param sources: Dictionary of tickers and their DataFrame or CSV path.
+        """
+        self.sources = sources
+        self._frames = {}
+
+    def _frame(self, ticker):
+        if ticker not in self._frames:
+            source = self.sources.get(ticker)
+            if source is None:
+                data = pd.DataFrame(columns=["Close"], index=pd.DatetimeIndex([]))
+            elif isinstance(source, pd.DataFrame):
+                data = source
+            else:
+                data = pd.read_csv(source, parse_dates=["Date"], index_col="Date")
+            self._frames[ticker] = _normalize_history(data)
+        return self._frames[ticker]
+
+    def history(self, ticker, start, end):
+        data = self._frame(ticker)
+        return data[
+            (data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))
+        ].copy()
+
+
+class CachedProvider(MarketDataProvider):
+    """
+    On-disk cache in front of another provider.
+
+    Each ticker is stored in one CSV file, and the date ranges already
+    requested from the upstream provider are recorded in coverage.json. Only
+    the parts of a request outside this coverage are fetched, so repeated
+    requests are served from disk without network I/O. A fetched range is
+    recorded as requested, also when no row came back for part or all of it
+    (days without trading), but at most up to yesterday, today's bar being
+    still open. A failed upstream request records nothing.
+    """
+
+    def __init__(self, upstream, cache_dir=DEFAULT_CACHE_DIR, offline=False):
+        """
+        :param upstream: Provider used for the missing ranges.
+        :param cache_dir: Directory of the cached CSV files.
+        :param offline: If True, only the cache is used and nothing is fetched.
+        """
+        self.upstream = upstream
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.coverage_path = os.path.join(cache_dir, "coverage.json")
+        self._frames = {}
+        self._coverage = None
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+
+    def _path(self, ticker):
+        file_name = "".join(c if c.isalnum() or c in ".-_" else "_" for c in ticker)
+        return os.path.join(self.cache_dir, f"{file_name}.csv")
+
+    def _ticker_lock(self, ticker):
+        """Lock of one ticker: different tickers are fetched concurrently."""
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def _load_coverage(self):
+        if self._coverage is None:
+            try:
+                with open(self.coverage_path, "r", encoding="utf-8") as file:
+                    stored = json.load(file)
+            except FileNotFoundError:
+                stored = {}
+            self._coverage = {
+                ticker: [(_to_day(start), _to_day(end)) for start, end in ranges]
+                for ticker, ranges in stored.items()
+            }
+        return self._coverage
+
+    def _save_coverage(self):
+        stored = {
+            ticker: [[start.isoformat(), end.isoformat()] for start, end in ranges]
+            for ticker, ranges in self._coverage.items()
+        }
+        tmp_path = f"{self.coverage_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(stored, file, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.coverage_path)
+
+    def _load_frame(self, ticker):
+        if ticker not in self._frames:
+            try:
+                self._frames[ticker] = pd.read_csv(
+                    self._path(ticker), parse_dates=["Date"], index_col="Date"
+                )
+            except FileNotFoundError:
+                self._frames[ticker] = None
+        return self._frames[ticker]
+
+    def _save_frame(self, ticker, data):
+        tmp_path = f"{self._path(ticker)}.tmp"
+        data.to_csv(tmp_path, index=True, index_label="Date")
+        os.replace(tmp_path, self._path(ticker))
+        self._frames[ticker] = data
+
+    def coverage(self, ticker):
+        """Date ranges of the ticker held in the cache, end excluded."""
+        with self._lock:
+            return list(self._load_coverage().get(ticker, []))
+
+    def invalidate(self, ticker):
+        """Forget the cached history of a ticker, next request refetches it."""
+        with self._lock:
+            self._load_coverage().pop(ticker, None)
+            self._frames[ticker] = None
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._save_coverage()
+            if os.path.exists(self._path(ticker)):
+                os.remove(self._path(ticker))
+
+    def _fetch(self, ticker, start, end, replace):
+        """
+        Fetch the missing parts of [start, end), or all of it with replace,
+        from the upstream provider into the cache.
+        """
+        with self._ticker_lock(ticker):
+            with self._lock:
+                coverage = list(self._load_coverage().get(ticker, []))
+                data = self._load_frame(ticker)
+
+            if self.offline:
+                to_fetch = []
+            elif replace:
+                to_fetch = [(start, end)]
+            else:
+                to_fetch = missing_ranges(coverage, start, end)
+
+            if to_fetch:
+                fetched = [
+                    self.upstream.history(ticker, fetch_start, fetch_end)
+                    for fetch_start, fetch_end in to_fetch
+                ]
+                if replace and data is not None:
+                    # rows that disappeared upstream are dropped as well
+                    data = data[
+                        (data.index < pd.Timestamp(start))
+                        | (data.index >= pd.Timestamp(end))
+                    ]
+                frames = [frame for frame in [data, *fetched] if frame is not None]
+                frames = [frame for frame in frames if not frame.empty] or frames[:1]
+                data = _normalize_history(pd.concat(frames))
+
+                # a past range answered by upstream is known, even without
+                # rows (weekend, holiday): it is not requested again. Today's
+                # bar is still moving, it is fetched again next time
+                today = date.today()
+                coverage = merge_ranges(
+                    coverage
+                    + [
+                        (fetch_start, min(fetch_end, today))
+                        for fetch_start, fetch_end in to_fetch
+                        if fetch_start < today
+                    ]
+                )
+                with self._lock:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    self._save_frame(ticker, data)
+                    self._coverage[ticker] = coverage
+                    self._save_coverage()
+
+        if data is None:
+            return pd.DataFrame(
+                columns=["Close"], index=pd.DatetimeIndex([], name="Date")
+            )
+        return data[
+            (data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))
+        ].copy()
+
+    def history(self, ticker, start, end):
+        return self._fetch(ticker, _to_day(start), _to_day(end), replace=False)
+
+    def refresh(self, ticker, start, end):
+        return self._fetch(ticker, _to_day(start), _to_day(end), replace=True)
+
+
+def default_provider(cache_dir=DEFAULT_CACHE_DIR, offline=False):
+    """Yahoo Finance behind the on-disk cache."""
+    return CachedProvider(YahooFinanceProvider(), cache_dir=cache_dir, offline=offline)
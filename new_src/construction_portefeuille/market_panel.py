@@ -0,0 +1,199 @@
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+PANEL_FIELDS = ("Close", "Daily Return", "Put-Call Ratio")
+DEFAULT_PANEL_FILE = "new_data/market_panel.bin"
+
+# file layout: magic, header length (little-endian uint64), JSON header, then
+# the float64 (fields x dates x assets) array, starting on a 64-byte boundary
+_MAGIC = b"MKTPANEL"
+_PREFIX = struct.Struct("<8sQ")
+_ALIGNMENT = 64
+
+# panels already attached by this process, by path
+_attached = {}
+
+
+class MarketPanel:
+    """
+    Close, Daily Return and Put-Call Ratio of many assets as one float64
+    (fields x dates x assets) array, stored in a memory-mapped file.
+
+    The dates are the union of the dates of the assets, missing values are
+    NaN. Opening the file maps it read-only: the processes opening the same
+    panel share the pages of the OS cache instead of holding their own copy
+    of the data.
+    """
+
+    def __init__(self, values, dates, assets, fields=PANEL_FIELDS, path=None):
+        """
+        :param values: (fields x dates x assets) float64 array.
+        :param dates: DatetimeIndex of the dates axis.
+        :param assets: Names of the assets axis.
+        :param fields: Names of the fields axis.
+        :param path: File the values are mapped from, if any.
+        """
+        self.values = values
+        self.dates = pd.DatetimeIndex(dates, name="Date")
+        self.assets = list(assets)
+        self.fields = list(fields)
+        self.path = path
+
+    @classmethod
+    def from_csv(cls, sources, fields=PANEL_FIELDS):
+        """
+        Panel of CSV files with a 'Date' column, in memory.
+
+        :param sources: Dictionary of asset names and their CSV file.
+        :param fields: Columns to keep, NaN for the files without them.
+        """
+        frames = {}
+        for asset, path in sources.items():
+            data = pd.read_csv(
+                path, usecols=lambda column: column == "Date" or column in fields
+            )
+            data["Date"] = pd.to_datetime(data["Date"])
+            frames[asset] = data.set_index("Date").reindex(columns=list(fields))
+
+        # outer join of the dates of all the assets, one concat per field
+        panel = pd.concat(frames, axis=1, join="outer").sort_index()
+        assets = list(sources)
+        values = np.stack(
+            [
+                panel.xs(field, axis=1, level=1)
+                .reindex(columns=assets)
+                .to_numpy(dtype=np.float64)
+                for field in fields
+            ]
+        )
+        return cls(values, panel.index, assets, fields)
+
+    def save(self, path):
+        """Write the panel to a file readable with open (atomic replace)."""
+        header = json.dumps(
+            {
+                "fields": self.fields,
+                "dates": [day.strftime("%Y-%m-%d") for day in self.dates],
+                "assets": self.assets,
+                "dtype": "<f8",
+                "shape": list(self.values.shape),
+            }
+        ).encode("utf-8")
+        offset = -(-(_PREFIX.size + len(header)) // _ALIGNMENT) * _ALIGNMENT
+        header = header.ljust(offset - _PREFIX.size, b" ")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(_PREFIX.pack(_MAGIC, len(header)))
+            file.write(header)
+            file.write(np.ascontiguousarray(self.values, dtype="<f8").tobytes())
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def open(cls, path):
+        """Map a panel file read-only, without reading its values."""
+        with open(path, "rb") as file:
+            magic, header_size = _PREFIX.unpack(file.read(_PREFIX.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a market panel file.")
+            header = json.loads(file.read(header_size))
+        values = np.memmap(
+            path,
+            dtype=np.dtype(header["dtype"]),
+            mode="r",
+            offset=_PREFIX.size + header_size,
+            shape=tuple(header["shape"]),
+        )
+        return cls(
+            values,
+            pd.to_datetime(header["dates"]),
+            header["assets"],
+            header["fields"],
+            path=path,
+        )
+
+    @classmethod
+    def build(cls, sources, path=DEFAULT_PANEL_FILE, fields=PANEL_FIELDS):
+        """
+        Open the panel file, rebuilding it first from the CSV files if it is
+        missing, older than one of them or made of other assets or fields.
+        """
+        if os.path.exists(path):
+            built = os.path.getmtime(path)
+            panel = cls.open(path)
+            if (
+                panel.assets == list(sources)
+                and panel.fields == list(fields)
+                and all(
+                    os.path.getmtime(source) <= built for source in sources.values()
+                )
+            ):
+                return panel
+        cls.from_csv(sources, fields).save(path)
+        return cls.open(path)
+
+    def _asset_positions(self, assets):
+        if assets is None:
+            return slice(None)
+        missing = set(assets) - set(self.assets)
+        if missing:
+            raise KeyError(f"Assets not in the panel: {sorted(missing)}")
+        return [self.assets.index(asset) for asset in assets]
+
+    def field(self, name):
+        """(dates x assets) values of a field, a view on the mapped file."""
+        return self.values[self.fields.index(name)]
+
+    def present(self, assets=None, how="any"):
+        """
+        Boolean mask of the dates holding data (any field not NaN) for any
+        ("any", outer join) or all ("all", inner join) of the assets.
+        """
+        observed = ~np.isnan(self.values[:, :, self._asset_positions(assets)])
+        observed = observed.any(axis=0)
+        return observed.all(axis=1) if how == "all" else observed.any(axis=1)
+
+    def frame(self, field, assets=None, how="any"):
+        """
+        (dates x assets) DataFrame of a field, on the dates selected by
+        present(assets, how). Without asset selection nor dropped dates, the
+        DataFrame is a view on the mapped file.
+
+        :param field: One of the panel fields.
+        :param assets: Assets to keep, in this order, by default all of them.
+        :param how: "any" (dates of any asset) or "all" (dates of every asset).
+        """
+        values = self.field(field)[:, self._asset_positions(assets)]
+        mask = self.present(assets, how)
+        if not mask.all():
+            values, dates = values[mask], self.dates[mask]
+        else:
+            dates = self.dates
+        return pd.DataFrame(
+            values, index=dates, columns=assets or self.assets, copy=False
+        )
+
+    def asset_frame(self, asset):
+        """Rows of one asset (dates x fields), as in its source CSV file."""
+        position = self.assets.index(asset)
+        values = self.values[:, :, position].T
+        mask = ~np.isnan(values).all(axis=1)
+        return pd.DataFrame(
+            values[mask], index=self.dates[mask], columns=self.fields
+        ).reset_index()
+
+
+def attach(path=DEFAULT_PANEL_FILE):
+    """
+    Panel of a file, mapped once per process. Used as (or in) the initializer
+    of process pool workers, which then share the file's pages.
+    """
+    if path not in _attached:
+        _attached[path] = MarketPanel.open(path)
+    return _attached[path]
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Node:
+    """
+    One step of a pipeline: a function reading `inputs` and writing `outputs`.
+
+    A node depends on the nodes producing its inputs. It is considered fresh,
+    and skipped, when its outputs exist unchanged and its fingerprint (content
+    hash of the inputs, params and function) matches the one of its last run.
+    """
+
+    def __init__(
+        self, name, func, inputs=(), outputs=(), params=None, main_thread=False
+    ):
+        """
+        :param name: Unique name of the node.
+        :param func: Callable run as func(**params).
+        :param inputs: Files read by the node.
+        :param outputs: Files written by the node.
+        :param params: JSON serializable keyword arguments of func.
+        :param main_thread: Run the node in the calling thread (GUI, plt.show).
+        """
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.main_thread = main_thread
+
+
+def file_hash(path):
+    """sha1 of a file's content, None if the file does not exist."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """
+    Runs a DAG of nodes, skipping the fresh ones and running the independent
+    ones concurrently. Fingerprints are kept in a JSON state file.
+    """
+
+    def __init__(self, state_path):
+        """
+        :param state_path: JSON file holding the fingerprints of the last runs.
+        """
+        self.state_path = state_path
+        self.nodes = {}
+
+    def add(self, node):
+        if node.name in self.nodes:
+            raise ValueError(f"Duplicate node: {node.name}")
+        self.nodes[node.name] = node
+        return node
+
+    def dependencies(self):
+        """Dictionary of node names and the names of the nodes they depend on."""
+        producers = {}
+        for node in self.nodes.values():
+            for output in node.outputs:
+                if output in producers:
+                    raise ValueError(
+                        f"{output} is written by {producers[output]} and {node.name}"
+                    )
+                producers[output] = node.name
+
+        dependencies = {
+            name: {producers[i] for i in node.inputs if i in producers}
+            for name, node in self.nodes.items()
+        }
+
+        # Kahn's algorithm, only to reject cycles early
+        remaining = {name: set(deps) for name, deps in dependencies.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Cycle between nodes: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+        return dependencies
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(state, file, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def fingerprint(node):
+        """Hash of the node's function, params and input contents."""
+        digest = hashlib.sha1(
+            f"{node.func.__module__}.{node.func.__qualname__}".encode()
+        )
+        digest.update(json.dumps(node.params, sort_keys=True, default=str).encode())
+        for path in sorted(node.inputs):
+            digest.update(path.encode())
+            digest.update(str(file_hash(path)).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _is_fresh(node, fingerprint, previous):
+        return (
+            previous is not None
+            and previous["fingerprint"] == fingerprint
+            and all(
+                file_hash(path) == previous["outputs"].get(path)
+                for path in node.outputs
+            )
+        )
+
+    def run(self, max_workers=4, force=()):
+        """
+        Run the nodes in dependency order.
+
+        A node starts as soon as the nodes it depends on are done, in a thread
+        pool. Nodes whose fingerprint and outputs did not change since their
+        last run are skipped (unless named in `force`).
+
+        :param max_workers: Maximum number of nodes running simultaneously.
+        :param force: Names of nodes to run even if fresh.
+        :return: Dictionary with the "ran" and "skipped" node names and the
+            "results" returned by the nodes that ran.
+        """
+        dependencies = self.dependencies()
+        state = self._load_state()
+        ran, skipped, results = [], [], {}
+
+        def run_node(name):
+            node = self.nodes[name]
+            fingerprint = self.fingerprint(node)
+            if name not in force and self._is_fresh(node, fingerprint, state.get(name)):
+                return name, False, None
+            result = node.func(**node.params)
+            return name, True, (fingerprint, result)
+
+        pending = dict(dependencies)
+        done = set()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            running = set()
+            while pending or running:
+                ready = [name for name, deps in pending.items() if deps <= done]
+                finished = []
+                for name in ready:
+                    del pending[name]
+                    if self.nodes[name].main_thread:
+                        finished.append(run_node(name))
+                    else:
+                        running.add(pool.submit(run_node, name))
+
+                if running and not finished:
+                    completed, running = wait(running, return_when=FIRST_COMPLETED)
+                    finished = [future.result() for future in completed]
+
+                for name, has_run, outcome in finished:
+                    if has_run:
+                        fingerprint, results[name] = outcome
+                        state[name] = {
+                            "fingerprint": fingerprint,
+                            "outputs": {
+                                path: file_hash(path)
+                                for path in self.nodes[name].outputs
+                            },
+                        }
+                        self._save_state(state)
+                        ran.append(name)
+                        print(f"[pipeline] {name}: done")
+                    else:
+                        skipped.append(name)
+                        print(f"[pipeline] {name}: up to date, skipped")
+                    done.add(name)
+
+        return {"ran": ran, "skipped": skipped, "results": results}
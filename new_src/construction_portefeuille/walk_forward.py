@@ -0,0 +1,271 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from analytics import RISK_FREE_RATE, PerformanceAnalytics
+from backtest import Backtest, load_returns
+from construct_portfolio import ConstructPortfolio, dynamic_weights, signal_codes
+from evaluate_portfolio import EvaluatePortfolio
+from market_data import LocalProvider
+
+# Walk-forward search of the (bullish, bearish) thresholds of the put-call
+# strategy: every window picks the pair with the best in-sample Sharpe ratio
+# and is evaluated on the following out-of-sample days. Both are backtested
+# with the same execution lag and trading costs.
+
+WINDOW_COLUMNS = [
+    "in_sample_start",
+    "in_sample_end",
+    "out_of_sample_start",
+    "out_of_sample_end",
+    "bullish_threshold",
+    "bearish_threshold",
+    "in_sample_sharpe",
+    "out_of_sample_sharpe",
+]
+
+# read-only panels of the worker processes, attached to the shared memory
+_shared = {}
+
+
+def _share(array):
+    """Copy an array into a new shared memory block."""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block
+
+
+def _init_worker(blocks, shape, dates, stock_names, risk_free_rate, trading):
+    for name, block_name in blocks.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared[f"{name}_block"] = block  # keeps the buffer alive
+        _shared[name] = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+    _shared["dates"] = dates
+    _shared["stock_names"] = stock_names
+    _shared["risk_free_rate"] = risk_free_rate
+    _shared["trading"] = trading
+
+
+def _sharpe(returns, risk_free_rate):
+    """Annualized Sharpe ratio of each column of a (days x portfolios) DataFrame."""
+    return (
+        PerformanceAnalytics(returns, risk_free_rate=risk_free_rate)
+        .annualized_sharpe()
+        .to_numpy()
+    )
+
+
+def _grid_sharpe(ratios, returns, pairs, risk_free_rate, trading):
+    """
+    In-sample Sharpe ratio, net of costs, of every (bullish, bearish) pair,
+    backtested in one pass.
+
+    :param returns: (days x assets) DataFrame of the in-sample returns.
+    :param trading: Backtest arguments (execution lag and costs).
+    """
+    codes = signal_codes(ratios, pairs[:, :1], pairs[:, 1:])
+    weights = dynamic_weights(codes)  # (pairs x days x assets)
+    result = Backtest(returns, **trading).run_array(weights)
+    return _sharpe(result.net_returns, risk_free_rate)
+
+
+def _run_window(window):
+    """
+    Pick the thresholds on the in-sample days [start, split) and evaluate them
+    with ConstructPortfolio and EvaluatePortfolio on [split, end).
+    """
+    start, split, end, pairs = window
+    ratios, dates = _shared["ratios"], _shared["dates"]
+    stock_names = _shared["stock_names"]
+    risk_free_rate, trading = _shared["risk_free_rate"], _shared["trading"]
+    returns = pd.DataFrame(
+        _shared["returns"][start:end], index=dates[start:end], columns=stock_names
+    )
+
+    scores = _grid_sharpe(
+        ratios[start:split],
+        returns.iloc[: split - start],
+        pairs,
+        risk_free_rate,
+        trading,
+    )
+    best = int(np.nanargmax(np.where(np.isnan(scores), -np.inf, scores)))
+    bullish, bearish = pairs[best]
+
+    # the in-sample days warm up the signal streaks and the held weights (the
+    # first out-of-sample day trades from them), only the out-of-sample part
+    # is kept
+    constructor = ConstructPortfolio([], stock_names)
+    constructor.merged_data = pd.DataFrame(
+        ratios[start:end], index=dates[start:end], columns=stock_names
+    )
+    constructor.calculate_signals(bullish, bearish)
+    constructor.calculate_dynamic_portfolio_weights()
+
+    evaluator = EvaluatePortfolio.from_frames(
+        returns,
+        constructor.weight_data.set_axis(stock_names, axis=1),
+        data_provider=LocalProvider({}),
+        **trading,
+    )
+    out_of_sample_returns = evaluator.compute_daily_portfolio_returns().iloc[
+        split - start :
+    ]
+
+    return {
+        "in_sample_start": dates[start],
+        "in_sample_end": dates[split - 1],
+        "out_of_sample_start": dates[split],
+        "out_of_sample_end": dates[end - 1],
+        "bullish_threshold": bullish,
+        "bearish_threshold": bearish,
+        "in_sample_sharpe": scores[best],
+        "out_of_sample_sharpe": _sharpe(
+            out_of_sample_returns.to_frame(), risk_free_rate
+        )[0],
+        "returns": out_of_sample_returns,
+    }
+
+
+def threshold_pairs(bullish_values, bearish_values):
+    """All (bullish, bearish) pairs with bullish <= bearish, as a (pairs x 2) array."""
+    pairs = [
+        (bullish, bearish)
+        for bullish in bullish_values
+        for bearish in bearish_values
+        if bullish <= bearish
+    ]
+    return np.array(pairs, dtype=float).reshape(-1, 2)
+
+
+def load_panel(file_paths, stock_names):
+    """
+    Put-Call Ratio (as merged by ConstructPortfolio) and 'Daily Return' panels
+    on the dates they share, as float64 (dates x assets) matrices.
+    """
+    constructor = ConstructPortfolio(file_paths, stock_names)
+    constructor.merge_put_call_ratios()
+    returns = load_returns(dict(zip(stock_names, file_paths)))
+    dates = constructor.merged_data.index.intersection(returns.index).sort_values()
+    return (
+        dates,
+        constructor.merged_data.loc[dates, stock_names].to_numpy(dtype=np.float64),
+        returns.loc[dates, stock_names].to_numpy(dtype=np.float64),
+    )
+
+
+def walk_forward(
+    file_paths,
+    stock_names,
+    bullish_values,
+    bearish_values,
+    in_sample=252,
+    out_of_sample=63,
+    risk_free_rate=RISK_FREE_RATE,
+    execution_lag=1,
+    proportional_cost=0.001,
+    fixed_cost=0.0,
+    max_workers=None,
+):
+    """
+    Walk-forward optimization of the put-call thresholds.
+
+    Windows of `in_sample` days are followed by `out_of_sample` days and
+    rolled by `out_of_sample` days. The windows run in a process pool whose
+    workers read the ratio and return panels from shared memory.
+
+    :param file_paths: Files with 'Date', 'Daily Return' and 'Put-Call Ratio'.
+    :param stock_names: Names of the stocks, in the order of file_paths.
+    :param bullish_values: Candidate bullish thresholds.
+    :param bearish_values: Candidate bearish thresholds.
+    :param execution_lag: Days between a signal and its execution (see Backtest).
+    :param proportional_cost: Cost per unit of traded weight (0.001 = 10 bps).
+    :param fixed_cost: Cost per traded asset and day, as a fraction of equity.
+    :return: (windows, equity) - one row per window with the chosen thresholds
+        and annualized Sharpe ratios, and the stitched out-of-sample equity
+        curve, net of costs
+    """
+    dates, ratios, returns = load_panel(file_paths, stock_names)
+    pairs = threshold_pairs(bullish_values, bearish_values)
+    if len(pairs) == 0:
+        raise ValueError("No threshold pair with bullish <= bearish.")
+
+    windows = [
+        (
+            start,
+            start + in_sample,
+            min(start + in_sample + out_of_sample, len(dates)),
+            pairs,
+        )
+        for start in range(0, len(dates) - in_sample, out_of_sample)
+    ]
+    if not windows:
+        raise ValueError(f"Not enough dates ({len(dates)}) for in_sample={in_sample}.")
+
+    blocks = {"ratios": _share(ratios), "returns": _share(returns)}
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(
+                {name: block.name for name, block in blocks.items()},
+                ratios.shape,
+                dates,
+                list(stock_names),
+                risk_free_rate,
+                {
+                    "execution_lag": execution_lag,
+                    "proportional_cost": proportional_cost,
+                    "fixed_cost": fixed_cost,
+                },
+            ),
+        ) as pool:
+            results = list(pool.map(_run_window, windows))
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+    equity = (1 + pd.concat([result.pop("returns") for result in results])).cumprod()
+    return pd.DataFrame(results, columns=WINDOW_COLUMNS), equity.rename("Equity")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Walk-forward optimization of the put-call thresholds."
+    )
+    parser.add_argument("--folder", default="new_data/full_data")
+    parser.add_argument("--in-sample", type=int, default=252)
+    parser.add_argument("--out-of-sample", type=int, default=63)
+    parser.add_argument("--execution-lag", type=int, default=1)
+    parser.add_argument("--cost", type=float, default=0.001)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="new_output/portfolio/walk_forward")
+    args = parser.parse_args()
+
+    stock_names = ["BHP_Group", "BP_PLC", "FMC_Corp", "Stora_Enso", "Total_Energies"]
+    file_paths = [
+        os.path.join(args.folder, f"{name}_updated_financial_data.csv")
+        for name in stock_names
+    ]
+    grid = np.round(np.arange(0.5, 2.01, 0.1), 2)
+
+    windows, equity = walk_forward(
+        file_paths,
+        stock_names,
+        grid,
+        grid,
+        in_sample=args.in_sample,
+        out_of_sample=args.out_of_sample,
+        execution_lag=args.execution_lag,
+        proportional_cost=args.cost,
+        max_workers=args.workers,
+    )
+    os.makedirs(args.output, exist_ok=True)
+    windows.to_csv(os.path.join(args.output, "windows.csv"), index=False)
+    equity.to_csv(os.path.join(args.output, "equity.csv"))
+    print(windows)
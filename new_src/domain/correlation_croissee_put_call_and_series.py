@@ -1,19 +1,37 @@
+import hashlib
 import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 
 import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
 import numpy as np
 import pandas as pd
 from scipy.stats import pearsonr
-import statsmodels.api as sm
 from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
-from statsmodels.tsa.stattools import adfuller, kpss
+from statsmodels.tools.sm_exceptions import InterpolationWarning
+from statsmodels.tsa.stattools import acf, adfuller, kpss, pacf
+
+from cross_correlation import ccf_frame
+from rendering import figure_job, render_figures
+from rolling_correlation import RollingCorrelation, discretize_signal, rolling_pearson
 
 
 np.random.seed(42)
 pd.options.mode.chained_assignment = None
 
 
+SENTIMENT_MAPPING = {"Bullish": 1, "Bearish": -1}
+SENTIMENT_BASE_MAPPING = {"positive": 1, "neutral": 0, "negative": -1}
+
+# compact dtypes used when streaming the analysed tweets
+TWEETS_COLUMNS = ["PostDate", "company", "sentiment", "sentiment_base"]
+TWEETS_DTYPES = {
+    "company": "category",
+    "sentiment": "category",
+    "sentiment_base": "category",
+}
+
+
 class Preprocessing:
     def __init__(self) -> None:
         pass
@@ -31,9 +49,26 @@ class Preprocessing:
         df["year"] = df["PostDate"].dt.year
 
         # formatting sentiments
-        df["sentiment"] = df["sentiment"].map({"Bullish": 1, "Bearish": -1})
-        df["sentiment_base"] = df["sentiment_base"].map(
-            {"positive": 1, "neutral": 0, "negative": -1}
+        df["sentiment"] = df["sentiment"].map(SENTIMENT_MAPPING)
+        df["sentiment_base"] = df["sentiment_base"].map(SENTIMENT_BASE_MAPPING)
+        return df
+
+    def __process_analysed_tweets_chunk(self, df: pd.DataFrame):
+        """
+        Same formatting as __process_analysed_tweets for one streamed chunk,
+        with sentiments stored as nullable int8 and no year/month/day columns
+        """
+        df["PostDate"] = pd.to_datetime(df["PostDate"])
+        df = df.dropna(subset=["PostDate"])
+
+        df["sentiment"] = (
+            df["sentiment"].astype(object).map(SENTIMENT_MAPPING).astype("Int8")
+        )
+        df["sentiment_base"] = (
+            df["sentiment_base"]
+            .astype(object)
+            .map(SENTIMENT_BASE_MAPPING)
+            .astype("Int8")
         )
         return df
 
@@ -45,56 +80,69 @@ class Preprocessing:
         df = df.loc[~nan_mask, :]
         return df
 
-    def __group_model_results(self, df: pd.DataFrame) -> pd.DataFrame:
+    def __count_model_results(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Grouping model results
+        Daily counts of positive and labelled tweets per company
 
-        by: str = ["year", "month", "day", "company"]
+        by: date (normalized PostDate) and company, in a single pass
         """
-        # group the data by year and month
-        grouped = df.groupby(["year", "month", "day", "company"])
-
-        # count the number of positive and negative tweets for each year and month
-        sentiment_positive_tweets_by_day = grouped["sentiment"].apply(
-            lambda x: (x == 1).sum()
+        # integer-code every (day, company) pair once
+        date_key = df["PostDate"].dt.normalize().rename("date")
+        grouped = df.groupby([date_key, df["company"]], sort=True, observed=True)
+        codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        keys = grouped.size().index
+
+        valid = codes >= 0  # rows with a missing company are not grouped
+        codes = codes[valid]
+        sentiment = df["sentiment"]
+        sentiment_base = df["sentiment_base"]
+
+        # positive tweets (sentiment == 1 or sentiment_base == 1) over all
+        # labelled tweets (sentiment in {-1, 1}, sentiment_base in {-1, 0, 1})
+        positive = sentiment.eq(1).fillna(False).to_numpy(dtype=np.int64) + (
+            sentiment_base.eq(1).fillna(False).to_numpy(dtype=np.int64)
         )
-        sentiment_negative_tweets_by_day = grouped["sentiment"].apply(
-            lambda x: (x == -1).sum()
-        )
-        sentiment_base_positive_tweets_by_day = grouped["sentiment_base"].apply(
-            lambda x: (x == 1).sum()
-        )
-        sentiment_base_neutral_tweets_by_day = grouped["sentiment_base"].apply(
-            lambda x: (x == 0).sum()
-        )
-        sentiment_base_negative_tweets_by_day = grouped["sentiment_base"].apply(
-            lambda x: (x == -1).sum()
+        labelled = sentiment.isin((1, -1)).to_numpy(dtype=np.int64) + (
+            sentiment_base.isin((1, 0, -1)).to_numpy(dtype=np.int64)
         )
 
-        # calculate the ratio of positive and negative tweets for each year and month
-        positive_ratios_by_day = (
-            sentiment_base_positive_tweets_by_day + sentiment_positive_tweets_by_day
-        ) / (
-            sentiment_positive_tweets_by_day
-            + sentiment_negative_tweets_by_day
-            + sentiment_base_positive_tweets_by_day
-            + sentiment_base_neutral_tweets_by_day
-            + sentiment_base_negative_tweets_by_day
+        return pd.DataFrame(
+            {
+                "positive": np.bincount(
+                    codes, weights=positive[valid], minlength=len(keys)
+                ),
+                "labelled": np.bincount(
+                    codes, weights=labelled[valid], minlength=len(keys)
+                ),
+            },
+            index=keys,
         )
 
-        # formatting
-        positive_ratios_by_day = positive_ratios_by_day.reset_index()
-        positive_ratios_by_day.rename(columns={0: "positive_ratio"}, inplace=True)
-        positive_ratios_by_day["yearmonthday"] = (
-            positive_ratios_by_day["year"].astype(str)
-            + "-"
-            + positive_ratios_by_day["month"].astype(str).str.zfill(2)
-            + "-"
-            + positive_ratios_by_day["day"].astype(str).str.zfill(2)
-        )
+    def __format_model_results(self, counts: pd.DataFrame) -> pd.DataFrame:
+        """
+        Positive ratio per day and company from the daily counts
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            positive_ratio = (counts["positive"] / counts["labelled"]).to_numpy()
+
+        positive_ratios_by_day = counts.index.to_frame(index=False)
+        dates = positive_ratios_by_day.pop("date")
+        positive_ratios_by_day.insert(0, "year", dates.dt.year)
+        positive_ratios_by_day.insert(1, "month", dates.dt.month)
+        positive_ratios_by_day.insert(2, "day", dates.dt.day)
+        positive_ratios_by_day["positive_ratio"] = positive_ratio
+        positive_ratios_by_day["yearmonthday"] = dates.dt.strftime("%Y-%m-%d")
 
         return positive_ratios_by_day
 
+    def __group_model_results(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Grouping model results
+
+        by: date (normalized PostDate) and company
+        """
+        return self.__format_model_results(self.__count_model_results(df))
+
     def __adjust_returns_with_company_names(self, df: pd.DataFrame):
         """
         Rename returns to webscrapped names
@@ -123,10 +171,128 @@ class Preprocessing:
 
         return grouped_analysed_tweets, returns
 
+    def process_streaming(
+        self,
+        analysed_tweets_path: os.PathLike,
+        returns: pd.DataFrame,
+        chunksize=500_000,
+    ):
+        """
+        Same output as process, reading the analysed tweets CSV chunk by chunk.
+
+        Each chunk is reduced to daily counts per company before the next one
+        is read, so peak memory depends on days x companies, not on tweets.
+        """
+        counts = None
+        for chunk in pd.read_csv(
+            analysed_tweets_path,
+            usecols=TWEETS_COLUMNS,
+            dtype=TWEETS_DTYPES,
+            chunksize=chunksize,
+        ):
+            chunk = self.__process_analysed_tweets_chunk(chunk)
+            partial_counts = self.__count_model_results(chunk)
+            partial_counts.index = partial_counts.index.set_levels(
+                partial_counts.index.levels[1].astype(str), level="company"
+            )
+
+            # merge the partial aggregates (a day can span two chunks)
+            if counts is not None:
+                partial_counts = (
+                    pd.concat([counts, partial_counts])
+                    .groupby(level=["date", "company"])
+                    .sum()
+                )
+            counts = partial_counts
+
+        if counts is None:
+            counts = pd.DataFrame(
+                {"positive": [], "labelled": []},
+                index=pd.MultiIndex.from_arrays(
+                    [pd.DatetimeIndex([]), pd.Index([], dtype=str)],
+                    names=["date", "company"],
+                ),
+            )
+        grouped_analysed_tweets = self.__format_model_results(counts)
+
+        returns = self.__process_returns(returns)
+        returns = self.__adjust_returns_with_company_names(returns)
+
+        return grouped_analysed_tweets, returns
+
+
+def series_tests(name, series, nlags=40):
+    """
+    ADF, KPSS and ACF/PACF summary of one series, as a flat dict.
+
+    Module-level so that it can run in a process pool. A series the tests
+    fail on (constant, too short...) gets a row with only its "error", so
+    that one series does not stop the batch.
+    """
+    series = pd.Series(series).dropna()
+    n_obs = len(series)
+    nlags = min(nlags, n_obs // 2 - 1)
+
+    try:
+        result = _series_tests(name, series, n_obs, nlags)
+    except Exception as error:
+        return {
+            "series": name,
+            "n_obs": n_obs,
+            "error": f"{type(error).__name__}: {error}",
+        }
+    result["error"] = None
+    return result
+
+
+def _series_tests(name, series, n_obs, nlags):
+    adf_statistic, adf_p_value, adf_lags, _, adf_critical_values, _ = adfuller(series)
+    with warnings.catch_warnings():
+        # KPSS p-values are interpolated in a table and warn at its bounds
+        warnings.simplefilter("ignore", InterpolationWarning)
+        kpss_statistic, kpss_p_value, kpss_lags, kpss_critical_values = kpss(
+            series, regression="c", nlags="auto"
+        )
+
+    # lags outside the +/- 2 standard errors band, lag 0 excluded
+    bound = 2 / np.sqrt(n_obs)
+    acf_values = acf(series, nlags=nlags)[1:]
+    pacf_values = pacf(series, nlags=nlags)[1:]
+
+    result = {
+        "series": name,
+        "n_obs": n_obs,
+        "adf_statistic": adf_statistic,
+        "adf_p_value": adf_p_value,
+        "adf_lags": adf_lags,
+    }
+    result.update(
+        {f"adf_critical_{key}": value for key, value in adf_critical_values.items()}
+    )
+    result.update(
+        {
+            "kpss_statistic": kpss_statistic,
+            "kpss_p_value": kpss_p_value,
+            "kpss_lags": kpss_lags,
+        }
+    )
+    result.update(
+        {f"kpss_critical_{key}": value for key, value in kpss_critical_values.items()}
+    )
+    result.update(
+        {
+            "acf_significant_lags": int((np.abs(acf_values) > bound).sum()),
+            "pacf_significant_lags": int((np.abs(pacf_values) > bound).sum()),
+        }
+    )
+    return result
+
 
 class StatisticalTests:
     def __init__(self, save_path) -> None:
         self.save_path = save_path
+        self.ccf_cache = {}
+        self.render_manifest_path = f"{save_path}render_manifest.json"
 
     def dickey_fuller_test(self, series: pd.Series):
         # Perform Dickey-Fuller test
@@ -165,20 +331,96 @@ class StatisticalTests:
         else:
             print("The series is likely stationary.")
 
-    def acf_pacf_test(self, series: pd.Series, filename: str = None):
+    def acf_pacf_test(
+        self, series: pd.Series, filename: str = None, render=True, lags=40
+    ):
+        """
+        Save the ACF/PACF plot of a series with a filename, or draw it on a
+        new pyplot figure, left open for the caller to show.
+
+        render: if False, the figure job is returned instead of rendered, to
+            be rendered with the other jobs of a batch (see render_figures)
+        """
+        if filename:
+            # saved figures go through the rendering stage (skipped if unchanged)
+            job = figure_job(
+                "acf_pacf",
+                f"{self.save_path}acf_pacf_plot_{filename}.png",
+                {"series": series},
+                lags=int(lags),
+            )
+            if render:
+                render_figures([job], self.render_manifest_path)
+            return job
+
+        # drawn on the current pyplot figure, without blocking (as before)
         plt.figure(figsize=(12, 6))
 
         plt.subplot(121)
-        plot_acf(series, ax=plt.gca(), lags=40)
+        plot_acf(series, ax=plt.gca(), lags=lags)
         plt.title("Autocorrelation Function")
 
         plt.subplot(122)
-        plot_pacf(series, ax=plt.gca(), lags=40)
+        plot_pacf(series, ax=plt.gca(), lags=lags)
         plt.title("Partial Autocorrelation Function")
 
         plt.tight_layout()
-        if filename:
-            plt.savefig(f"{self.save_path}acf_pacf_plot_{filename}.png")
+        return None
+
+    def compute_ccf(self, x, y, lag_range):
+        """
+        Cross-correlation between series x and y at lags -lag_range..lag_range.
+
+        Every lag is computed by one FFT and cached by the content of x and y,
+        so other lag windows of the same pair are served from the cache.
+        """
+        x_values = np.asarray(x, dtype=float)
+        y_values = np.asarray(y, dtype=float)
+        key = hashlib.sha1(x_values.tobytes() + y_values.tobytes()).hexdigest()
+
+        if key not in self.ccf_cache:
+            self.ccf_cache[key] = ccf_frame(
+                {"ccf": (x_values, y_values)}, max_lag=len(x_values) - 1
+            )["ccf"]
+        cc = self.ccf_cache[key].loc[-lag_range:lag_range]
+        return cc.index.to_numpy(), cc.to_numpy()
+
+    def plot_ccf_values(
+        self,
+        lags,
+        cc,
+        n,
+        title,
+        filename: str = "ccf_plot.png",
+        figsize=(12, 5),
+        title_fontsize=15,
+        xlabel_fontsize=16,
+        ylabel_fontsize=16,
+        render=True,
+    ):
+        """
+        Plot already computed cross-correlations (see compute_ccf).
+
+        render: if False, the figure job is returned instead of rendered, to
+            be rendered with the other jobs of a batch (see render_figures)
+        """
+        if not filename:
+            return None
+
+        job = figure_job(
+            "ccf",
+            f"{self.save_path}ccf_plot_{filename}.png",
+            {"lags": lags, "cc": cc},
+            n=n,
+            title=title,
+            figsize=figsize,
+            title_fontsize=title_fontsize,
+            xlabel_fontsize=xlabel_fontsize,
+            ylabel_fontsize=ylabel_fontsize,
+        )
+        if render:
+            render_figures([job], self.render_manifest_path)
+        return job
 
     def plot_ccf(
         self,
@@ -190,43 +432,26 @@ class StatisticalTests:
         title_fontsize=15,
         xlabel_fontsize=16,
         ylabel_fontsize=16,
+        render=True,
     ):
         """
-        Plot cross-correlation between series x and y.
+        Plot cross-correlation between series x and y (see plot_ccf_values).
         """
 
         title = "{} & {}".format(x.name, y.name)
-        lags = np.arange(
-            -lag_range, lag_range + 1
-        )  # This should include zero, hence +1
-        ccf_yx = sm.tsa.stattools.ccf(y, x, adjusted=False)[
-            : lag_range + 1
-        ]  # Include up to the lag_range
-        ccf_xy = sm.tsa.stattools.ccf(x, y, adjusted=False)[
-            : lag_range + 1
-        ]  # Same here
-
-        ccf_yx = ccf_yx[1:][
-            ::-1
-        ]  # Reverse and ignore the zero-lag, this should now be of length lag_range
-        cc = np.concatenate(
-            [ccf_yx, ccf_xy]
-        )  # Ensure this concatenation results in 2*lag_range + 1 elements
-
-        sigma = 1 / np.sqrt(len(x))  # Standard error for confidence intervals
-        fig, ax = plt.subplots(figsize=figsize)
-        ax.vlines(lags, 0, cc, label="CCF")  # Ensure lags and cc are of same length
-        ax.axhline(0, color="black", linewidth=1.0)
-        ax.axhline(2 * sigma, color="red", linestyle="-.", linewidth=0.6)
-        ax.axhline(-2 * sigma, color="red", linestyle="-.", linewidth=0.6)
-        ax.set_xlabel("Lag", fontsize=xlabel_fontsize)
-        ax.set_ylabel("Cross-Correlation", fontsize=ylabel_fontsize)
-        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
-        fig.suptitle(title, fontsize=title_fontsize, fontweight="bold", y=0.95)
-
-        if filename:
-            plt.savefig(f"{self.save_path}ccf_plot_{filename}.png")
-        plt.close(fig)
+        lags, cc = self.compute_ccf(x, y, lag_range)
+        return self.plot_ccf_values(
+            lags,
+            cc,
+            len(x),
+            title,
+            filename=filename,
+            figsize=figsize,
+            title_fontsize=title_fontsize,
+            xlabel_fontsize=xlabel_fontsize,
+            ylabel_fontsize=ylabel_fontsize,
+            render=render,
+        )
 
     def compute_statistical_tests(
         self, x: pd.Series, y: pd.Series = None, filename: str = None
@@ -244,6 +469,245 @@ class StatisticalTests:
             if user_input == "yes":
                 self.plot_ccf(x, y, lag_range=30, filename=filename)
 
+    def compute_statistical_tests_batch(
+        self,
+        panel,
+        pairs=(),
+        adf_p_value_gate=0.05,
+        kpss_p_value_gate=0.05,
+        lag_range=30,
+        max_workers=None,
+        save_plots=False,
+    ):
+        """
+        Non-interactive version of compute_statistical_tests for a whole panel.
+
+        panel: DataFrame or dict {name: series}
+        pairs: (x_name, y_name) pairs whose CCF is computed when both series
+            pass the gates: ADF p-value < adf_p_value_gate (no unit root) and
+            KPSS p-value >= kpss_p_value_gate (stationarity not rejected)
+
+        return: (tests, ccf_summary), tests indexed by series name with the
+            statistic, p-value, lags and critical values of each test, and the
+            "error" of the series the tests failed on (NaN statistics, not
+            stationary, no plot)
+        """
+        panel = dict(panel.items())
+        names = list(panel)
+
+        if max_workers == 1 or len(names) < 2:
+            rows = [series_tests(name, panel[name]) for name in names]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                rows = list(
+                    pool.map(series_tests, names, [panel[name] for name in names])
+                )
+
+        tests = pd.DataFrame(rows).set_index("series")
+        # series in error have NaN p-values, hence are never stationary
+        tests["stationary"] = (tests["adf_p_value"] < adf_p_value_gate) & (
+            tests["kpss_p_value"] >= kpss_p_value_gate
+        )
+
+        ccf_rows, jobs = [], []
+        for x_name, y_name in pairs:
+            both_stationary = bool(
+                tests.loc[x_name, "stationary"] and tests.loc[y_name, "stationary"]
+            )
+            row = {"x": x_name, "y": y_name, "ccf_computed": both_stationary}
+
+            if both_stationary:
+                # Align both series to the same dates
+                combined_data = pd.concat(
+                    [panel[x_name], panel[y_name]], axis=1
+                ).dropna()
+                x = combined_data.iloc[:, 0].rename(x_name)
+                y = combined_data.iloc[:, 1].rename(y_name)
+
+                lags, cc = self.compute_ccf(x, y, lag_range)
+                row.update(
+                    {
+                        "max_abs_ccf": np.abs(cc).max(),
+                        "lag_of_max_abs_ccf": lags[np.abs(cc).argmax()],
+                        "significant_lags": int(
+                            (np.abs(cc) > 2 / np.sqrt(len(x))).sum()
+                        ),
+                    }
+                )
+                if save_plots:
+                    jobs.append(
+                        self.plot_ccf(
+                            x,
+                            y,
+                            lag_range=lag_range,
+                            filename=f"{x_name}_{y_name}",
+                            render=False,
+                        )
+                    )
+            ccf_rows.append(row)
+
+        if save_plots:
+            # the CCF and ACF/PACF figures are rendered together, in one pool
+            # with at most as many lags as the tests used
+            jobs += [
+                self.acf_pacf_test(
+                    pd.Series(panel[name]).dropna(),
+                    filename=name,
+                    render=False,
+                    lags=min(40, tests.loc[name, "n_obs"] // 2 - 1),
+                )
+                for name in names
+                if tests.loc[name, "error"] is None
+            ]
+            render_figures(jobs, self.render_manifest_path, max_workers=max_workers)
+
+        return tests, pd.DataFrame(ccf_rows)
+
+
+THRESHOLD_COLUMNS = [
+    "strong_pos_threshold",
+    "strong_neg_threshold",
+    "neutral_threshold",
+]
+
+# read-only matrices shared by the threshold grid worker processes
+_grid_signals = None
+_grid_market_returns = None
+
+
+def threshold_grid(strong_pos_values, strong_neg_values, neutral_values):
+    """
+    Every (strong_pos, strong_neg, neutral) combination, as a (n, 3) array
+    """
+    mesh = np.meshgrid(
+        strong_pos_values, strong_neg_values, neutral_values, indexing="ij"
+    )
+    return np.stack([axis.ravel() for axis in mesh], axis=1).astype(float)
+
+
+def _threshold_chunk_accuracy(signals, market_returns, thresholds):
+    """
+    Accuracy (%) per (threshold triple, company) for one chunk of thresholds,
+    from a (thresholds x days x companies) boolean tensor
+    """
+    matches = DailyModelEvaluation._prediction_matches_matrix(
+        signals[None, :, :],
+        market_returns[None, :, :],
+        thresholds[:, 0, None, None],
+        thresholds[:, 1, None, None],
+        thresholds[:, 2, None, None],
+    )
+    return matches.sum(axis=1) / signals.shape[0] * 100
+
+
+def _init_grid_worker(signals, market_returns):
+    global _grid_signals, _grid_market_returns
+    _grid_signals = signals
+    _grid_market_returns = market_returns
+
+
+def _grid_worker(thresholds):
+    return _threshold_chunk_accuracy(_grid_signals, _grid_market_returns, thresholds)
+
+
+def evaluate_threshold_grid(
+    signals, market_returns, thresholds, chunk_size=64, n_jobs=1
+):
+    """
+    Accuracy (%) of every threshold triple for every company.
+
+    thresholds: (n, 3) array of (strong_pos, strong_neg, neutral)
+    chunk_size: number of triples evaluated per boolean tensor, which bounds
+        memory to chunk_size x days x companies
+    n_jobs: number of worker processes, the matrices are sent once per worker
+    """
+    thresholds = np.asarray(thresholds, dtype=float).reshape(-1, 3)
+    chunks = [
+        thresholds[start : start + chunk_size]
+        for start in range(0, len(thresholds), chunk_size)
+    ]
+    if signals.shape[0] == 0 or not chunks:
+        return np.full((len(thresholds), signals.shape[1]), np.nan)
+
+    if n_jobs == 1:
+        accuracies = [
+            _threshold_chunk_accuracy(signals, market_returns, chunk)
+            for chunk in chunks
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_grid_worker,
+            initargs=(signals, market_returns),
+        ) as pool:
+            accuracies = list(pool.map(_grid_worker, chunks))
+
+    return np.concatenate(accuracies, axis=0)
+
+
+class EvaluationPanel:
+    """
+    Buy/sell signals and market returns of the companies present in both
+    inputs, aligned on their common dates as (days x companies) matrices.
+
+    `columns` maps a company to its column in the matrices.
+    """
+
+    def __init__(self, dates, companies, signals, market_returns):
+        self.dates = dates
+        self.companies = list(companies)
+        self.columns = {company: i for i, company in enumerate(self.companies)}
+        self.signals = signals
+        self.market_returns = market_returns
+
+    @classmethod
+    def from_frames(cls, shortlongdf: pd.DataFrame, adjusted_returns: pd.DataFrame):
+        """
+        Inner join of the signals (indexed by day) and the returns (with a
+        "date" column) on the date, done once for every evaluation method.
+        """
+        signals = shortlongdf.set_axis(pd.to_datetime(shortlongdf.index), axis=0)
+        returns = adjusted_returns.set_axis(
+            pd.to_datetime(adjusted_returns["date"]), axis=0
+        )
+        evaluation_df = signals.join(
+            returns, how="inner", lsuffix="_buysell", rsuffix="_market"
+        )
+
+        companies, buysell_columns, market_columns = [], [], []
+        for column in evaluation_df.columns:
+            if "_buysell" in column:
+                company_name = column.split("_buysell")[0]
+                market_column = company_name + "_market"
+                if market_column in evaluation_df.columns:
+                    companies.append(company_name)
+                    buysell_columns.append(column)
+                    market_columns.append(market_column)
+
+        return cls(
+            evaluation_df.index,
+            companies,
+            evaluation_df[buysell_columns].to_numpy(dtype=float),
+            evaluation_df[market_columns].to_numpy(dtype=float),
+        )
+
+    def series(self, company):
+        """(signal, market return) Series of a company, named like the join"""
+        i = self.columns[company]
+        return (
+            pd.Series(self.signals[:, i], index=self.dates, name=company + "_buysell"),
+            pd.Series(
+                self.market_returns[:, i], index=self.dates, name=company + "_market"
+            ),
+        )
+
+    def to_frame(self):
+        """The joined "<company>_buysell" / "<company>_market" columns"""
+        return pd.concat(
+            [series for company in self.companies for series in self.series(company)],
+            axis=1,
+        )
+
 
 class DailyModelEvaluation(StatisticalTests):
     def __init__(
@@ -254,6 +718,8 @@ class DailyModelEvaluation(StatisticalTests):
         verbose: bool = False,
     ) -> None:
         super().__init__(save_path)
+        self._evaluation_panel = None
+        self.shortlongdf = None  # Initialize shortlongdf attribute
         self.grouped_analysed_tweets = analysed_tweets.copy()
         self.adjusted_returns = returns.copy()
 
@@ -261,7 +727,46 @@ class DailyModelEvaluation(StatisticalTests):
         self.strong_pos_threshold = 0.5
         self.strong_neg_threshold = -0.5
         self.neutral_threshold = 0.5
-        self.shortlongdf = None  # Initialize shortlongdf attribute
+
+    @property
+    def grouped_analysed_tweets(self):
+        return self._grouped_analysed_tweets
+
+    @grouped_analysed_tweets.setter
+    def grouped_analysed_tweets(self, df: pd.DataFrame):
+        self._grouped_analysed_tweets = df
+        self.shortlongdf = None
+        self.invalidate_evaluation_panel()
+
+    @property
+    def adjusted_returns(self):
+        return self._adjusted_returns
+
+    @adjusted_returns.setter
+    def adjusted_returns(self, df: pd.DataFrame):
+        self._adjusted_returns = df
+        self.invalidate_evaluation_panel()
+
+    def invalidate_evaluation_panel(self):
+        """
+        Drop the cached evaluation panel, to be called after modifying the
+        inputs in place (assigning new inputs already does it)
+        """
+        self._evaluation_panel = None
+
+    @property
+    def evaluation_panel(self) -> EvaluationPanel:
+        """
+        Signals joined with the market returns, built on first use and shared
+        by the evaluation methods until the inputs change
+        """
+        if self._evaluation_panel is None:
+            if self.shortlongdf is None:
+                self.short_or_long()
+            self._evaluation_panel = EvaluationPanel.from_frames(
+                self.shortlongdf, self.adjusted_returns
+            )
+        return self._evaluation_panel
 
     def update_thresholds(
         self, strong_pos_threshold, strong_neg_threshold, neutral_threshold
@@ -288,170 +793,113 @@ class DailyModelEvaluation(StatisticalTests):
             return False
 
     def short_or_long(self):
-        """new dataframe with buy or sell at t"""
+        """
+        new dataframe with buy or sell at t
 
-        positive_ratios_by_day = self.grouped_analysed_tweets.copy()
+        positive_ratio is pivoted once to a (dates x companies) matrix, lagged
+        by one observation of each company and mapped to [-1, 1] with
+        (x - 0.5) * 2, for all companies at once.
 
-        date_index = positive_ratios_by_day["yearmonthday"].unique().tolist()
-        companies = positive_ratios_by_day["company"].unique().tolist()
+        return: shortlongdf, the (dates x companies) signal panel
+        """
+        positive_ratios_by_day = self.grouped_analysed_tweets
+
+        date_index = positive_ratios_by_day["yearmonthday"].unique()
+        companies = positive_ratios_by_day["company"].unique()
+
+        ratios = positive_ratios_by_day.pivot(
+            index="yearmonthday", columns="company", values="positive_ratio"
+        ).reindex(index=date_index, columns=companies)
+        observed = (
+            positive_ratios_by_day.assign(observed=True)
+            .pivot(index="yearmonthday", columns="company", values="observed")
+            .reindex(index=date_index, columns=companies)
+            .notna()
+            .to_numpy()
+        )
 
-        self.shortlongdf = pd.DataFrame(index=date_index)
+        # lag the sentiments 1 day: previous date on which the company has a
+        # row (its previous row in the grouped table), not the previous date
+        rows = np.arange(len(date_index))[:, None]
+        last_observed = np.maximum.accumulate(np.where(observed, rows, -1), axis=0)
+        previous = np.vstack([np.full((1, len(companies)), -1), last_observed[:-1]])
+        shifted = np.take_along_axis(ratios.to_numpy(), np.maximum(previous, 0), axis=0)
+        shifted[(previous < 0) | ~observed] = np.nan
 
-        for company in companies:
-            # selection of the company
-            mask = positive_ratios_by_day["company"] == company
-            stock_ratios = positive_ratios_by_day.loc[mask, :]
+        # faire log ou la difference premiere, test de racines unitaire
+        # pour voir si les moments sont invariants avec le temps
 
-            # lag the sentiments 1 day
-            stock_ratios.loc[:, "positive_ratio_shifted"] = stock_ratios[
-                "positive_ratio"
-            ].shift(1)
+        # STOCK_RATIONS BETWEEN -1 and 1
+        self.shortlongdf = pd.DataFrame(
+            (shifted - 0.5) * 2, index=date_index.tolist(), columns=companies.tolist()
+        )
 
-            # faire log ou la difference premiere, test de racines unitaire
-            # pour voir si les moments sont invariants avec le temps
+        self.invalidate_evaluation_panel()
+        return self.shortlongdf
 
-            stock_ratios.loc[:, "buy_or_sell"] = (
-                stock_ratios["positive_ratio_shifted"] - 0.5
-            ) * 2
+    @staticmethod
+    def _prediction_matches_matrix(
+        signals,
+        market_returns,
+        strong_pos_threshold,
+        strong_neg_threshold,
+        neutral_threshold,
+    ):
+        """
+        Vectorized prediction_matches: NaN signals or returns never match
+        """
+        strong_positive = (signals > strong_pos_threshold) & (market_returns > 0)
+        strong_negative = (signals < strong_neg_threshold) & (market_returns < 0)
+        neutral = (
+            (-neutral_threshold <= signals)
+            & (signals <= neutral_threshold)
+            & (-0.05 <= market_returns)
+            & (market_returns <= 0.05)
+        )
+        return strong_positive | strong_negative | neutral
 
-            # STOCK_RATIONS BETWEEN -1 and 1
-            stock_ratios.set_index("yearmonthday", inplace=True)
+    @staticmethod
+    def _accuracy_frame(companies, matches):
+        """Accuracy (%) per company from a (days x companies) match matrix"""
+        total_signals = matches.shape[0]
+        if total_signals == 0:
+            return pd.DataFrame.from_dict({}, orient="index")
 
-            self.stock_ratios = stock_ratios
-            # saving info in a dataframe
-            self.shortlongdf[company] = stock_ratios["buy_or_sell"]
+        accuracy = matches.sum(axis=0) / total_signals * 100
+        return pd.DataFrame({"Accuracy (%)": accuracy}, index=companies)
 
     def evaluate_model_accuracy(self):
-        self.adjusted_returns.index = pd.to_datetime(self.adjusted_returns["date"])
-        self.shortlongdf.index = pd.to_datetime(self.shortlongdf.index)
-
-        evaluation_df = self.shortlongdf.join(
-            self.adjusted_returns, how="inner", lsuffix="_buysell", rsuffix="_market"
+        panel = self.evaluation_panel
+        matches = self._prediction_matches_matrix(
+            panel.signals, panel.market_returns, 0.5, -0.5, 0.5
         )
+        return self._accuracy_frame(panel.companies, matches)
 
-        accuracy_metrics = {}
-
-        def prediction_matches(signal, market_return):
-            if signal > 0.5 and market_return > 0:  # strong positive signal
-                return True
-            elif signal < -0.5 and market_return < 0:  # strong negative signal
-                return True
-            elif (
-                -0.5 <= signal <= 0.5 and -0.05 <= market_return <= 0.05
-            ):  # neutral signal
-                return True
-            else:
-                return False
-
-        for _, row in evaluation_df.iterrows():
-            for column in evaluation_df.columns:
-                if "_buysell" in column:
-                    company_name = column.split("_buysell")[0]
-                    market_column = company_name + "_market"
-
-                    if market_column in evaluation_df.columns:
-                        if company_name not in accuracy_metrics:
-                            accuracy_metrics[company_name] = {
-                                "correct_predictions": 0,
-                                "total_signals": 0,
-                            }
-
-                        accuracy_metrics[company_name]["total_signals"] += 1
-
-                        if prediction_matches(row[column], row[market_column]):
-                            accuracy_metrics[company_name]["correct_predictions"] += 1
-
-        return pd.DataFrame.from_dict(
-            {
-                stock: {
-                    "Accuracy (%)": (
-                        (metrics["correct_predictions"] / metrics["total_signals"])
-                        * 100
-                        if metrics["total_signals"] > 0
-                        else 0
-                    )
-                }
-                for stock, metrics in accuracy_metrics.items()
-            },
-            orient="index",
+    def evaluate_model_accuracy_with_thresholds(
+        self, thresholds, chunk_size=64, n_jobs=1
+    ):
+        """
+        Mean accuracy over companies for every (strong_pos, strong_neg, neutral)
+        triple, all triples evaluated by broadcasting (see evaluate_threshold_grid)
+        """
+        panel = self.evaluation_panel
+        if self.verbose:
+            print(panel.to_frame())
+
+        thresholds = np.asarray(thresholds, dtype=float).reshape(-1, 3)
+        accuracy = evaluate_threshold_grid(
+            panel.signals,
+            panel.market_returns,
+            thresholds,
+            chunk_size=chunk_size,
+            n_jobs=n_jobs,
         )
 
-    def evaluate_model_accuracy_with_thresholds(self, thresholds):
-        self.short_or_long()  # Ensure shortlongdf is created
-        self.adjusted_returns.index = pd.to_datetime(self.adjusted_returns["date"])
-        self.shortlongdf.index = pd.to_datetime(self.shortlongdf.index)
-
-        evaluation_df = self.shortlongdf.join(
-            self.adjusted_returns, how="inner", lsuffix="_buysell", rsuffix="_market"
+        results = pd.DataFrame(thresholds, columns=THRESHOLD_COLUMNS)
+        results["mean_accuracy"] = (
+            accuracy.mean(axis=1) if panel.companies else np.full(len(results), np.nan)
         )
-        print(evaluation_df)
-        results = []
-        for strong_pos_threshold, strong_neg_threshold, neutral_threshold in thresholds:
-            accuracy_metrics = {}
-
-            def prediction_matches(signal, market_return):
-                if (
-                    signal > strong_pos_threshold and market_return > 0
-                ):  # strong positive signal
-                    return True
-                elif (
-                    signal < strong_neg_threshold and market_return < 0
-                ):  # strong negative signal
-                    return True
-                elif (
-                    -neutral_threshold <= signal <= neutral_threshold
-                    and -0.05 <= market_return <= 0.05
-                ):  # neutral signal
-                    return True
-                else:
-                    return False
-
-            for _, row in evaluation_df.iterrows():
-                for column in evaluation_df.columns:
-                    if "_buysell" in column:
-                        company_name = column.split("_buysell")[0]
-                        market_column = company_name + "_market"
-
-                        if market_column in evaluation_df.columns:
-                            if company_name not in accuracy_metrics:
-                                accuracy_metrics[company_name] = {
-                                    "correct_predictions": 0,
-                                    "total_signals": 0,
-                                }
-
-                            accuracy_metrics[company_name]["total_signals"] += 1
-
-                            if prediction_matches(row[column], row[market_column]):
-                                accuracy_metrics[company_name][
-                                    "correct_predictions"
-                                ] += 1
-
-            accuracy_df = pd.DataFrame.from_dict(
-                {
-                    stock: {
-                        "Accuracy (%)": (
-                            (metrics["correct_predictions"] / metrics["total_signals"])
-                            * 100
-                            if metrics["total_signals"] > 0
-                            else 0
-                        )
-                    }
-                    for stock, metrics in accuracy_metrics.items()
-                },
-                orient="index",
-            )
-
-            mean_accuracy = accuracy_df["Accuracy (%)"].mean()
-            results.append(
-                {
-                    "strong_pos_threshold": strong_pos_threshold,
-                    "strong_neg_threshold": strong_neg_threshold,
-                    "neutral_threshold": neutral_threshold,
-                    "mean_accuracy": mean_accuracy,
-                }
-            )
-
-        return pd.DataFrame(results)
+        return results
 
     def compute_signal_market_correlation(self):
         """
@@ -459,57 +907,98 @@ class DailyModelEvaluation(StatisticalTests):
         and market returns based on a 0.5 threshold for each date.
         """
         self.update_thresholds(0.5, -0.5, 0.5)  # Set thresholds to 0.5
-        self.short_or_long()  # Ensure shortlongdf is created
-        self.adjusted_returns.index = pd.to_datetime(self.adjusted_returns["date"])
-        self.shortlongdf.index = pd.to_datetime(self.shortlongdf.index)
+        panel = self.evaluation_panel
 
-        evaluation_df = self.shortlongdf.join(
-            self.adjusted_returns, how="inner", lsuffix="_buysell", rsuffix="_market"
-        )
+        correlation_results, jobs = {}, []
 
-        correlation_results = {}
+        for company_name in panel.companies:
+            signal_data, market_data = panel.series(company_name)
 
-        for column in evaluation_df.columns:
-            if "_buysell" in column:
-                company_name = column.split("_buysell")[0]
-                market_column = company_name + "_market"
+            # Align both series to the same dates
+            valid = signal_data.notna() & market_data.notna()
+            signal_data = signal_data[valid]
+            market_data = market_data[valid]
 
-                if market_column in evaluation_df.columns:
-                    signal_data = evaluation_df[column].dropna()
-                    market_data = evaluation_df[market_column].dropna()
-
-                    # Align both series to the same dates
-                    combined_data = pd.concat(
-                        [signal_data, market_data], axis=1
-                    ).dropna()
-                    signal_data = combined_data.iloc[:, 0]
-                    market_data = combined_data.iloc[:, 1]
-
-                    # Apply threshold logic to signal_data
-                    signal_data = signal_data.apply(
-                        lambda x: 1 if x > 0.5 else (-1 if x < -0.5 else 0)
+            # Apply threshold logic to signal_data
+            signal_data = pd.Series(
+                discretize_signal(signal_data, 0.5),
+                index=signal_data.index,
+                name=signal_data.name,
+            )
+            if (
+                len(signal_data) > 1 and len(market_data) > 1
+            ):  # Ensure there's enough data
+                # Compute Pearson correlation
+                pearson_corr, p_value = pearsonr(signal_data, market_data)
+
+                correlation_results[company_name] = {
+                    "Pearson Correlation": pearson_corr,
+                    "P-value": p_value,
+                }
+
+                # Optional: Plot Cross-Correlation Function (CCF)
+                jobs.append(
+                    self.plot_ccf(
+                        signal_data,
+                        market_data,
+                        lag_range=30,
+                        filename=company_name,
+                        render=False,
                     )
-                    if (
-                        len(signal_data) > 1 and len(market_data) > 1
-                    ):  # Ensure there's enough data
-                        # Compute Pearson correlation
-                        pearson_corr, p_value = pearsonr(signal_data, market_data)
-
-                        correlation_results[company_name] = {
-                            "Pearson Correlation": pearson_corr,
-                            "P-value": p_value,
-                        }
-
-                        # Optional: Plot Cross-Correlation Function (CCF)
-                        self.plot_ccf(
-                            signal_data,
-                            market_data,
-                            lag_range=30,
-                            filename=company_name,
-                        )
+                )
+
+        # the CCF figures of all the companies are rendered in one pool
+        render_figures(jobs, self.render_manifest_path)
 
         return pd.DataFrame.from_dict(correlation_results, orient="index")
 
+    def _discretized_signal_and_market_frames(self):
+        """Aligned (dates x companies) frames of discretized signals and returns"""
+        panel = self.evaluation_panel
+        signals = pd.DataFrame(
+            discretize_signal(panel.signals, 0.5),
+            index=panel.dates,
+            columns=panel.companies,
+        )
+        market_returns = pd.DataFrame(
+            panel.market_returns, index=panel.dates, columns=panel.companies
+        )
+        return signals, market_returns
+
+    def compute_rolling_signal_market_correlation(self, windows=(20, 60, 120)):
+        """
+        Rolling version of compute_signal_market_correlation for all companies
+        at once: one DataFrame per window, indexed by date, with
+        ("Pearson Correlation" | "P-value", company) columns.
+        """
+        signals, market_returns = self._discretized_signal_and_market_frames()
+
+        rolling_results = {}
+        for window in windows:
+            correlation, p_value = rolling_pearson(
+                signals.to_numpy(), market_returns.to_numpy(), window
+            )
+            rolling_results[window] = pd.concat(
+                {
+                    "Pearson Correlation": pd.DataFrame(
+                        correlation, index=signals.index, columns=signals.columns
+                    ),
+                    "P-value": pd.DataFrame(
+                        p_value, index=signals.index, columns=signals.columns
+                    ),
+                },
+                axis=1,
+            )
+        return rolling_results
+
+    def rolling_signal_market_correlation_tracker(self, window):
+        """
+        RollingCorrelation primed with the last `window` days, to be fed one
+        new day at a time with `update(new_signals, new_market_returns)`.
+        """
+        signals, market_returns = self._discretized_signal_and_market_frames()
+        return RollingCorrelation.from_history(signals, market_returns, window)
+
     def save_results_to_excel(self, save_path):
         with pd.ExcelWriter(f"{save_path}daily_model_results.xlsx") as writer:
             self.evaluate_model_accuracy().to_excel(writer, sheet_name="Model Accuracy")
@@ -519,69 +1008,43 @@ class DailyModelEvaluation(StatisticalTests):
 
         print("Results saved to daily_model_results.xlsx.")
 
-    def visualize_courbe(self, save_path):
+    def visualize_courbe(self, save_path, max_workers=None):
 
         os.makedirs(f"{save_path}correlation_curves/", exist_ok=True)
 
-        evaluation_df = self.shortlongdf.join(
-            self.adjusted_returns, how="inner", lsuffix="_buysell", rsuffix="_market"
-        )
+        panel = self.evaluation_panel
 
         def moving_average(data, window_size):
             return data.rolling(window=window_size, min_periods=1).mean()
 
-        unique_stocks = set(
-            col.split("_buysell")[0]
-            for col in evaluation_df.columns
-            if "_buysell" in col
+        # smoothed once for all companies
+        smoothed_signals = moving_average(pd.DataFrame(panel.signals), window_size=5)
+        smoothed_returns = moving_average(
+            pd.DataFrame(panel.market_returns), window_size=5
         )
 
-        for stock in unique_stocks:
-            buysell_col = stock + "_buysell"
-            market_col = stock + "_market"
-
-            if (
-                buysell_col in evaluation_df.columns
-                and market_col in evaluation_df.columns
-            ):
-                fig, ax1 = plt.subplots(figsize=(14, 7))
-
-                color = "tab:blue"
-                ax1.set_xlabel("Date")
-                ax1.set_ylabel("Signal", color=color)
-                smoothed_signal = moving_average(
-                    evaluation_df[buysell_col], window_size=5
+        jobs = []
+        for stock in sorted(panel.companies):
+            column = panel.columns[stock]
+            jobs.append(
+                figure_job(
+                    "signal_vs_market",
+                    f"{save_path}/correlation_curves/{stock}_smoothed_signal_vs_market_return.png",
+                    {
+                        "dates": panel.dates,
+                        "signal": smoothed_signals[column],
+                        "market_return": smoothed_returns[column],
+                    },
+                    stock=stock,
                 )
-                ax1.plot(
-                    evaluation_df.index,
-                    smoothed_signal,
-                    label="Smoothed Signal",
-                    color=color,
-                    alpha=0.7,
-                )
-                ax1.tick_params(axis="y", labelcolor=color)
-
-                ax2 = ax1.twinx()
-                color = "tab:red"
-                ax2.set_ylabel("Market Return", color=color)
-                smoothed_market_return = moving_average(
-                    evaluation_df[market_col], window_size=5
-                )
-                ax2.plot(
-                    evaluation_df.index,
-                    smoothed_market_return,
-                    label="Smoothed Market Return",
-                    color=color,
-                    alpha=0.7,
-                )
-                ax2.tick_params(axis="y", labelcolor=color)
+            )
 
-                fig.tight_layout()
-                plt.title(f"Smoothed Signal vs Market Return for {stock}")
-                plt.savefig(
-                    f"{save_path}/correlation_curves/{stock}_smoothed_signal_vs_market_return.png"
-                )
-                plt.close()
+        # figures are drawn in a process pool, unchanged ones are skipped
+        render_figures(
+            jobs,
+            f"{save_path}correlation_curves/render_manifest.json",
+            max_workers=max_workers,
+        )
 
     def launch(self):
 
@@ -592,12 +1055,21 @@ class DailyModelEvaluation(StatisticalTests):
         self.visualize_courbe(save_path=self.save_path)
 
 
-def sensitivity_analysis(thresholds, grouped_analysed_tweets, df_returns, save_path):
+def sensitivity_analysis(
+    thresholds,
+    grouped_analysed_tweets,
+    df_returns,
+    save_path,
+    chunk_size=64,
+    n_jobs=1,
+):
     model_evaluator = DailyModelEvaluation(
         grouped_analysed_tweets, df_returns, save_path=save_path, verbose=False
     )
 
-    results = model_evaluator.evaluate_model_accuracy_with_thresholds(thresholds)
+    results = model_evaluator.evaluate_model_accuracy_with_thresholds(
+        thresholds, chunk_size=chunk_size, n_jobs=n_jobs
+    )
     return results
 
 
@@ -617,17 +1089,42 @@ def plot_sensitivity_analysis(results, save_path):
     plt.close()
 
 
+def plot_sensitivity_surface(results, save_path):
+    """
+    Heatmap of mean accuracy over (strong_pos, strong_neg), keeping the best
+    neutral threshold for each cell
+    """
+    surface = results.pivot_table(
+        index="strong_neg_threshold",
+        columns="strong_pos_threshold",
+        values="mean_accuracy",
+        aggfunc="max",
+    )
+    fig, ax = plt.subplots(figsize=(10, 8))
+    image = ax.imshow(surface.to_numpy(), origin="lower", aspect="auto")
+    ax.set_xticks(range(len(surface.columns)))
+    ax.set_xticklabels([f"{v:.2f}" for v in surface.columns], rotation=90)
+    ax.set_yticks(range(len(surface.index)))
+    ax.set_yticklabels([f"{v:.2f}" for v in surface.index])
+    ax.set_xlabel("Strong Positive Threshold")
+    ax.set_ylabel("Strong Negative Threshold")
+    ax.set_title("Mean Accuracy (%) (best neutral threshold)")
+    fig.colorbar(image, ax=ax)
+    plt.savefig(os.path.join(save_path, "sensitivity_surface_plot.png"))
+    plt.close(fig)
+
+
 if __name__ == "__main__":
     WEBSCRAPPED_DATA_PATH = (
         "./../../data/webscrapped/predicted/twitter/concatenated_prediction.csv"
     )
     DAILY_STOCKS_RETURNS_PATH = "./../../data/stocks_daily_data.xlsx"
-    analysed_tweets = pd.read_csv(WEBSCRAPPED_DATA_PATH)
     df_returns = pd.read_excel(DAILY_STOCKS_RETURNS_PATH, index_col=0)
 
+    # the tweets are streamed in chunks instead of loaded in one read_csv
     preprocessor = Preprocessing()
-    grouped_analysed_tweets, df_returns = preprocessor.process(
-        analysed_tweets, df_returns
+    grouped_analysed_tweets, df_returns = preprocessor.process_streaming(
+        WEBSCRAPPED_DATA_PATH, df_returns
     )
 
     # Define a range of threshold values for analysis
@@ -662,6 +1159,25 @@ if __name__ == "__main__":
     )
     # Save plot
     plot_sensitivity_analysis(results, save_path="./../../data/results/daily_model/")
+
+    # Dense 3D grid over the three thresholds, evaluated in parallel
+    grid_results = sensitivity_analysis(
+        threshold_grid(
+            np.arange(0.05, 1.0001, 0.05),
+            np.arange(-1.0, -0.0499, 0.05),
+            np.arange(0.05, 1.0001, 0.05),
+        ),
+        grouped_analysed_tweets,
+        df_returns,
+        save_path="./../../data/results/daily_model/",
+        n_jobs=os.cpu_count(),
+    )
+    grid_results.to_csv(
+        "./../../data/results/daily_model/sensitivity_grid.csv", index=False
+    )
+    plot_sensitivity_surface(
+        grid_results, save_path="./../../data/results/daily_model/"
+    )
     # Optionally, continue with the normal evaluation process using default thresholds
     model_evaluator = DailyModelEvaluation(
         grouped_analysed_tweets,
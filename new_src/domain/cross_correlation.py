@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from scipy.fft import irfft, next_fast_len, rfft
+
+
+def ccf_batch(xs, ys, max_lag):
+    """
+    Cross-correlation of many (x, y) pairs at lags -max_lag..max_lag.
+
+    Same values as sm.tsa.stattools.ccf(x, y, adjusted=False) for the
+    positive lags and ccf(y, x) reversed for the negative lags, both
+    directions coming from a single FFT per pair.
+
+    xs, ys: sequences of 1d arrays, x and y of a pair having the same length
+    return: (lags, values) with values of shape (pairs, 2 * max_lag + 1)
+    """
+    lengths = np.array([len(x) for x in xs])
+    if len(xs) != len(ys) or any(len(y) != n for y, n in zip(ys, lengths)):
+        raise ValueError("x and y must have the same length in every pair.")
+    if max_lag >= lengths.min():
+        raise ValueError("max_lag must be smaller than the length of every series.")
+
+    # demeaned series, zero-padded to a common length (padding adds nothing)
+    size = lengths.max()
+    x_matrix = np.zeros((len(xs), size))
+    y_matrix = np.zeros((len(ys), size))
+    norm = np.zeros(len(xs))
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        x_matrix[i, : len(x)] = x - x.mean()
+        y_matrix[i, : len(y)] = y - y.mean()
+        norm[i] = len(x) * x.std() * y.std()
+
+    # circular cross-covariance, long enough to hold every lag without wrap
+    nfft = next_fast_len(2 * size - 1, real=True)
+    cross = irfft(
+        rfft(x_matrix, nfft, axis=1) * np.conj(rfft(y_matrix, nfft, axis=1)),
+        nfft,
+        axis=1,
+    )
+    # sum_t x[t + lag] * y[t], lag < 0 wrapping to the end of the array
+    lags = np.arange(-max_lag, max_lag + 1)
+    covariance = cross[:, lags % nfft]
+    return lags, covariance / norm[:, None]
+
+
+def ccf_frame(pairs, max_lag):
+    """
+    Cross-correlations of named (x, y) pairs as a DataFrame indexed by lag.
+
+    Every lag window up to max_lag is a slice of the result
+    (`frame.loc[-lag_range:lag_range]`), so computing the largest window
+    once serves the 30, 60 and 90 day windows alike.
+
+    pairs: dict {name: (x, y)}
+    """
+    names = list(pairs)
+    lags, values = ccf_batch(
+        [pairs[name][0] for name in names],
+        [pairs[name][1] for name in names],
+        max_lag,
+    )
+    return pd.DataFrame(values.T, index=pd.Index(lags, name="lag"), columns=names)
+
+
+def ccf_windows(pairs, lag_ranges):
+    """
+    Cross-correlations of named pairs for several lag windows, computed once
+    with the largest window.
+
+    return: dict {lag_range: DataFrame indexed by lag, one column per pair}
+    """
+    frame = ccf_frame(pairs, max(lag_ranges))
+    return {lag_range: frame.loc[-lag_range:lag_range] for lag_range in lag_ranges}
+
+
+def ccf_confidence_bound(n):
+    """Two standard errors of the cross-correlation of series of length n."""
+    return 2 / np.sqrt(n)
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
+import numpy as np
+from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
+
+# Rendering stage: figures are described by jobs holding already computed
+# series, rendered in worker processes, and skipped when the hash of their
+# inputs matches the one stored in the manifest. Renderers draw on Figure
+# objects (not pyplot), saved with the Agg canvas whatever the pyplot
+# backend, so rendering in the calling process is headless as well.
+
+
+def figure_job(kind, path, data, **params):
+    """
+    Describe one figure to render.
+
+    kind: name of a renderer in RENDERERS
+    path: output file of the figure
+    data: dict {name: 1d array-like} of already computed series
+    params: JSON serializable drawing parameters (titles, sizes...)
+    """
+    if kind not in RENDERERS:
+        raise ValueError(f"Unknown figure kind: {kind}")
+    return {
+        "kind": kind,
+        "path": path,
+        "data": {name: np.asarray(values) for name, values in data.items()},
+        "params": params,
+    }
+
+
+def job_hash(job):
+    """Hash of everything that determines the figure: kind, params and data."""
+    digest = hashlib.sha1(job["kind"].encode())
+    digest.update(json.dumps(job["params"], sort_keys=True, default=str).encode())
+    for name in sorted(job["data"]):
+        values = job["data"][name]
+        if values.dtype == object:
+            values = values.astype(str)
+        digest.update(name.encode())
+        digest.update(f"{values.dtype}{values.shape}".encode())
+        digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+def _render_var(path, data, params):
+    fig = Figure(figsize=(12, 6))
+    ax = fig.add_subplot()
+    ax.plot(
+        data["dates"], data["returns"], label="Rendement", color="black", linewidth=0.8
+    )
+    ax.plot(
+        data["dates"],
+        data["var_hist"],
+        label="VaR Historique",
+        color="blue",
+        linewidth=2,
+    )
+    ax.plot(
+        data["dates"],
+        data["var_adjusted"],
+        label="VaR Ajustée",
+        color="red",
+        linewidth=1,
+    )
+    ax.set_title(f"Value at Risk pour {params['asset']}", fontsize=14)
+    ax.set_xlabel("Date", fontsize=12)
+    ax.set_ylabel("Valeurs", fontsize=12)
+    ax.legend(fontsize=10)
+    ax.grid(alpha=0.5)
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def _render_signal_vs_market(path, data, params):
+    fig = Figure(figsize=(14, 7))
+    ax1 = fig.add_subplot()
+
+    color = "tab:blue"
+    ax1.set_xlabel("Date")
+    ax1.set_ylabel("Signal", color=color)
+    ax1.plot(
+        data["dates"],
+        data["signal"],
+        label="Smoothed Signal",
+        color=color,
+        alpha=0.7,
+    )
+    ax1.tick_params(axis="y", labelcolor=color)
+
+    ax2 = ax1.twinx()
+    color = "tab:red"
+    ax2.set_ylabel("Market Return", color=color)
+    ax2.plot(
+        data["dates"],
+        data["market_return"],
+        label="Smoothed Market Return",
+        color=color,
+        alpha=0.7,
+    )
+    ax2.tick_params(axis="y", labelcolor=color)
+
+    fig.tight_layout()
+    ax2.set_title(f"Smoothed Signal vs Market Return for {params['stock']}")
+    fig.savefig(path)
+
+
+def _render_ccf(path, data, params):
+    sigma = 1 / np.sqrt(params["n"])  # Standard error for confidence intervals
+    fig = Figure(figsize=params.get("figsize", (12, 5)))
+    ax = fig.add_subplot()
+    ax.vlines(data["lags"], 0, data["cc"], label="CCF")
+    ax.axhline(0, color="black", linewidth=1.0)
+    ax.axhline(2 * sigma, color="red", linestyle="-.", linewidth=0.6)
+    ax.axhline(-2 * sigma, color="red", linestyle="-.", linewidth=0.6)
+    ax.set_xlabel("Lag", fontsize=params.get("xlabel_fontsize", 16))
+    ax.set_ylabel("Cross-Correlation", fontsize=params.get("ylabel_fontsize", 16))
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+    fig.suptitle(
+        params["title"],
+        fontsize=params.get("title_fontsize", 15),
+        fontweight="bold",
+        y=0.95,
+    )
+    fig.savefig(path)
+
+
+def _render_acf_pacf(path, data, params):
+    lags = params.get("lags", 40)
+    fig = Figure(figsize=(12, 6))
+    acf_ax, pacf_ax = fig.subplots(1, 2)
+
+    plot_acf(data["series"], ax=acf_ax, lags=lags)
+    acf_ax.set_title("Autocorrelation Function")
+
+    plot_pacf(data["series"], ax=pacf_ax, lags=lags)
+    pacf_ax.set_title("Partial Autocorrelation Function")
+
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+RENDERERS = {
+    "var": _render_var,
+    "signal_vs_market": _render_signal_vs_market,
+    "ccf": _render_ccf,
+    "acf_pacf": _render_acf_pacf,
+}
+
+
+def _init_render_worker():
+    matplotlib.use("Agg")
+
+
+def _render_job(job):
+    os.makedirs(os.path.dirname(job["path"]) or ".", exist_ok=True)
+    RENDERERS[job["kind"]](job["path"], job["data"], job["params"])
+    return job["path"]
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def render_figures(jobs, manifest_path, max_workers=None):
+    """
+    Render the figures whose inputs changed since the last render.
+
+    A figure is skipped when its file exists and its input hash equals the one
+    stored in the manifest. With more than one job to render and max_workers
+    different from 1, figures are rendered in a process pool on Agg.
+
+    return: dict with the "rendered" and "skipped" output paths
+    """
+    manifest = load_manifest(manifest_path)
+    hashes = {job["path"]: job_hash(job) for job in jobs}
+
+    to_render, skipped = [], []
+    for job in jobs:
+        if (
+            os.path.exists(job["path"])
+            and manifest.get(job["path"], {}).get("hash") == hashes[job["path"]]
+        ):
+            skipped.append(job["path"])
+        else:
+            to_render.append(job)
+
+    if len(to_render) > 1 and max_workers != 1:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_render_worker
+        ) as pool:
+            rendered = list(pool.map(_render_job, to_render))
+    else:
+        rendered = [_render_job(job) for job in to_render]
+
+    for job in to_render:
+        manifest[job["path"]] = {"kind": job["kind"], "hash": hashes[job["path"]]}
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    with open(manifest_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=4, sort_keys=True)
+
+    return {"rendered": rendered, "skipped": skipped}
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import t as student
+
+
+def discretize_signal(signal, threshold=0.5):
+    """Signal to 1 (> threshold), -1 (< -threshold) or 0, NaN kept."""
+    signal = np.asarray(signal, dtype=float)
+    discrete = np.select([signal > threshold, signal < -threshold], [1.0, -1.0], 0.0)
+    return np.where(np.isnan(signal), np.nan, discrete)
+
+
+def _moments(x, y):
+    """Stacked x, y, x², y², xy, summed by the callers over days."""
+    return np.stack([x, y, x * x, y * y, x * y])
+
+
+def _pearson_from_sums(sums, count):
+    """
+    Pearson correlation and two-sided p-value (same as scipy.stats.pearsonr)
+    from the sums of _moments and the number of observations.
+    """
+    sum_x, sum_y, sum_xx, sum_yy, sum_xy = sums
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = sum_xy - sum_x * sum_y / count
+        variance_x = sum_xx - sum_x * sum_x / count
+        variance_y = sum_yy - sum_y * sum_y / count
+        correlation = covariance / np.sqrt(variance_x * variance_y)
+        correlation = np.where(
+            (count > 2) & (variance_x > 0) & (variance_y > 0),
+            np.clip(correlation, -1, 1),
+            np.nan,
+        )
+
+        dof = count - 2
+        t_statistic = correlation * np.sqrt(dof / (1 - correlation**2))
+        p_value = 2 * student.sf(np.abs(t_statistic), dof)
+    return correlation, p_value
+
+
+def _valid_values(x, y):
+    """Zero out days where the signal or the return is missing."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    return np.where(valid, x, 0.0), np.where(valid, y, 0.0), valid
+
+
+def rolling_pearson(x, y, window):
+    """
+    Rolling Pearson correlation and p-value of (days x companies) matrices.
+
+    Window sums are differences of cumulative sums, so the whole history costs
+    O(days x companies) whatever the window. Days where x or y is missing are
+    left out of the window, and windows with fewer than 3 observations are NaN.
+    """
+    x, y, valid = _valid_values(x, y)
+
+    cumulative = np.zeros((5, x.shape[0] + 1, x.shape[1]))
+    np.cumsum(_moments(x, y), axis=1, out=cumulative[:, 1:])
+    cumulative_count = np.zeros((x.shape[0] + 1, x.shape[1]))
+    np.cumsum(valid, axis=0, out=cumulative_count[1:])
+
+    end = np.arange(1, x.shape[0] + 1)
+    start = np.maximum(end - window, 0)
+    sums = cumulative[:, end] - cumulative[:, start]
+    count = cumulative_count[end] - cumulative_count[start]
+
+    return _pearson_from_sums(sums, count)
+
+
+class RollingCorrelation:
+    """
+    Windowed signal-market correlation per company, updated one day at a time.
+
+    Keeps the last `window` days in a ring buffer with their running sums, so
+    each new day costs O(1) per company instead of recomputing the history.
+    """
+
+    def __init__(self, companies, window):
+        self.companies = list(companies)
+        self.window = window
+        self._x = np.zeros((window, len(self.companies)))
+        self._y = np.zeros((window, len(self.companies)))
+        self._valid = np.zeros((window, len(self.companies)), dtype=bool)
+        self._sums = np.zeros((5, len(self.companies)))
+        self._count = np.zeros(len(self.companies))
+        self._position = 0
+        self._updates = 0
+
+    @classmethod
+    def from_history(cls, signals: pd.DataFrame, market_returns: pd.DataFrame, window):
+        """Start from the last `window` days of aligned (dates x companies) frames."""
+        rolling = cls(signals.columns, window)
+        for day in range(max(len(signals) - window, 0), len(signals)):
+            rolling.update(signals.iloc[day], market_returns.iloc[day])
+        return rolling
+
+    def update(self, new_signals, new_market_returns):
+        """
+        Add one day (signal and market return per company, Series indexed by
+        company or arrays in self.companies order) and drop the oldest one.
+
+        return: correlation over the current window, see `correlation`
+        """
+        if isinstance(new_signals, pd.Series):
+            new_signals = new_signals.reindex(self.companies)
+        if isinstance(new_market_returns, pd.Series):
+            new_market_returns = new_market_returns.reindex(self.companies)
+        x, y, valid = _valid_values(new_signals, new_market_returns)
+
+        oldest = self._position
+        self._sums -= _moments(self._x[oldest], self._y[oldest])
+        self._count -= self._valid[oldest]
+        self._x[oldest], self._y[oldest], self._valid[oldest] = x, y, valid
+        self._sums += _moments(x, y)
+        self._count += valid
+        self._position = (oldest + 1) % self.window
+
+        # recompute the sums from the buffer once per window to stop the
+        # floating point drift of the running additions and subtractions
+        self._updates += 1
+        if self._updates % self.window == 0:
+            self._sums = _moments(self._x, self._y).sum(axis=1)
+
+        return self.correlation()
+
+    def correlation(self):
+        """Pearson correlation and p-value per company over the current window."""
+        correlation, p_value = _pearson_from_sums(self._sums, self._count)
+        return pd.DataFrame(
+            {"Pearson Correlation": correlation, "P-value": p_value},
+            index=self.companies,
+        )
@@ -1,31 +1,42 @@
+# Lancé depuis new_src en tant que module : python -m domain.var_analyses
 import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from scipy.stats import chi2, norm
 
+from construction_portefeuille.market_panel import MarketPanel, attach
+from domain.rendering import figure_job, render_figures
+
 # --- PARAMÈTRES ---
 DATA_FOLDER = "../new_data/full_data"
 OUTPUT_FOLDER = "../new_output/results/var"
 GRAPH_FOLDER = os.path.join(OUTPUT_FOLDER, "graphs")
 WINDOW = 252  # Fenêtre de 1 an
 TAIL = 0.05  # 5% quantile pour la VaR
-
-# Création des dossiers de sortie si inexistants
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-os.makedirs(GRAPH_FOLDER, exist_ok=True)
+PANEL_FILE = os.path.join(os.path.dirname(DATA_FOLDER), "market_panel.bin")
+MAX_WORKERS = None  # Nombre de processus pour la VaR, None = nombre de CPU
+SEED = 42  # Graine du bootstrap, dont chaque actif reçoit une sous-graine
+FILE_SUFFIX = "_updated_financial_data.csv"
 
 # Fonction pour le calcul de la VaR historique et ajustée (pcr)
 
 
-def hist_var(serie, window, tail):
-    """Calcul de la VaR historique avec bootstrap."""
+def hist_var(serie, window, tail, rng=None):
+    """
+    Calcul de la VaR historique avec bootstrap.
+
+    :param rng: Générateur aléatoire (np.random.Generator), non initialisé
+        par une graine fixe par défaut.
+    """
+    rng = np.random.default_rng() if rng is None else rng
     n = len(serie)
     VaR = np.zeros(n)
 
     for i in range(window, n):
         z = serie[i - window : i]
-        sample = np.random.choice(z, size=100000, replace=True)
+        sample = rng.choice(z, size=100000, replace=True)
         sample.sort()
         VaR[i] = sample[int(np.ceil(len(sample) * tail)) - 1]
 
@@ -58,6 +69,26 @@ def adjust_var(
     return VaR_adjusted
 
 
+def asset_var(panel_file, asset, seed):
+    """
+    VaR historique et ajustée d'un actif, lu dans le panel partagé.
+
+    :param seed: Graine du bootstrap de l'actif : le résultat ne dépend pas
+        du processus qui le calcule (les processus créés par fork héritent
+        tous du même état aléatoire).
+    """
+    df = attach(panel_file).asset_frame(asset)
+
+    # Extraction des colonnes nécessaires
+    serie, put_call_ratio = df["Daily Return"].values, df["Put-Call Ratio"].values
+
+    # Calcul de la VaR
+    df["VaR_Hist"] = hist_var(serie, WINDOW, TAIL, np.random.default_rng(seed))
+    df["VaR_Adjusted"] = adjust_var(df["VaR_Hist"], put_call_ratio)
+    df["Asset"] = asset
+    return df
+
+
 # Fonctions pour le Backtesting
 
 
@@ -111,114 +142,100 @@ def binomial_test(returns, var, alpha=0.05):
     }
 
 
-# --- TRAITEMENT DES DONNÉES ---
-files = [f for f in os.listdir(DATA_FOLDER) if f.endswith(".csv")]
-results = []
-
-for file in files:
-    df = pd.read_csv(os.path.join(DATA_FOLDER, file))
-    df["Date"] = pd.to_datetime(df["Date"])
+def main():
+    # Création des dossiers de sortie si inexistants
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    os.makedirs(GRAPH_FOLDER, exist_ok=True)
 
-    # Extraction des colonnes nécessaires
-    serie, put_call_ratio = df["Daily Return"].values, df["Put-Call Ratio"].values
-
-    # Calcul de la VaR
-    df["VaR_Hist"] = hist_var(serie, WINDOW, TAIL)
-    df["VaR_Adjusted"] = adjust_var(df["VaR_Hist"], put_call_ratio)
-
-    asset_name = file.split("_")[0]
-    df["Asset"] = asset_name
-    results.append(df)
-
-# Fusion des résultats et exportation
-final_df = pd.concat(results, ignore_index=True)
-final_file = os.path.join(OUTPUT_FOLDER, "financial_data_with_var.csv")
-final_df.to_csv(final_file, index=False)
-print(f"✅ Données enregistrées dans {final_file}")
+    # --- TRAITEMENT DES DONNÉES ---
+    files = sorted(f for f in os.listdir(DATA_FOLDER) if f.endswith(FILE_SUFFIX))
 
-
-# --- CRÉATION DES GRAPHIQUES ---
-assets = final_df["Asset"].unique()
-for asset in assets:
-    asset_data = final_df[final_df["Asset"] == asset]
-
-    # Filtrage des données pour ne conserver que celles à partir de 2020-10-15
-    asset_data = asset_data[asset_data["Date"] >= "2020-10-15"]
-
-    plt.figure(figsize=(12, 6))
-    plt.plot(
-        asset_data["Date"],
-        asset_data["Daily Return"],
-        label="Rendement",
-        color="black",
-        linewidth=0.8,
-    )
-    plt.plot(
-        asset_data["Date"],
-        asset_data["VaR_Hist"],
-        label="VaR Historique",
-        color="blue",
-        linewidth=2,
-    )
-    plt.plot(
-        asset_data["Date"],
-        asset_data["VaR_Adjusted"],
-        label="VaR Ajustée",
-        color="red",
-        linewidth=1,
+    # Les CSV sont chargés une fois dans un panel mappé en mémoire (reconstruit
+    # s'ils ont changé), que les processus de calcul partagent sans copie. Les
+    # actifs portent le nom de la construction de portefeuille (ex. BHP_Group)
+    # et le panel est le même fichier que celui du pipeline
+    sources = {
+        file[: -len(FILE_SUFFIX)]: os.path.join(DATA_FOLDER, file) for file in files
+    }
+    MarketPanel.build(sources, PANEL_FILE)
+    assets = list(sources)
+    seeds = np.random.SeedSequence(SEED).spawn(len(assets))
+    with ProcessPoolExecutor(
+        max_workers=MAX_WORKERS, initializer=attach, initargs=(PANEL_FILE,)
+    ) as pool:
+        results = list(pool.map(asset_var, [PANEL_FILE] * len(assets), assets, seeds))
+
+    # Fusion des résultats et exportation
+    final_df = pd.concat(results, ignore_index=True)
+    final_file = os.path.join(OUTPUT_FOLDER, "financial_data_with_var.csv")
+    final_df.to_csv(final_file, index=False)
+    print(f"✅ Données enregistrées dans {final_file}")
+
+    # --- CRÉATION DES GRAPHIQUES ---
+    # Les séries sont préparées ici, le rendu est fait en parallèle (Agg) et
+    # les graphiques dont les données n'ont pas changé ne sont pas redessinés
+    assets = final_df["Asset"].unique()
+    jobs = []
+    for asset in assets:
+        asset_data = final_df[final_df["Asset"] == asset]
+
+        # Filtrage des données pour ne conserver que celles à partir de 2020-10-15
+        asset_data = asset_data[asset_data["Date"] >= "2020-10-15"]
+
+        jobs.append(
+            figure_job(
+                "var",
+                os.path.join(GRAPH_FOLDER, f"{asset}_VaR.png"),
+                {
+                    "dates": asset_data["Date"],
+                    "returns": asset_data["Daily Return"],
+                    "var_hist": asset_data["VaR_Hist"],
+                    "var_adjusted": asset_data["VaR_Adjusted"],
+                },
+                asset=asset,
+            )
+        )
+
+    rendering = render_figures(jobs, os.path.join(GRAPH_FOLDER, "manifest.json"))
+    for graph_path in rendering["rendered"]:
+        print(f"📊 Graphique sauvegardé : {graph_path}")
+    for graph_path in rendering["skipped"]:
+        print(f"📊 Graphique inchangé : {graph_path}")
+
+    # --- VALIDATION AVEC TESTS DE KUPIEC ET BINOMIAL ---
+    kupiec_results, binomial_results = [], []
+    for asset in assets:
+        asset_data = final_df[final_df["Asset"] == asset]
+
+        # Filtrage des données pour ne conserver que celles à partir de 2020-10-15
+        asset_data = asset_data[asset_data["Date"] >= "2020-10-15"]
+
+        returns, var_hist, var_adj = (
+            asset_data["Daily Return"],
+            asset_data["VaR_Hist"],
+            asset_data["VaR_Adjusted"],
+        )
+
+        for var_type, var in [("VaR_Hist", var_hist), ("VaR_Adjusted", var_adj)]:
+            kupiec_res = kupiec_test(returns, var)
+            binomial_res = binomial_test(returns, var)
+
+            kupiec_res.update({"Asset": asset, "VaR Type": var_type})
+            binomial_res.update({"Asset": asset, "VaR Type": var_type})
+
+            kupiec_results.append(kupiec_res)
+            binomial_results.append(binomial_res)
+
+    # Sauvegarde des résultats des tests
+    pd.DataFrame(kupiec_results).to_csv(
+        os.path.join(OUTPUT_FOLDER, "kupiec_test_results.csv"), index=False
     )
-    plt.title(f"Value at Risk pour {asset}", fontsize=14)
-    plt.xlabel("Date", fontsize=12)
-    plt.ylabel("Valeurs", fontsize=12)
-    plt.legend(fontsize=10)
-    plt.grid(alpha=0.5)
-    plt.tight_layout()
-
-    graph_path = os.path.join(GRAPH_FOLDER, f"{asset}_VaR.png")
-    plt.savefig(graph_path)
-    plt.close()
-    print(f"📊 Graphique sauvegardé : {graph_path}")
-
-
-# --- VALIDATION AVEC TESTS DE KUPIEC ET BINOMIAL ---
-kupiec_results, binomial_results = [], []
-for asset in assets:
-    asset_data = final_df[final_df["Asset"] == asset]
-
-    # Filtrage des données pour ne conserver que celles à partir de 2020-10-15
-    asset_data = asset_data[asset_data["Date"] >= "2020-10-15"]
-
-    returns, var_hist, var_adj = (
-        asset_data["Daily Return"],
-        asset_data["VaR_Hist"],
-        asset_data["VaR_Adjusted"],
+    pd.DataFrame(binomial_results).to_csv(
+        os.path.join(OUTPUT_FOLDER, "binomial_test_results.csv"), index=False
     )
+    print("✅ Résultats des tests sauvegardés !")
+
 
-    for var_type, var in [("VaR_Hist", var_hist), ("VaR_Adjusted", var_adj)]:
-        kupiec_res = kupiec_test(returns, var)
-        binomial_res = binomial_test(returns, var)
-
-        kupiec_res.update({"Asset": asset, "VaR Type": var_type})
-        binomial_res.update({"Asset": asset, "VaR Type": var_type})
-
-        kupiec_results.append(kupiec_res)
-        binomial_results.append(binomial_res)
-
-# Sauvegarde des résultats des tests
-pd.DataFrame(kupiec_results).to_csv(
-    os.path.join(OUTPUT_FOLDER, "kupiec_test_results.csv"), index=False
-)
-pd.DataFrame(binomial_results).to_csv(
-    os.path.join(OUTPUT_FOLDER, "binomial_test_results.csv"), index=False
-)
-print("✅ Résultats des tests sauvegardés !")
-
-
-# Sauvegarde des résultats des tests
-pd.DataFrame(kupiec_results).to_csv(
-    os.path.join(OUTPUT_FOLDER, "kupiec_test_results.csv"), index=False
-)
-pd.DataFrame(binomial_results).to_csv(
-    os.path.join(OUTPUT_FOLDER, "binomial_test_results.csv"), index=False
-)
-print("✅ Résultats des tests sauvegardés !")
+# Le point d'entrée protégé évite que les processus de rendu ne relancent le script
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,9 @@ import numpy as np
 import pandas as pd
 from polygon import RESTClient
 from datetime import datetime, timedelta
+from collections import deque
 from crontab import CronTab
+import threading
 import time
 from dotenv import load_dotenv
 import os
@@ -16,36 +18,104 @@ underlying_stocks = ["BHP", "FMC"]  # liste des stocks
 end_date = datetime.now().strftime("%Y-%m-%d")
 start_date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
 
-
-def get_put_call_ratio(underlying_stock, start_date, end_date):
-    time.sleep(60)
-    active_contracts = []
-    for option in client.list_options_contracts(
-        underlying_ticker=underlying_stock, expiration_date_gte=start_date, limit=1000
-    ):
-        active_contracts.append(option)
-        if len(active_contracts) % 5000 == 0:
-            time.sleep(60)
-
-    time.sleep(60)
-    expired_contracts = []
+PAGE_SIZE = 1000  # nombre de contrats renvoyés par page par l'API
+
+DAILY_PUT_CALL_COLUMNS = [
+    "timestamp",
+    "put_volume",
+    "call_volume",
+    "volume",
+    "put_call_ratio",
+]
+
+
+class RateLimiter:
+    """
+    Limite le nombre d'appels à l'API Polygon sur une fenêtre glissante.
+
+    Une même instance peut être partagée entre plusieurs threads : chaque appel
+    à `acquire` bloque jusqu'à ce qu'un créneau soit disponible.
+    """
+
+    def __init__(self, max_calls=5, period=60.0):
+        """
+        :param max_calls: Nombre maximal d'appels autorisés sur la période.
+        :param period: Durée de la fenêtre glissante en secondes.
+        """
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Attend qu'un créneau soit libre puis le réserve."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            time.sleep(wait)
+
+
+# limite du plan gratuit Polygon : 5 requêtes par minute
+default_rate_limiter = RateLimiter(max_calls=5, period=60.0)
+
+
+def list_contracts(underlying_stock, start_date, expired, rate_limiter):
+    """
+    Liste les contrats d'options d'un sous-jacent, une requête par page.
+
+    :param underlying_stock: Ticker du sous-jacent.
+    :param start_date: Date d'expiration minimale (YYYY-MM-DD).
+    :param expired: True pour les contrats expirés, False pour les actifs.
+    :param rate_limiter: Limiteur partagé utilisé avant chaque page.
+    :return: Liste des contrats.
+    """
+    contracts = []
+    rate_limiter.acquire()
     for option in client.list_options_contracts(
         underlying_ticker=underlying_stock,
         expiration_date_gte=start_date,
-        limit=1000,
-        expired=True,
+        limit=PAGE_SIZE,
+        expired=expired,
     ):
-        expired_contracts.append(option)
-        if len(expired_contracts) % 5000 == 0:
-            time.sleep(60)
+        contracts.append(option)
+        if len(contracts) % PAGE_SIZE == 0:
+            rate_limiter.acquire()  # la page suivante déclenche une requête
+    return contracts
+
+
+def get_put_call_ratio(underlying_stock, start_date, end_date, rate_limiter=None):
+    """
+    Calcule le put/call ratio journalier d'un sous-jacent à partir des volumes
+    des contrats d'options.
+
+    :param underlying_stock: Ticker du sous-jacent.
+    :param start_date: Date de début (YYYY-MM-DD).
+    :param end_date: Date de fin incluse (YYYY-MM-DD).
+    :param rate_limiter: Limiteur d'appels partagé, par défaut celui du module.
+    :return: DataFrame indexé par timestamp avec les volumes et le ratio.
+    """
+    rate_limiter = rate_limiter or default_rate_limiter
+
+    active_contracts = list_contracts(
+        underlying_stock, start_date, expired=False, rate_limiter=rate_limiter
+    )
+    expired_contracts = list_contracts(
+        underlying_stock, start_date, expired=True, rate_limiter=rate_limiter
+    )
 
     # conbiner les contrats actifs et expirés
     options_contracts = expired_contracts + active_contracts
     print(f"Total Contracts for {underlying_stock}: {len(options_contracts)}")
 
     df_list = []
-    time.sleep(60)
     for i, contract in enumerate(options_contracts):
+        rate_limiter.acquire()
         df_list.append(
             pd.DataFrame(
                 client.list_aggs(
@@ -60,12 +130,14 @@ def get_put_call_ratio(underlying_stock, start_date, end_date):
         )
         if i % 100 == 0:
             print(f"Getting data for contract {i} of {len(options_contracts)}")
-        if len(df_list) % 5 == 0:
-            time.sleep(60)
 
-    time.sleep(60)
+    if not df_list:
+        return pd.DataFrame(columns=DAILY_PUT_CALL_COLUMNS[1:]).rename_axis("timestamp")
+
     # Combine la liste dans un data frame
     df = pd.concat(df_list)
+    if df.empty:
+        return pd.DataFrame(columns=DAILY_PUT_CALL_COLUMNS[1:]).rename_axis("timestamp")
     df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
 
     # merge avec les contrats pour obtenir les contrats type
@@ -80,39 +152,43 @@ def get_put_call_ratio(underlying_stock, start_date, end_date):
     return df_grouped
 
 
-# excecute pour la journée et concatène
-for stock in underlying_stocks:
-    output_file = f"../../new_data/daily_put_call/daily_put_call_{stock}.csv"
+def update_daily_put_call(df_grouped, output_file):
+    """
+    Concatène les nouveaux ratios journaliers au fichier CSV du sous-jacent.
+
+    :param df_grouped: Résultat de `get_put_call_ratio`.
+    :param output_file: Chemin du fichier CSV à mettre à jour.
+    """
+    frames = [df_grouped.reset_index()]
     try:
         # Load existing data if file exists
         existing_data = pd.read_csv(output_file)
         existing_data["timestamp"] = pd.to_datetime(existing_data["timestamp"])
+        frames.insert(0, existing_data)
     except FileNotFoundError:
-        # If the file doesn't exist, create an empty dataframe
-        existing_data = pd.DataFrame(
-            columns=[
-                "timestamp",
-                "put_volume",
-                "call_volume",
-                "volume",
-                "put_call_ratio",
-            ]
-        )
-
-    df_grouped = get_put_call_ratio(stock, start_date, end_date)
+        # If the file doesn't exist, only the new data is written
+        pass
 
     # Concatenate new data with existing data
     updated_data = (
-        pd.concat([existing_data, df_grouped])
-        .drop_duplicates()
+        pd.concat([frame for frame in frames if not frame.empty] or frames)
+        .drop_duplicates(subset="timestamp", keep="last")
         .sort_values("timestamp")
     )
-    updated_data.to_csv(output_file, index=False)
+    updated_data[DAILY_PUT_CALL_COLUMNS].to_csv(output_file, index=False)
+
+
+# excecute pour la journée et concatène
+if __name__ == "__main__":
+    for stock in underlying_stocks:
+        output_file = f"../../new_data/daily_put_call/daily_put_call_{stock}.csv"
+        df_grouped = get_put_call_ratio(stock, start_date, end_date)
+        update_daily_put_call(df_grouped, output_file)
 
 
-# Sur linux
+# Sur linux, préférer l'ordonnanceur (verrou + reprise) : put_call_ratio_scheduler.py
 # cron = CronTab(user="root")
-# job = cron.new(command='python3 .\put_call_ratio_with_contratcs.py', comment='Daily Put-Call Ratio Calculation for Multiple Stocks')
+# job = cron.new(command='python3 put_call_ratio_scheduler.py', comment='Daily Put-Call Ratio Calculation for Multiple Stocks')
 # job.setall('0 0 * * *')  # Run daily at midnight
 # cron.write()
 # crontab -r
@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from put_call_ratio_BHP_FMC_with_contratcs import (
+    RateLimiter,
+    get_put_call_ratio,
+    update_daily_put_call,
+)
+
+# ________________________________________Paramètres____________________________
+OUTPUT_FOLDER = "../../new_data/daily_put_call"
+PROGRESS_FILE = os.path.join(OUTPUT_FOLDER, "progress.json")
+LOCK_FILE = os.path.join(OUTPUT_FOLDER, "scheduler.lock")
+UNDERLYINGS = ["BHP", "FMC"]
+MAX_WORKERS = 4
+# _______________________________________Paramètres_____________________________
+
+
+class SchedulerLock:
+    """
+    Verrou fichier empêchant deux exécutions simultanées (ex. cron qui se
+    chevauche). Un verrou laissé par un processus mort est récupéré.
+    """
+
+    def __init__(self, lock_file):
+        self.lock_file = lock_file
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.lock_file) or ".", exist_ok=True)
+        try:
+            fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if self._owner_alive():
+                raise RuntimeError(
+                    f"Une exécution est déjà en cours (verrou {self.lock_file})."
+                )
+            os.remove(self.lock_file)
+            fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        with os.fdopen(fd, "w") as file:
+            file.write(str(os.getpid()))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            os.remove(self.lock_file)
+        except FileNotFoundError:
+            pass
+
+    def _owner_alive(self):
+        """Vérifie si le processus ayant posé le verrou tourne encore."""
+        try:
+            with open(self.lock_file) as file:
+                pid = int(file.read().strip())
+        except (OSError, ValueError):
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+
+class ProgressStore:
+    """
+    Enregistre les couples (sous-jacent, jour) déjà traités dans un fichier
+    JSON, pour qu'une exécution interrompue reprenne là où elle s'est arrêtée.
+    """
+
+    def __init__(self, progress_file):
+        self.progress_file = progress_file
+        self._lock = threading.Lock()
+        try:
+            with open(progress_file, "r", encoding="utf-8") as file:
+                self._done = {k: set(v) for k, v in json.load(file).items()}
+        except FileNotFoundError:
+            self._done = {}
+
+    def pending_days(self, underlying, days):
+        """Renvoie les jours de `days` pas encore traités pour `underlying`."""
+        with self._lock:
+            done = self._done.get(underlying, set())
+            return [day for day in days if day not in done]
+
+    def mark_done(self, underlying, days):
+        """Marque les jours comme traités et persiste le fichier de façon atomique."""
+        with self._lock:
+            self._done.setdefault(underlying, set()).update(days)
+            tmp_file = f"{self.progress_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as file:
+                json.dump({k: sorted(v) for k, v in self._done.items()}, file, indent=4)
+            os.replace(tmp_file, self.progress_file)
+
+
+def pending_chunks(pending):
+    """
+    Découpe les jours restants en plages de jours consécutifs d'un même mois :
+    un trou dans `pending` (jours déjà traités) coupe la plage.
+    """
+    chunks = []
+    for day in pending:
+        previous = chunks[-1][-1] if chunks else None
+        if (
+            previous is not None
+            and day[:7] == previous[:7]
+            and (pd.Timestamp(day) - pd.Timestamp(previous)).days == 1
+        ):
+            chunks[-1].append(day)
+        else:
+            chunks.append([day])
+    return chunks
+
+
+def process_underlying(underlying, days, progress, rate_limiter, output_folder):
+    """
+    Calcule le put/call ratio d'un sous-jacent pour ses jours restants.
+
+    Les jours restants sont traités par mois (voir pending_chunks) : après
+    chaque mois, le CSV est mis à jour et les jours terminés (antérieurs à
+    aujourd'hui) sont marqués traités, une exécution interrompue perd au plus
+    le mois en cours.
+
+    :return: Nombre de jours marqués traités.
+    """
+    pending = progress.pending_days(underlying, days)
+    if not pending:
+        print(f"{underlying} : rien à faire")
+        return 0
+
+    output_file = os.path.join(output_folder, f"daily_put_call_{underlying}.csv")
+    today = datetime.now().strftime("%Y-%m-%d")
+    processed = 0
+    for chunk in pending_chunks(pending):
+        df_grouped = get_put_call_ratio(
+            underlying, chunk[0], chunk[-1], rate_limiter=rate_limiter
+        )
+        update_daily_put_call(df_grouped, output_file)
+
+        completed = [day for day in chunk if day < today]
+        progress.mark_done(underlying, completed)
+        processed += len(completed)
+        print(f"{underlying} : {chunk[0]} -> {chunk[-1]} traité")
+    print(f"{underlying} : {processed} jour(s) traité(s)")
+    return processed
+
+
+def run_schedule(
+    underlyings,
+    start_date,
+    end_date,
+    max_workers=MAX_WORKERS,
+    rate_limiter=None,
+    output_folder=OUTPUT_FOLDER,
+    progress_file=PROGRESS_FILE,
+    lock_file=LOCK_FILE,
+):
+    """
+    Lance le calcul pour plusieurs sous-jacents en parallèle.
+
+    Tous les workers partagent le même limiteur d'appels : le débit total vers
+    l'API reste borné quel que soit le nombre de sous-jacents.
+
+    :param underlyings: Liste des tickers à traiter.
+    :param start_date: Date de début (YYYY-MM-DD).
+    :param end_date: Date de fin incluse (YYYY-MM-DD).
+    :param max_workers: Nombre de sous-jacents traités simultanément.
+    :param rate_limiter: Limiteur partagé, par défaut 5 appels par minute.
+    :return: Dictionnaire {sous-jacent: nombre de jours traités ou erreur}.
+    """
+    rate_limiter = rate_limiter or RateLimiter(max_calls=5, period=60.0)
+    days = pd.date_range(start_date, end_date, freq="D").strftime("%Y-%m-%d").tolist()
+    os.makedirs(output_folder, exist_ok=True)
+
+    summary = {}
+    with SchedulerLock(lock_file):
+        progress = ProgressStore(progress_file)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(
+                    process_underlying,
+                    underlying,
+                    days,
+                    progress,
+                    rate_limiter,
+                    output_folder,
+                ): underlying
+                for underlying in underlyings
+            }
+            for future in as_completed(futures):
+                underlying = futures[future]
+                try:
+                    summary[underlying] = future.result()
+                except Exception as e:
+                    print(f"Erreur avec {underlying}: {e}")
+                    summary[underlying] = f"error: {e}"
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Put/call ratio journalier pour plusieurs sous-jacents"
+    )
+    parser.add_argument("--underlyings", nargs="+", default=UNDERLYINGS)
+    parser.add_argument(
+        "--start-date",
+        default=(datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d"),
+    )
+    parser.add_argument("--end-date", default=datetime.now().strftime("%Y-%m-%d"))
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    print(run_schedule(args.underlyings, args.start_date, args.end_date, args.workers))
+
+
+# Sur linux (le verrou empêche deux exécutions qui se chevauchent)
+# cron = CronTab(user="root")
+# job = cron.new(command='python3 put_call_ratio_scheduler.py', comment='Daily Put-Call Ratio Calculation for Multiple Stocks')
+# job.setall('0 0 * * *')  # Run daily at midnight
+# cron.write()